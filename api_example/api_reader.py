@@ -1,101 +1,499 @@
-import requests
-import pandas as pd
-from datetime import datetime
-import os
-
-
-class FoxAPIReader:
-    """Класс для работы с Random Fox API"""
-
-    def __init__(self):
-        self.base_url = "https://randomfox.ca/floof/"
-        self.data = None
-
-    def fetch_fox_data(self):
-        """Получение данных о случайной лисе из API"""
-        try:
-            response = requests.get(self.base_url)
-            response.raise_for_status()  # Проверка на ошибки HTTP
-
-            self.data = response.json()
-            print(" Данные успешно получены!")
-            return self.data
-
-        except requests.exceptions.RequestException as e:
-            print(f" Ошибка при запросе к API: {e}")
-            return None
-
-    def to_dataframe(self):
-        """Преобразование данных в Pandas DataFrame"""
-        if self.data is None:
-            print(" Нет данных для преобразования. Сначала выполните fetch_fox_data()")
-            return None
-
-        try:
-            # Создаем DataFrame из полученных данных
-            df_data = {
-                'image_url': [self.data.get('image', '')],
-                'link': [self.data.get('link', '')],
-                'timestamp': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
-            }
-
-            df = pd.DataFrame(df_data)
-            print(" Данные успешно преобразованы в DataFrame!")
-            return df
-
-        except Exception as e:
-            print(f" Ошибка при создании DataFrame: {e}")
-            return None
-
-    def display_info(self):
-        """Отображение информации о полученных данных"""
-        if self.data is None:
-            print(" Нет данных для отображения")
-            return
-
-        print("\n" + "=" * 50)
-        print(" ИНФОРМАЦИЯ О СЛУЧАЙНОЙ ЛИСЕ")
-        print("=" * 50)
-        print(f"🖼 URL изображения: {self.data.get('image', 'Не указан')}")
-        print(f" Ссылка: {self.data.get('link', 'Не указана')}")
-        print("=" * 50)
-
-
-def main():
-    """Основная функция для демонстрации работы с API"""
-    print(" Запуск Fox API Reader...")
-
-    # Создаем экземпляр класса
-    fox_reader = FoxAPIReader()
-
-    # Получаем данные из API
-    fox_data = fox_reader.fetch_fox_data()
-
-    if fox_data:
-        # Отображаем информацию
-        fox_reader.display_info()
-
-        # Преобразуем в DataFrame
-        df = fox_reader.to_dataframe()
-
-        if df is not None:
-            # Выводим DataFrame
-            print("\n Pandas DataFrame:")
-            print(df)
-
-            # Дополнительная информация о DataFrame
-            print(f"\n Информация о DataFrame:")
-            print(f"   Количество строк: {len(df)}")
-            print(f"   Количество столбцов: {len(df.columns)}")
-            print(f"   Столбцы: {list(df.columns)}")
-
-            # Сохраняем в CSV (опционально)
-            csv_filename = f"fox_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            df.to_csv(csv_filename, index=False)
-            print(f" Данные сохранены в файл: {csv_filename}")
-
-    print("\n Программа завершена!")
-
-
-if __name__ == "__main__":
+import argparse
+import hashlib
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+import pandas as pd
+from datetime import datetime
+import os
+
+# Коды ответа, при которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_MEDIA_DIR = 'data/media/fox'
+DEFAULT_HTTP_CACHE_PATH = 'data/cache/http_cache.db'
+# Ключи записей record/replay: не удаляются по ttl
+RECORDING_PREFIX = 'recording:'
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """В режиме replay для URL нет записанного ответа."""
+
+
+class MemoryCacheBackend:
+    """Хранилище ответов в памяти процесса."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, seq: int = 0):
+        with self._lock:
+            return self._entries.get((key, seq))
+
+    def put(self, key: str, entry: dict, seq: int = 0) -> None:
+        with self._lock:
+            self._entries[(key, seq)] = entry
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return sum(1 for entry_key, _ in self._entries if entry_key == key)
+
+    def purge(self, older_than: float) -> int:
+        """
+        Удаляет ответы без ETag/Last-Modified, сохраненные раньше
+        older_than. Записи record/replay не удаляются.
+        """
+        with self._lock:
+            stale = [k for k, entry in self._entries.items()
+                     if entry['stored_at'] < older_than
+                     and not entry['etag'] and not entry['last_modified']
+                     and not k[0].startswith(RECORDING_PREFIX)]
+            for k in stale:
+                del self._entries[k]
+        return len(stale)
+
+
+class SQLiteCacheBackend:
+    """Хранилище ответов в SQLite: переживает перезапуск процесса."""
+
+    def __init__(self, db_path: str = DEFAULT_HTTP_CACHE_PATH):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (key, seq)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key: str, seq: int = 0):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM http_cache WHERE key = ? AND seq = ?",
+                (key, seq)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'body': row[0], 'etag': row[1], 'last_modified': row[2], 'stored_at': row[3]}
+
+    def put(self, key: str, entry: dict, seq: int = 0) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, seq, entry['body'], entry['etag'], entry['last_modified'], entry['stored_at'])
+            )
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM http_cache WHERE key = ?", (key,)
+            ).fetchone()[0]
+
+    def purge(self, older_than: float) -> int:
+        """
+        Удаляет ответы без ETag/Last-Modified, сохраненные раньше
+        older_than. Записи record/replay не удаляются.
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM http_cache WHERE stored_at < ? "
+                "AND etag IS NULL AND last_modified IS NULL AND substr(key, 1, ?) != ?",
+                (older_than, len(RECORDING_PREFIX), RECORDING_PREFIX)
+            ).rowcount
+
+
+class ResponseCache:
+    """
+    Кеш HTTP ответов для FoxAPIReader.
+
+    Режимы:
+      * cache — свежий (моложе ttl) ответ отдается без сети; устаревший
+        перепроверяется запросом с If-None-Match/If-Modified-Since, и
+        при 304 продлевается. Один URL — один ответ, поэтому для
+        случайного API все записи пакета будут одинаковыми;
+      * record — каждый ответ идет из сети и дописывается в запись;
+      * replay — ответы берутся только из записи (по кругу), без сети;
+        если записи нет, выбрасывается CacheMiss.
+
+    Записи record/replay хранятся отдельно от кеша и не удаляются по ttl.
+    """
+
+    MODES = ('cache', 'record', 'replay')
+
+    def __init__(self, backend=None, ttl: float = 3600, mode: str = 'cache'):
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим кеша: {mode}")
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self.mode = mode
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'recorded': 0, 'replayed': 0}
+        self._lock = threading.Lock()
+        self._replay_positions = {}
+        self.backend.purge(time.time() - ttl)
+
+    @staticmethod
+    def _entry(response: requests.Response) -> dict:
+        return {
+            'body': response.content,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored_at': time.time(),
+        }
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def fetch(self, url: str, get) -> bytes:
+        """
+        Тело ответа для url. get(url, headers=...) выполняет сетевой
+        запрос (FoxAPIReader._get) и вызывается только при необходимости.
+        """
+        recording_key = f"{RECORDING_PREFIX}{url}"
+
+        if self.mode == 'replay':
+            with self._lock:
+                total = self.backend.count(recording_key)
+                if not total:
+                    raise CacheMiss(f"Нет записанного ответа для {url}")
+                seq = self._replay_positions.get(url, 0)
+                self._replay_positions[url] = (seq + 1) % total
+            self._count('replayed')
+            return self.backend.get(recording_key, seq)['body']
+
+        if self.mode == 'record':
+            entry = self._entry(get(url))
+            # Номер записи выдается под блокировкой: запросы пакета идут параллельно
+            with self._lock:
+                seq = self.backend.count(recording_key)
+                self.backend.put(recording_key, entry, seq)
+            self._count('recorded')
+            return entry['body']
+
+        cached = self.backend.get(url)
+        if cached and time.time() - cached['stored_at'] < self.ttl:
+            self._count('hits')
+            return cached['body']
+
+        headers = {}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        response = get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            cached['stored_at'] = time.time()
+            self.backend.put(url, cached)
+            self._count('revalidated')
+            return cached['body']
+
+        entry = self._entry(response)
+        self.backend.put(url, entry)
+        self._count('misses')
+        return entry['body']
+
+
+class FoxAPIReader:
+    """
+    Класс для работы с Random Fox API
+
+    Все запросы идут через одну keep-alive сессию с таймаутом и
+    повторами с экспоненциальной задержкой. fetch_batch получает
+    много записей параллельно (не более max_workers запросов
+    одновременно). base_url можно заменить на адрес локального
+    тестового сервера. download_images скачивает изображения в
+    локальное хранилище, адресуемое по содержимому. cache
+    (ResponseCache) кеширует или записывает/воспроизводит ответы API.
+    """
+
+    def __init__(self,
+                 base_url: str = "https://randomfox.ca/floof/",
+                 timeout: float = 10.0,
+                 max_retries: int = 3,
+                 backoff: float = 0.5,
+                 max_workers: int = 16,
+                 cache: ResponseCache = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.cache = cache
+        self.data = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET с повторами; после max_retries повторов пробрасывает ошибку."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, timeout=self.timeout, **kwargs)
+                response.raise_for_status()  # Проверка на ошибки HTTP
+                return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    raise
+            # Экспоненциальная задержка со случайной добавкой
+            time.sleep(self.backoff * 2 ** attempt + random.uniform(0, self.backoff))
+
+    def _get_json(self) -> dict:
+        if self.cache is None:
+            return self._get(self.base_url).json()
+        return json.loads(self.cache.fetch(self.base_url, self._get))
+
+    def fetch_fox_data(self):
+        """Получение данных о случайной лисе из API"""
+        try:
+            self.data = self._get_json()
+            print(" Данные успешно получены!")
+            return self.data
+
+        except requests.exceptions.RequestException as e:
+            print(f" Ошибка при запросе к API: {e}")
+            return None
+
+    def _fetch_record(self, _) -> dict:
+        try:
+            data = self._get_json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return {'error': str(e)}
+        return {
+            'image_url': data.get('image', ''),
+            'link': data.get('link', ''),
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def fetch_batch(self, count: int) -> pd.DataFrame:
+        """
+        Получение count записей параллельно.
+
+        Неудачные запросы (после всех повторов) пропускаются и
+        учитываются в выводе. DataFrame строится один раз из всех записей.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            records = list(executor.map(self._fetch_record, range(count)))
+
+        errors = [record['error'] for record in records if 'error' in record]
+        df = pd.DataFrame.from_records(
+            [record for record in records if 'error' not in record],
+            columns=['image_url', 'link', 'timestamp']
+        )
+        print(f" Получено {len(df)} из {count} записей за {time.perf_counter() - start:.2f} сек")
+        if errors:
+            print(f" Ошибок: {len(errors)} (первая: {errors[0]})")
+        return df
+
+    def _download_image(self, url: str, media_dir: Path) -> dict:
+        """
+        Потоково скачивает url во временный файл, считая sha256, и
+        переносит его в <media_dir>/<2 символа хеша>/<хеш><расширение>.
+        Одинаковое содержимое по разным URL хранится один раз.
+        """
+        suffix = Path(urlparse(url).path).suffix or '.bin'
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=media_dir, prefix='.download-')
+        try:
+            with os.fdopen(fd, 'wb') as f, self._get(url, stream=True) as response:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            relative = Path(sha256[:2]) / f"{sha256}{suffix}"
+            (media_dir / relative).parent.mkdir(exist_ok=True)
+            if (media_dir / relative).exists():
+                os.unlink(tmp_name)
+            else:
+                os.replace(tmp_name, media_dir / relative)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        return {'path': str(relative), 'sha256': sha256, 'bytes': size}
+
+    def download_images(self, df: pd.DataFrame, media_dir: str = DEFAULT_MEDIA_DIR) -> pd.DataFrame:
+        """
+        Скачивание изображений из столбца image_url.
+
+        Каждый уникальный URL скачивается один раз, URL из индекса
+        хранилища (<media_dir>/index.json) не скачиваются повторно.
+        Возвращает копию df со столбцами image_path и image_sha256
+        (None, если скачать не удалось).
+        """
+        media_dir = Path(media_dir)
+        media_dir.mkdir(parents=True, exist_ok=True)
+        index_path = media_dir / 'index.json'
+        index = json.loads(index_path.read_text(encoding='utf-8')) if index_path.exists() else {}
+
+        urls = [url for url in df['image_url'].dropna().unique() if url]
+        todo = [url for url in urls
+                if url not in index or not (media_dir / index[url]['path']).exists()]
+
+        def download(url):
+            if self.cache is not None and self.cache.mode == 'replay':
+                return url, {'error': f"{url} нет в хранилище, а режим replay работает без сети"}
+            try:
+                return url, self._download_image(url, media_dir)
+            except (requests.exceptions.RequestException, OSError) as e:
+                return url, {'error': str(e)}
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(download, todo))
+
+        errors = [entry['error'] for _, entry in results if 'error' in entry]
+        index.update({url: entry for url, entry in results if 'error' not in entry})
+        fd, tmp_name = tempfile.mkstemp(dir=media_dir, prefix='.index-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_name, index_path)
+
+        downloaded = sum(entry.get('bytes', 0) for _, entry in results)
+        print(f" Изображения: {len(urls)} уникальных URL, из кеша {len(urls) - len(todo)}, "
+              f"скачано {len(todo) - len(errors)} ({downloaded / 1024 / 1024:.2f} МБ) "
+              f"за {time.perf_counter() - start:.2f} сек")
+        if errors:
+            print(f" Ошибок скачивания: {len(errors)} (первая: {errors[0]})")
+
+        entries = df['image_url'].map(index.get)
+        df = df.copy()
+        df['image_path'] = entries.map(lambda e: str(media_dir / e['path']) if e else None)
+        df['image_sha256'] = entries.map(lambda e: e['sha256'] if e else None)
+        return df
+
+    def to_dataframe(self):
+        """Преобразование данных в Pandas DataFrame"""
+        if self.data is None:
+            print(" Нет данных для преобразования. Сначала выполните fetch_fox_data()")
+            return None
+
+        try:
+            # Создаем DataFrame из полученных данных
+            df_data = {
+                'image_url': [self.data.get('image', '')],
+                'link': [self.data.get('link', '')],
+                'timestamp': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+            }
+
+            df = pd.DataFrame(df_data)
+            print(" Данные успешно преобразованы в DataFrame!")
+            return df
+
+        except Exception as e:
+            print(f" Ошибка при создании DataFrame: {e}")
+            return None
+
+    def display_info(self):
+        """Отображение информации о полученных данных"""
+        if self.data is None:
+            print(" Нет данных для отображения")
+            return
+
+        print("\n" + "=" * 50)
+        print(" ИНФОРМАЦИЯ О СЛУЧАЙНОЙ ЛИСЕ")
+        print("=" * 50)
+        print(f"🖼 URL изображения: {self.data.get('image', 'Не указан')}")
+        print(f" Ссылка: {self.data.get('link', 'Не указана')}")
+        print("=" * 50)
+
+
+def main():
+    """Основная функция для демонстрации работы с API"""
+    parser = argparse.ArgumentParser(description="Random Fox API")
+    parser.add_argument('--batch', type=int, default=None,
+                        help='Получить N записей параллельно и сохранить в CSV')
+    parser.add_argument('--url', type=str, default="https://randomfox.ca/floof/",
+                        help='Адрес API (например, локального тестового сервера)')
+    parser.add_argument('--workers', type=int, default=16, help='Одновременных запросов')
+    parser.add_argument('--download-images', action='store_true',
+                        help=f'Скачать изображения пакета в {DEFAULT_MEDIA_DIR}')
+    parser.add_argument('--cache', choices=['memory', 'sqlite'], default=None,
+                        help=f'Кеш ответов API (sqlite: {DEFAULT_HTTP_CACHE_PATH})')
+    parser.add_argument('--cache-mode', choices=ResponseCache.MODES, default='cache',
+                        help='cache — TTL и перепроверка, record — записать ответы, '
+                             'replay — воспроизвести записанные без сети')
+    parser.add_argument('--cache-ttl', type=float, default=3600, help='Время жизни ответа, сек')
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache:
+        backend = SQLiteCacheBackend() if args.cache == 'sqlite' else MemoryCacheBackend()
+        cache = ResponseCache(backend, ttl=args.cache_ttl, mode=args.cache_mode)
+
+    print(" Запуск Fox API Reader...")
+
+    # Создаем экземпляр класса
+    fox_reader = FoxAPIReader(base_url=args.url, max_workers=args.workers, cache=cache)
+
+    if args.batch:
+        df = fox_reader.fetch_batch(args.batch)
+        if args.download_images:
+            df = fox_reader.download_images(df)
+        csv_filename = f"fox_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        df.to_csv(csv_filename, index=False)
+        print(f" Данные сохранены в файл: {csv_filename}")
+        if cache:
+            print(f" Кеш ответов: {cache.stats}")
+        return
+
+    # Получаем данные из API
+    fox_data = fox_reader.fetch_fox_data()
+
+    if fox_data:
+        # Отображаем информацию
+        fox_reader.display_info()
+
+        # Преобразуем в DataFrame
+        df = fox_reader.to_dataframe()
+
+        if df is not None:
+            # Выводим DataFrame
+            print("\n Pandas DataFrame:")
+            print(df)
+
+            # Дополнительная информация о DataFrame
+            print(f"\n Информация о DataFrame:")
+            print(f"   Количество строк: {len(df)}")
+            print(f"   Количество столбцов: {len(df.columns)}")
+            print(f"   Столбцы: {list(df.columns)}")
+
+            # Сохраняем в CSV (опционально)
+            csv_filename = f"fox_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            df.to_csv(csv_filename, index=False)
+            print(f" Данные сохранены в файл: {csv_filename}")
+
+    if cache:
+        print(f" Кеш ответов: {cache.stats}")
+    print("\n Программа завершена!")
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
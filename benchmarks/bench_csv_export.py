@@ -0,0 +1,98 @@
+"""
+Бенчмарк экспорта в CSV: pandas.to_csv против писателя Arrow.
+
+Пропускная способность считается по размеру несжатого CSV,
+поэтому МБ/с сравнимы между вариантами со сжатием и без.
+
+Запуск:
+    python -m benchmarks.bench_csv_export --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from etl.csv_export import write_csv_arrow
+
+
+def make_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Датасет в форме telco churn после transform()."""
+    rng = np.random.default_rng(seed)
+    yes_no = pd.Categorical.from_codes(rng.integers(0, 2, rows), ['No', 'Yes'])
+
+    return pd.DataFrame({
+        'customerID': [f"{i:04d}-{i % 99991:05X}" for i in range(rows)],
+        'gender': pd.Categorical.from_codes(rng.integers(0, 2, rows), ['Female', 'Male']),
+        'SeniorCitizen': rng.integers(0, 2, rows).astype('int8'),
+        'Partner': yes_no,
+        'tenure': rng.integers(0, 73, rows).astype('int8'),
+        'Contract': pd.Categorical.from_codes(
+            rng.integers(0, 3, rows), ['Month-to-month', 'One year', 'Two year']),
+        'PaymentMethod': pd.Categorical.from_codes(
+            rng.integers(0, 4, rows),
+            ['Bank transfer (automatic)', 'Credit card (automatic)',
+             'Electronic check', 'Mailed check']),
+        'MonthlyCharges': rng.uniform(18.25, 118.75, rows).round(2).astype('float32'),
+        'TotalCharges': rng.uniform(18.8, 8684.8, rows).round(2).astype('float32'),
+        'Churn': pd.Categorical.from_codes(rng.integers(0, 2, rows), ['No', 'Yes']),
+    })
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(rows: int, shards: int, repeat: int) -> None:
+    df = make_frame(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        reference = tmp / 'reference.csv'
+        df.to_csv(reference, index=False)
+        csv_mb = reference.stat().st_size / 1024 / 1024
+
+        cases = {
+            'pandas': lambda: df.to_csv(tmp / 'pandas.csv', index=False, encoding='utf-8'),
+            'pandas + gzip': lambda: df.to_csv(tmp / 'pandas.csv.gz', index=False,
+                                               compression='gzip'),
+            'arrow': lambda: write_csv_arrow(df, tmp / 'arrow.csv'),
+            'arrow + gzip': lambda: write_csv_arrow(df, tmp / 'arrow.csv', compression='gzip'),
+            'arrow + zstd': lambda: write_csv_arrow(df, tmp / 'arrow.csv', compression='zstd'),
+            f'arrow x{shards} шардов': lambda: write_csv_arrow(
+                df, tmp / 'sharded.csv', shards=shards),
+            f'arrow x{shards} шардов + zstd': lambda: write_csv_arrow(
+                df, tmp / 'sharded.csv', compression='zstd', shards=shards),
+        }
+
+        print(f"\nCSV экспорт: {rows:,} строк, {csv_mb:.1f} МБ несжатого CSV, "
+              f"лучшее из {repeat}\n")
+        print(f"{'вариант':32} {'сек':>8} {'МБ/с':>10} {'x pandas':>9}")
+        print("-" * 62)
+
+        baseline = None
+        for name, func in cases.items():
+            best = min(timed(func) for _ in range(repeat))
+            baseline = baseline or best
+            print(f"{name:32} {best:8.3f} {csv_mb / best:10.1f} {baseline / best:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк экспорта в CSV")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    run(args.rows, args.shards, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Бенчмарк FoxAPIReader.fetch_batch против последовательных запросов.
+
+Поднимает локальный тестовый сервер, имитирующий Random Fox API с
+задержкой ответа и долей ответов 503 (проверяются повторы). Сервер
+работает в отдельном процессе, чтобы не делить GIL с клиентом, и
+отдает изображения, на которые ссылаются ответы (--download замеряет
+download_images: первый прогон и повторный из кеша).
+
+Запуск:
+    python -m benchmarks.bench_fox_batch --count 2000 --latency 0.02
+    python -m benchmarks.bench_fox_batch --count 2000 --download
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import random
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from api_example import FoxAPIReader
+
+
+IMAGE_BYTES = 64 * 1024
+
+
+def make_stub_handler(port: int, latency: float, error_rate: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path.startswith('/images/'):
+                # Детерминированное "изображение" для номера из пути
+                n = int(self.path.rsplit('/', 1)[1].split('.')[0])
+                body, status = random.Random(n).randbytes(IMAGE_BYTES), 200
+            elif random.random() < error_rate:
+                body, status = b'{}', 503
+            else:
+                n = random.randint(1, 123)
+                body = json.dumps({
+                    'image': f'http://127.0.0.1:{port}/images/{n}.jpg',
+                    'link': f'https://randomfox.ca/?i={n}',
+                }).encode('utf-8')
+                status = 200
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def serve_stub(port: int, latency: float, error_rate: float) -> None:
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_stub_handler(port, latency, error_rate))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def wait_for_server(url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пакетного получения Fox API")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.02, help='Задержка ответа сервера, сек')
+    parser.add_argument('--error-rate', type=float, default=0.05, help='Доля ответов 503')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--sequential', type=int, default=100,
+                        help='Сколько запросов сделать последовательно для сравнения')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--download', action='store_true', help='Замерить download_images')
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(
+        target=serve_stub, args=(args.port, args.latency, args.error_rate), daemon=True
+    )
+    server.start()
+    url = f"http://127.0.0.1:{args.port}/floof/"
+    wait_for_server(url)
+
+    # Прежний способ: отдельный requests.get без сессии на каждую запись
+    start = time.perf_counter()
+    ok = 0
+    for _ in range(args.sequential):
+        ok += requests.get(url, timeout=10).ok
+    sequential = (time.perf_counter() - start) / args.sequential
+
+    reader = FoxAPIReader(base_url=url, max_workers=args.workers, backoff=0.05)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = reader.fetch_batch(args.count)
+    batch = time.perf_counter() - start
+
+    downloads = []
+    if args.download:
+        with tempfile.TemporaryDirectory() as media_dir:
+            for _ in range(2):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = reader.download_images(df, media_dir)
+                downloads.append(time.perf_counter() - start)
+    server.terminate()
+
+    print(f"\nСервер: задержка {args.latency * 1000:.0f} мс, 503 в {args.error_rate:.0%} ответов")
+    print(f"Последовательно: {sequential * 1000:.1f} мс/запись "
+          f"(оценка для {args.count}: {sequential * args.count:.1f} сек, без повторов)")
+    print(f"fetch_batch ({args.workers} потоков): {batch:.2f} сек, "
+          f"получено {len(df)} из {args.count}, ускорение {sequential * args.count / batch:.1f}x")
+    if downloads:
+        print(f"download_images: {df['image_url'].nunique()} уникальных из {len(df)} URL, "
+              f"первый прогон {downloads[0]:.2f} сек, повторный {downloads[1]:.3f} сек, "
+              f"скачано {result['image_path'].notna().sum()} путей")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Бенчмарк масштабирования ETL на синтетических данных.
+
+Для каждого размера генерирует CSV (benchmarks.synthetic), затем замеряет
+extract, transform, validate_dataset, build_cubes и каждый load_to_* синк через
+MetricsRecorder. Результаты сравниваются с сохраненным базовым
+прогоном: шаг, ставший медленнее более чем на --tolerance, считается
+регрессией (код выхода 1).
+
+Запуск:
+    python -m benchmarks.bench_pipeline --sizes 10k,100k,1m
+    python -m benchmarks.bench_pipeline --sizes 10k,100k --save-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic import parse_size, write_churn_csv
+from etl.aggregate import build_cubes
+from etl.checkpoint import atomic_path
+from etl.extract import extract
+from etl.load import (
+    load_to_csv, load_to_feather, load_to_parquet, load_to_postgresql, load_to_sqlite,
+)
+from etl.metrics import MetricsRecorder
+from etl.transform import transform
+from etl.validate import validate_dataset
+
+DEFAULT_BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+DEFAULT_SIZES = '10k,100k,1m'
+# Более короткие шаги слишком шумные, чтобы считать их регрессией
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+def run_size(rows: int, data_dir: Path, seed: int,
+             postgresql_creds: Optional[str] = None) -> List[dict]:
+    """
+    Прогон всех шагов на rows строках; возвращает шаги MetricsRecorder.
+    postgresql_creds — абсолютный путь к SQLite файлу с кредами PostgreSQL.
+    """
+    source = data_dir / f"churn_{rows}_{seed}.csv"
+    if not source.exists():
+        write_churn_csv(source, rows, seed=seed)
+
+    sinks = {
+        'sqlite': lambda df: load_to_sqlite(df, 'data.db', max_rows=len(df), chunksize=10_000),
+        'parquet': lambda df: load_to_parquet(df, 'data.parquet'),
+        'csv': lambda df: load_to_csv(df, 'data.csv'),
+        'feather': lambda df: load_to_feather(df, 'data.feather'),
+    }
+    if postgresql_creds:
+        sinks['postgresql'] = lambda df: load_to_postgresql(
+            df, table_name='bench_processed_data', credentials_path=postgresql_creds,
+            max_rows=len(df), chunksize=10_000
+        )
+
+    recorder = MetricsRecorder()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # extract пишет data/raw/raw_data.csv относительно текущей папки
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                with recorder.measure('extract') as step:
+                    df = extract(source)
+                    step['rows_out'] = len(df)
+                with recorder.measure('transform', rows_in=len(df)) as step:
+                    df = transform(df)
+                    step['rows_out'] = len(df)
+                with recorder.measure('validate', rows_in=len(df)):
+                    validate_dataset(df)
+                with recorder.measure('aggregate', rows_in=len(df)) as step:
+                    cubes = build_cubes(df)
+                    step['rows_out'] = sum(len(cube) for cube in cubes.values())
+                for name, sink in sinks.items():
+                    with recorder.measure(name, kind='sink', rows_in=len(df)) as step:
+                        step['ok'] = sink(df)
+        finally:
+            os.chdir(cwd)
+
+    return recorder.steps
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Печатает таблицу сравнения и возвращает список регрессий."""
+    regressions = []
+    print(f"\n{'шаг':28} {'wall, с':>9} {'база, с':>9} {'изм.':>8} {'строк/с':>12} {'RSS, МБ':>9}")
+    print("-" * 80)
+    for key, result in results.items():
+        base = baseline.get(key)
+        wall = result['wall_seconds']
+        rate = result['rows_per_second']
+        change, mark = '', ''
+        if base and base['wall_seconds'] > 0:
+            ratio = wall / base['wall_seconds'] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > tolerance and wall >= MIN_COMPARABLE_SECONDS:
+                mark = '  ⚠ регрессия'
+                regressions.append(key)
+        base_wall = f"{base['wall_seconds']:.3f}" if base else '-'
+        print(f"{key:28} {wall:9.3f} {base_wall:>9} {change:>8} "
+              f"{f'{rate:,.0f}' if rate else '-':>12} "
+              f"{result['peak_rss_bytes'] / 1024 / 1024:9.1f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк масштабирования ETL")
+    parser.add_argument('--sizes', type=str, default=DEFAULT_SIZES,
+                        help=f'Размеры через запятую (по умолчанию {DEFAULT_SIZES}, до 100m)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', type=str, default='data/synthetic',
+                        help='Где хранить сгенерированные CSV (переиспользуются между запусками)')
+    parser.add_argument('--baseline', type=str, default=str(DEFAULT_BASELINE_PATH))
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Сохранить результаты как новый базовый прогон')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Допустимое замедление относительно базы (0.2 = 20%%)')
+    parser.add_argument('--postgresql-creds', type=str, default=None,
+                        help='SQLite файл с кредами PostgreSQL (без него синк пропускается)')
+    parser.add_argument('--out', type=str, default=None, help='JSON с результатами прогона')
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir).resolve()
+    # Путь абсолютный: шаги выполняются во временной папке
+    creds = str(Path(args.postgresql_creds).resolve()) if args.postgresql_creds else None
+
+    results = {}
+    for size in args.sizes.split(','):
+        rows = parse_size(size)
+        print(f"▶ {rows:,} строк...")
+        for step in run_size(rows, data_dir, args.seed, creds):
+            results[f"{rows}/{step['kind']}:{step['name']}"] = {
+                'rows': rows,
+                'wall_seconds': step['wall_seconds'],
+                'cpu_seconds': step['cpu_seconds'],
+                'rows_per_second': step['rows_per_second'],
+                'peak_rss_bytes': step['peak_rss_bytes'],
+                'ok': step.get('ok', step['status'] == 'ok'),
+            }
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))['results']
+    else:
+        print(f"\nБазовый прогон не найден: {baseline_path}")
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    payload = {'seed': args.seed, 'results': results}
+    for path in filter(None, [args.out, args.save_baseline and baseline_path]):
+        with atomic_path(path) as tmp_path:
+            tmp_path.write_text(json.dumps(payload, indent=2), encoding='utf-8')
+        print(f"\n✓ Результаты сохранены в {path}")
+
+    failed = [key for key, result in results.items() if not result['ok']]
+    if failed:
+        print(f"\n❌ Шаги с ошибкой: {', '.join(failed)}")
+    if regressions and not args.save_baseline:
+        print(f"\n⚠ Регрессии (> {args.tolerance:.0%}): {', '.join(regressions)}")
+    sys.exit(1 if failed or (regressions and not args.save_baseline) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Бенчмарк запросов к SQLite выгрузке до и после build_sqlite_indexes.
+
+Запуск:
+    python -m benchmarks.bench_sqlite_indexes --rows 1000000
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_csv_export import make_frame
+from etl.load import DEFAULT_SQLITE_INDEXES, build_sqlite_indexes
+
+QUERIES = {
+    'COUNT по Churn': "SELECT COUNT(*) FROM processed_data WHERE Churn = 'Yes'",
+    'Churn + Contract': (
+        "SELECT COUNT(*), AVG(MonthlyCharges) FROM processed_data "
+        "WHERE Churn = 'Yes' AND Contract = 'Month-to-month'"
+    ),
+    'GROUP BY Contract': "SELECT Contract, COUNT(*) FROM processed_data GROUP BY Contract",
+    'DISTINCT Contract': "SELECT DISTINCT Contract FROM processed_data",
+}
+
+
+def time_query(conn: sqlite3.Connection, sql: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(rows: int, repeat: int) -> None:
+    df = make_frame(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / 'bench.db')
+        df.to_sql('processed_data', conn, index=False, chunksize=10_000)
+
+        before = {name: time_query(conn, sql, repeat) for name, sql in QUERIES.items()}
+
+        start = time.perf_counter()
+        built = build_sqlite_indexes(conn, 'processed_data', DEFAULT_SQLITE_INDEXES)
+        build_time = time.perf_counter() - start
+
+        after = {name: time_query(conn, sql, repeat) for name, sql in QUERIES.items()}
+        conn.close()
+
+    print(f"\nSQLite: {rows:,} строк, индексы {built} построены за {build_time:.2f} сек\n")
+    print(f"{'запрос':24} {'без индекса, мс':>16} {'с индексом, мс':>16} {'ускорение':>10}")
+    print("-" * 70)
+    for name in QUERIES:
+        print(f"{name:24} {before[name] * 1000:16.2f} {after[name] * 1000:16.2f} "
+              f"{before[name] / after[name]:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк индексов SQLite")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Бенчмарк времени запуска CLI.
+
+Запускает короткие команды (--help, ошибка разбора аргументов) в
+отдельных процессах и сравнивает с пустым запуском интерпретатора.
+Дополнительно проверяет, что импорт CLI модулей не загружает тяжелые
+зависимости.
+
+Запуск:
+    python -m benchmarks.bench_startup --repeat 20
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    'python (пустой запуск)': [sys.executable, '-c', 'pass'],
+    'etl.main --help': [sys.executable, '-m', 'etl.main', '--help'],
+    'etl.main: ошибка аргументов': [sys.executable, '-m', 'etl.main', '--max-rows', 'x'],
+    'etl.query --help': [sys.executable, '-m', 'etl.query', '--help'],
+}
+
+CLI_MODULES = ('etl.main', 'etl.query', 'etl.check_database')
+HEAVY_MODULES = ('pandas', 'numpy', 'sqlalchemy', 'pyarrow')
+
+
+def time_command(command: list, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def heavy_imports(module: str) -> list:
+    """Тяжелые модули, загруженные импортом module (в отдельном процессе)."""
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    return [name for name in result.stdout.strip().split(',') if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк времени запуска CLI")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"\n{'команда':32} {'мин, мс':>9} {'медиана, мс':>12}")
+    print("-" * 56)
+    for name, command in COMMANDS.items():
+        timings = time_command(command, args.repeat)
+        print(f"{name:32} {min(timings) * 1000:9.1f} {statistics.median(timings) * 1000:12.1f}")
+
+    print("\nТяжелые зависимости при импорте:")
+    leaked = False
+    for module in CLI_MODULES:
+        loaded = heavy_imports(module)
+        leaked = leaked or bool(loaded)
+        print(f"  {module:24} {', '.join(loaded) if loaded else 'нет'}")
+
+    sys.exit(1 if leaked else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Детерминированный генератор данных в форме telco churn.
+
+Те же 21 столбец и реалистичные кардинальности, что у исходного датасета
+(7043 строк), плюс управляемая доля NULL, дубликатов и "грязных" строк
+(пробелы по краям, пустой TotalCharges у новых клиентов). Большие объемы
+пишутся в CSV чанками, поэтому 100M строк не требуют 100M строк в памяти.
+
+Запуск:
+    python -m benchmarks.synthetic --rows 1000000 --out data/synthetic/churn_1m.csv
+"""
+
+import argparse
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from etl.checkpoint import atomic_path
+
+CHUNK_ROWS = 1_000_000
+
+YES_NO = np.array(['No', 'Yes'])
+CONTRACTS = np.array(['Month-to-month', 'One year', 'Two year'])
+PAYMENT_METHODS = np.array([
+    'Electronic check', 'Mailed check',
+    'Bank transfer (automatic)', 'Credit card (automatic)',
+])
+INTERNET_SERVICES = np.array(['DSL', 'Fiber optic', 'No'])
+ADDON_SERVICES = [
+    'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+    'TechSupport', 'StreamingTV', 'StreamingMovies',
+]
+NULLABLE_COLUMNS = ['gender', 'Partner', 'Dependents', 'PaymentMethod', 'MonthlyCharges']
+
+
+def _customer_ids(rng: np.random.Generator, start: int, rows: int) -> np.ndarray:
+    """ID в формате '7590-VHVEG': номер + 5 случайных букв."""
+    numbers = np.char.zfill((np.arange(start, start + rows) % 10_000).astype(str), 4)
+    letters = rng.integers(ord('A'), ord('Z') + 1, size=(rows, 5), dtype=np.uint8)
+    suffixes = letters.view('S5').ravel().astype(str)
+    return np.char.add(np.char.add(numbers, '-'), suffixes)
+
+
+def generate_churn(rows: int,
+                   seed: int = 42,
+                   null_rate: float = 0.01,
+                   duplicate_rate: float = 0.005,
+                   messy_rate: float = 0.02,
+                   start: int = 0) -> pd.DataFrame:
+    """
+    Генерирует rows строк сырых данных (как их отдает extract()).
+
+    Args:
+        seed: при одинаковых seed и start результат одинаковый
+        null_rate: доля NULL в столбцах NULLABLE_COLUMNS
+        duplicate_rate: доля строк, заменяемых копиями других строк
+        messy_rate: доля строковых значений с пробелами по краям
+        start: порядковый номер первой строки (для генерации чанками)
+    """
+    rng = np.random.default_rng([seed, start])
+    pick = lambda values, p=None: values[rng.choice(len(values), size=rows, p=p)]
+
+    contract = pick(CONTRACTS, [0.55, 0.21, 0.24])
+    tenure_max = np.select([contract == 'Month-to-month', contract == 'One year'], [36, 60], 72)
+    tenure = (rng.beta(0.9, 1.3, rows) * tenure_max).astype(np.int64)
+
+    internet = pick(INTERNET_SERVICES, [0.34, 0.44, 0.22])
+    phone = pick(YES_NO, [0.1, 0.9])
+    multiple_lines = np.where(phone == 'No', 'No phone service', pick(YES_NO, [0.58, 0.42]))
+
+    base_charge = np.select([internet == 'Fiber optic', internet == 'DSL'], [70.0, 45.0], 20.0)
+    addons = {}
+    for column in ADDON_SERVICES:
+        has_addon = rng.random(rows) < 0.4
+        addons[column] = np.where(internet == 'No', 'No internet service', YES_NO[has_addon.astype(int)])
+        base_charge += np.where(addons[column] == 'Yes', 5.0, 0.0)
+    monthly = np.round(base_charge + rng.normal(0, 3, rows), 2).clip(18.25, 118.75)
+    total = np.round(monthly * tenure * rng.uniform(0.95, 1.05, rows), 2)
+    # Как в исходном файле: у клиентов с tenure=0 TotalCharges — пробел
+    total_str = np.where(tenure == 0, ' ', total.astype(str))
+
+    churn_p = np.select([contract == 'Month-to-month', contract == 'One year'], [0.42, 0.11], 0.03)
+    churn_p = churn_p + np.where(internet == 'Fiber optic', 0.08, 0.0) - np.minimum(tenure, 60) / 600
+    churn = YES_NO[(rng.random(rows) < churn_p.clip(0.01, 0.95)).astype(int)]
+
+    df = pd.DataFrame({
+        'customerID': _customer_ids(rng, start, rows),
+        'gender': pick(np.array(['Female', 'Male'])),
+        'SeniorCitizen': (rng.random(rows) < 0.16).astype(np.int64),
+        'Partner': pick(YES_NO, [0.52, 0.48]),
+        'Dependents': pick(YES_NO, [0.7, 0.3]),
+        'tenure': tenure,
+        'PhoneService': phone,
+        'MultipleLines': multiple_lines,
+        'InternetService': internet,
+        **addons,
+        'Contract': contract,
+        'PaperlessBilling': pick(YES_NO, [0.41, 0.59]),
+        'PaymentMethod': pick(PAYMENT_METHODS, [0.34, 0.23, 0.22, 0.21]),
+        'MonthlyCharges': monthly,
+        'TotalCharges': total_str,
+        'Churn': churn,
+    })
+
+    string_columns = df.select_dtypes(include='object').columns.drop('customerID')
+    for column in string_columns:
+        messy = rng.random(rows) < messy_rate
+        if messy.any():
+            df.loc[messy, column] = ' ' + df.loc[messy, column] + ' '
+
+    for column in NULLABLE_COLUMNS:
+        nulls = rng.random(rows) < null_rate
+        if nulls.any():
+            df.loc[nulls, column] = None
+
+    duplicates = int(rows * duplicate_rate)
+    if duplicates:
+        targets = rng.choice(rows, size=duplicates, replace=False)
+        sources = rng.choice(rows, size=duplicates)
+        df.iloc[targets] = df.iloc[sources].to_numpy()
+
+    return df
+
+
+def write_churn_csv(path: Union[str, Path], rows: int, seed: int = 42, **options) -> Path:
+    """
+    Пишет rows строк в CSV чанками по CHUNK_ROWS. Результат не зависит
+    от того, генерировался файл целиком или по частям.
+    """
+    path = Path(path)
+    with atomic_path(path) as tmp_path:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = generate_churn(min(CHUNK_ROWS, rows - start), seed=seed, start=start, **options)
+            chunk.to_csv(tmp_path, mode='a', header=(start == 0), index=False)
+    return path
+
+
+def parse_size(value: str) -> int:
+    """'10k' → 10000, '1m' → 1000000, '100M' → 100000000."""
+    value = value.strip().lower().replace('_', '')
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    if value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетических churn данных")
+    parser.add_argument('--rows', type=parse_size, default=10_000, help='10k, 1m, 100m, ...')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--null-rate', type=float, default=0.01)
+    parser.add_argument('--duplicate-rate', type=float, default=0.005)
+    parser.add_argument('--messy-rate', type=float, default=0.02)
+    parser.add_argument('--out', type=str, default=None,
+                        help='Путь к CSV (по умолчанию: data/synthetic/churn_<rows>.csv)')
+    args = parser.parse_args()
+
+    out = args.out or f"data/synthetic/churn_{args.rows}.csv"
+    path = write_churn_csv(
+        out, args.rows, seed=args.seed,
+        null_rate=args.null_rate,
+        duplicate_rate=args.duplicate_rate,
+        messy_rate=args.messy_rate,
+    )
+    print(f"✓ Сгенерировано {args.rows:,} строк: {path} "
+          f"({path.stat().st_size / 1024 / 1024:.1f} МБ)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,22 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+
 import pandas as pd
 
+from etl.csv_export import PYARROW_AVAILABLE
+
+# Кандидаты адаптивного режима: (формат, кодек)
+FORMAT_CANDIDATES = [
+    ('Feather', 'uncompressed'), ('Feather', 'lz4'), ('Feather', 'zstd'),
+    ('Parquet', 'snappy'), ('Parquet', 'zstd'), ('Parquet', 'gzip'),
+    ('CSV', None), ('Pickle', None),
+]
+FORMAT_EXTENSIONS = {'Feather': '.feather', 'Parquet': '.parquet', 'CSV': '.csv', 'Pickle': '.pkl'}
+# Notebooks/EDA.ipynb читает dataset_cleaned.csv
+REQUIRED_FORMATS = ('CSV',)
+
 
 def main():
     print("Загрузка датасета из Google Drive...")
@@ -132,9 +149,102 @@ def detect_date_columns(df):
     return date_columns
 
 
-def save_dataset(df):
+def write_format(df, format_name, codec, path):
+    """Запись df в формат format_name с кодеком codec"""
+    if format_name == 'Feather':
+        df.to_feather(path, compression=codec)
+    elif format_name == 'Parquet':
+        df.to_parquet(path, index=False, compression=codec)
+    elif format_name == 'CSV':
+        # pandas, а не write_csv_arrow: формат CSV читают ноутбук и партнеры
+        df.to_csv(path, index=False, encoding='utf-8')
+    elif format_name == 'Pickle':
+        df.to_pickle(path)
+    else:
+        raise ValueError(f"Неизвестный формат: {format_name}")
+
+
+def read_format(format_name, path):
+    readers = {
+        'Feather': pd.read_feather,
+        'Parquet': pd.read_parquet,
+        'CSV': pd.read_csv,
+        'Pickle': pd.read_pickle,
+    }
+    return readers[format_name](path)
+
+
+def benchmark_formats(sample, candidates=None, repeat=3):
+    """
+    Замер записи, чтения и размера файла для каждого кандидата на
+    выборке sample. Время — минимум из repeat повторов.
+    """
+    if candidates is None:
+        candidates = [c for c in FORMAT_CANDIDATES if PYARROW_AVAILABLE or c[0] in ('CSV', 'Pickle')]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for format_name, codec in candidates:
+            path = Path(tmp) / f"sample_{format_name}_{codec}{FORMAT_EXTENSIONS[format_name]}"
+            write_times, read_times = [], []
+            try:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    write_format(sample, format_name, codec, path)
+                    write_times.append(time.perf_counter() - start)
+
+                    start = time.perf_counter()
+                    read_format(format_name, path)
+                    read_times.append(time.perf_counter() - start)
+            except Exception as e:
+                print(f"  {format_name}/{codec}: пропущен ({e})")
+                continue
+
+            results.append({
+                'format': format_name,
+                'codec': codec,
+                'write_seconds': min(write_times),
+                'read_seconds': min(read_times),
+                'size_bytes': path.stat().st_size,
+            })
+    return results
+
+
+def choose_format(results, objective='balanced'):
+    """
+    Выбор лучшего кандидата.
+
+    objective: 'speed' — минимум записи + чтения, 'size' — минимум
+    размера, 'balanced' — минимум среднего геометрического записи,
+    чтения и размера, нормированных на лучшие значения.
+    """
+    best = {key: max(min(r[key] for r in results), 1e-9)
+            for key in ('write_seconds', 'read_seconds', 'size_bytes')}
+    for r in results:
+        if objective == 'speed':
+            r['score'] = r['write_seconds'] + r['read_seconds']
+        elif objective == 'size':
+            r['score'] = r['size_bytes']
+        elif objective == 'balanced':
+            r['score'] = (
+                r['write_seconds'] / best['write_seconds']
+                * r['read_seconds'] / best['read_seconds']
+                * r['size_bytes'] / best['size_bytes']
+            ) ** (1 / 3)
+        else:
+            raise ValueError(f"Неизвестный критерий: {objective}")
+    return min(results, key=lambda r: r['score'])
+
+
+def save_dataset(df, mode='adaptive', required=REQUIRED_FORMATS, objective='balanced',
+                 sample_rows=50_000, report_path='dataset_cleaned.format.json'):
     """
     Функция для сохранения DataFrame в подходящий формат
+
+    mode='adaptive' замеряет форматы и кодеки на выборке из df и пишет
+    только обязательные форматы (required) и лучший по objective;
+    причина выбора и замеры сохраняются в report_path.
+    mode='all' — прежнее поведение: сохранение во всех форматах.
     """
     print("\n" + "=" * 60)
     print("СОХРАНЕНИЕ ДАТАСЕТА:")
@@ -147,6 +257,60 @@ def save_dataset(df):
     print(f"Размер датасета: {num_rows} строк × {num_cols} колонок")
     print(f"Память: {memory_usage:.2f} МБ")
 
+    if mode == 'all':
+        save_all_formats(df, num_rows, memory_usage)
+        return
+    if mode != 'adaptive':
+        raise ValueError(f"Неизвестный режим: {mode}")
+
+    sample = df.sample(n=sample_rows, random_state=0) if num_rows > sample_rows else df
+    print(f"\nЗамер форматов на выборке {len(sample)} строк:")
+    results = benchmark_formats(sample)
+    best = choose_format(results, objective)
+
+    print(f"  {'формат':22} {'запись, с':>10} {'чтение, с':>10} {'размер, МБ':>11} {'оценка':>9}")
+    for r in sorted(results, key=lambda r: r['score']):
+        name = f"{r['format']}/{r['codec']}" if r['codec'] else r['format']
+        print(f"  {name:22} {r['write_seconds']:10.4f} {r['read_seconds']:10.4f} "
+              f"{r['size_bytes'] / 1024 / 1024:11.3f} {r['score']:9.3g}")
+
+    best_name = f"{best['format']}/{best['codec']}" if best['codec'] else best['format']
+    reason = (
+        f"{best_name}: лучший по критерию '{objective}' на выборке {len(sample)} строк "
+        f"(запись {best['write_seconds']:.4f} с, чтение {best['read_seconds']:.4f} с, "
+        f"{best['size_bytes'] / 1024 / 1024:.3f} МБ)"
+    )
+
+    to_write = [(format_name, None) for format_name in required if format_name != best['format']]
+    to_write.append((best['format'], best['codec']))
+
+    formats = []
+    for format_name, codec in to_write:
+        filename = f"dataset_cleaned{FORMAT_EXTENSIONS[format_name]}"
+        write_format(df, format_name, codec, filename)
+        formats.append({'format': format_name, 'codec': codec, 'file': filename,
+                        'required': format_name in required})
+        print(f"✓ Сохранено в {format_name}: {filename}")
+
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'rows': num_rows,
+            'sample_rows': len(sample),
+            'objective': objective,
+            'chosen': {'format': best['format'], 'codec': best['codec']},
+            'reason': reason,
+            'written': formats,
+            'measurements': results,
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"\nРекомендуемый формат для работы: {reason}")
+    print(f"Замеры и причина выбора: {report_path}")
+
+
+def save_all_formats(df, num_rows, memory_usage):
+    """
+    Прежний режим: Feather, CSV, Pickle и Parquet для больших датасетов
+    """
     # Сохраняем в нескольких форматах
     formats = []
 
@@ -165,7 +329,7 @@ def save_dataset(df):
 
     # 3. CSV (универсальный формат)
     csv_file = "dataset_cleaned.csv"
-    df.to_csv(csv_file, index=False, encoding='utf-8')
+    write_format(df, 'CSV', None, csv_file)
     formats.append(("CSV", csv_file))
     print(f"✓ Сохранено в CSV: {csv_file}")
 
@@ -0,0 +1,216 @@
+"""
+Предрасчитанные агрегаты (кубы) для EDA и дашбордов.
+
+Этап AGGREGATE считает после трансформации небольшие таблицы:
+количество строк и долю оттока по каждому столбцу с малым числом
+значений и по интервалам tenure, гистограммы числовых столбцов,
+describe(), матрицу корреляций и количество NULL. LOAD сохраняет их
+в SQLite (таблицы cube_<имя> рядом с processed_data) и в Parquet
+(data/processed/cubes/<имя>.parquet). Ноутбук и дашборды читают
+кубы через read_cube за миллисекунды вместо прохода по всем строкам.
+"""
+
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from etl.checkpoint import atomic_path
+from etl.derive import bucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CUBES_DIR = 'data/processed/cubes'
+CUBE_TABLE_PREFIX = 'cube_'
+
+# Интервалы tenure (месяцы) для куба by_tenure_bucket
+TENURE_BUCKETS = (0, 12, 24, 36, 48, 60, 72)
+
+TARGET_VALUES = {'yes': 1.0, 'no': 0.0, 'true': 1.0, 'false': 0.0, '1': 1.0, '0': 0.0}
+
+
+def target_flags(series: pd.Series) -> Optional[pd.Series]:
+    """
+    Целевой столбец как 0/1 (NaN для пропусков) или None, если столбец
+    не бинарный ('Yes'/'No', True/False, 0/1).
+    """
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        flags = series.astype(float)
+    else:
+        flags = series.astype(object).map(
+            lambda value: TARGET_VALUES.get(str(value).strip().lower()) if pd.notna(value) else np.nan
+        ).astype(float)
+        # Значение вне словаря — не бинарный столбец
+        if flags.isna().sum() != series.isna().sum():
+            return None
+    if not set(flags.dropna().unique()) <= {0.0, 1.0}:
+        return None
+    return flags
+
+
+def is_low_cardinality(series: pd.Series, max_categories: int) -> bool:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return True
+    if pd.api.types.is_bool_dtype(series):
+        return True
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        return series.nunique() <= max_categories
+    return False
+
+
+def group_cube(keys: pd.Series, flags: Optional[pd.Series]) -> pd.DataFrame:
+    """Строки, доля и (если есть цель) отток по значениям keys, NULL — отдельной группой."""
+    frame = pd.DataFrame({'value': keys.to_numpy()})
+    if flags is not None:
+        frame['churned'] = flags.to_numpy()
+
+    grouped = frame.groupby('value', dropna=False, observed=False, sort=True)
+    cube = grouped.size().rename('rows').to_frame()
+    if flags is not None:
+        cube['churned'] = grouped['churned'].sum()
+        cube['churn_rate'] = grouped['churned'].mean()
+    cube = cube.reset_index()
+
+    cube['share'] = cube['rows'] / max(len(keys), 1)
+    cube['value'] = cube['value'].astype(object).where(cube['value'].notna(), None)
+    cube['value'] = cube['value'].map(lambda value: None if value is None else str(value))
+    columns = ['value', 'rows', 'share'] + (['churned', 'churn_rate'] if flags is not None else [])
+    return cube[columns]
+
+
+def tenure_buckets(tenure: pd.Series) -> pd.Series:
+    """Интервалы '0-12', '12-24', ..., '72+' (включая правую границу)."""
+    return bucket(tenure, TENURE_BUCKETS)
+
+
+def histogram_cube(series: pd.Series, bins: int) -> pd.DataFrame:
+    values = series.dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return pd.DataFrame({'bin_left': [], 'bin_right': [], 'rows': []})
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({'bin_left': edges[:-1], 'bin_right': edges[1:], 'rows': counts})
+
+
+def build_cubes(df: pd.DataFrame,
+                target: str = 'Churn',
+                max_categories: int = 20,
+                bins: int = 20) -> Dict[str, pd.DataFrame]:
+    """
+    Считает кубы по датасету.
+
+    Args:
+        df: данные после transform
+        target: бинарный целевой столбец для доли оттока (если его нет
+            или он не бинарный, кубы содержат только количество строк)
+        max_categories: максимум значений у текстового столбца, чтобы
+            по нему строился куб by_<столбец> (category — всегда)
+        bins: количество интервалов гистограмм
+
+    Returns:
+        {имя куба: DataFrame}: summary, nulls, describe, corr,
+        by_<столбец>, by_tenure_bucket, hist_<столбец>
+    """
+    flags = target_flags(df[target]) if target in df.columns else None
+    numeric = df.select_dtypes(include='number')
+
+    cubes = {}
+    cubes['summary'] = pd.DataFrame({
+        'metric': ['rows', 'columns', 'duplicates', 'null_cells', 'churn_rate'],
+        'value': [
+            float(len(df)),
+            float(df.shape[1]),
+            float(df.duplicated().sum()),
+            float(df.isna().sum().sum()),
+            float(flags.mean()) if flags is not None else np.nan,
+        ],
+    })
+
+    nulls = df.isna().sum()
+    cubes['nulls'] = pd.DataFrame({
+        'column': nulls.index,
+        'nulls': nulls.to_numpy(),
+        'null_share': nulls.to_numpy() / max(len(df), 1),
+        'dtype': [str(dtype) for dtype in df.dtypes],
+    })
+
+    if not numeric.empty:
+        cubes['describe'] = numeric.describe().T.rename_axis('column').reset_index()
+        cubes['corr'] = numeric.corr().rename_axis('column').reset_index()
+
+    for column in df.columns:
+        if is_low_cardinality(df[column], max_categories):
+            cubes[f"by_{column}"] = group_cube(df[column], flags)
+
+    if 'tenure' in df.columns:
+        cubes['by_tenure_bucket'] = group_cube(tenure_buckets(df['tenure']), flags)
+
+    for column in numeric.columns:
+        cubes[f"hist_{column}"] = histogram_cube(numeric[column], bins)
+
+    return cubes
+
+
+def load_cubes(cubes: Dict[str, pd.DataFrame],
+               sqlite_db_path: Optional[str] = None,
+               parquet_dir: Optional[str] = DEFAULT_CUBES_DIR) -> bool:
+    """
+    Сохраняет кубы в SQLite (таблицы cube_<имя>) и/или Parquet
+    (<parquet_dir>/<имя>.parquet). Прежние кубы, которых нет в cubes,
+    удаляются; файлы Parquet заменяются атомарно.
+    """
+    try:
+        if sqlite_db_path:
+            Path(sqlite_db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(sqlite_db_path)
+            try:
+                stale = conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?",
+                    (f"{CUBE_TABLE_PREFIX}%",)
+                ).fetchall()
+                for (name,) in stale:
+                    conn.execute(f'DROP TABLE "{name}"')
+                conn.commit()
+                for name, cube in cubes.items():
+                    cube.to_sql(f"{CUBE_TABLE_PREFIX}{name}", conn, index=False)
+            finally:
+                conn.close()
+            print(f"✓ Кубы в SQLite: {len(cubes)} таблиц {CUBE_TABLE_PREFIX}* в {sqlite_db_path}")
+
+        if parquet_dir:
+            out_dir = Path(parquet_dir)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            for name, cube in cubes.items():
+                with atomic_path(out_dir / f"{name}.parquet") as tmp_path:
+                    cube.to_parquet(tmp_path, index=False)
+            for stale in out_dir.glob('*.parquet'):
+                if stale.stem not in cubes:
+                    stale.unlink()
+            print(f"✓ Кубы в Parquet: {len(cubes)} файлов в {out_dir}")
+
+        logger.info(f"✓ Сохранено кубов: {len(cubes)}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении кубов: {e}")
+        print(f"❌ Ошибка сохранения кубов: {e}")
+        return False
+
+
+def read_cube(name: str, source: Union[str, Path] = DEFAULT_CUBES_DIR) -> pd.DataFrame:
+    """
+    Читает куб: source — папка с Parquet или файл SQLite БД.
+
+        read_cube('by_Contract')
+        read_cube('corr', 'data/processed/data.db')
+    """
+    source = Path(source)
+    if source.is_dir():
+        return pd.read_parquet(source / f"{name}.parquet")
+    conn = sqlite3.connect(source)
+    try:
+        return pd.read_sql_query(f'SELECT * FROM "{CUBE_TABLE_PREFIX}{name}"', conn)
+    finally:
+        conn.close()
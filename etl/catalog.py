@@ -0,0 +1,157 @@
+"""
+Каталог метаданных загруженных таблиц SQLite.
+
+Этап LOAD записывает в таблицу etl_catalog количество строк, схему,
+статистику столбцов (посчитанную при валидации), время загрузки и
+отпечатки источника и данных. Команды инспекции читают каталог
+вместо COUNT(*) и describe() по таблице.
+
+Таблица, которую режим --watch собирает из файлов (частей), имеет
+запись с общим числом строк без статистики и по записи на каждую
+часть (<таблица>#<часть>) со статистикой и отпечатками ее файла.
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CATALOG_TABLE = 'etl_catalog'
+
+# Разделитель имени таблицы и части в ключе записи каталога
+PARTITION_SEPARATOR = '#'
+
+
+def catalog_key(table_name: str, partition: Optional[str] = None) -> str:
+    """Ключ записи каталога: имя таблицы или <таблица>#<часть>."""
+    return f"{table_name}{PARTITION_SEPARATOR}{partition}" if partition else table_name
+
+
+def frame_fingerprint(df: 'pd.DataFrame') -> str:
+    """Отпечаток содержимого DataFrame (векторизованный хеш строк)."""
+    import pandas as pd
+
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    return f"{int(row_hashes.sum()) & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+def ensure_catalog(conn: sqlite3.Connection) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL,
+            source_rows INTEGER,
+            columns TEXT NOT NULL,
+            column_stats TEXT,
+            loaded_at TEXT NOT NULL,
+            source_fingerprint TEXT,
+            data_fingerprint TEXT
+        )
+    """)
+
+
+def write_catalog(conn: sqlite3.Connection,
+                  table_name: str,
+                  df: Optional['pd.DataFrame'],
+                  row_count: int,
+                  column_stats: Optional[dict] = None,
+                  source_fingerprint: Optional[str] = None,
+                  source_rows: Optional[int] = None,
+                  commit: bool = True,
+                  partition: Optional[str] = None) -> None:
+    """
+    Записывает (заменяет) запись каталога для таблицы.
+
+    Args:
+        df: загруженные строки, по ним считается отпечаток данных
+            (None — таблица из частей, отпечатки у записей частей)
+        row_count: количество строк в таблице (в части при partition)
+        column_stats: статистика из validate.validate_dataset
+            (по всему датасету, а не только по загруженным строкам)
+        source_rows: количество строк в датасете до ограничения max_rows
+        commit: False — запись остается в открытой транзакции вызывающего
+            (подмена таблицы и каталог фиксируются вместе)
+        partition: часть таблицы (исходный файл режима --watch)
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = [{'name': col[1], 'type': col[2]} for col in cursor.fetchall()]
+
+    ensure_catalog(conn)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {CATALOG_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            catalog_key(table_name, partition),
+            row_count,
+            source_rows,
+            json.dumps(columns, ensure_ascii=False),
+            json.dumps(column_stats, ensure_ascii=False) if column_stats else None,
+            datetime.now().isoformat(timespec='seconds'),
+            source_fingerprint,
+            frame_fingerprint(df) if df is not None else None,
+        )
+    )
+    if commit:
+        conn.commit()
+
+
+def _catalog_entries(conn: sqlite3.Connection, where: str, params: tuple) -> List[dict]:
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+        (CATALOG_TABLE,)
+    )
+    if cursor.fetchone() is None:
+        return []
+
+    cursor.execute(f"SELECT * FROM {CATALOG_TABLE} WHERE {where} ORDER BY table_name", params)
+    entries = []
+    for row in cursor.fetchall():
+        entry = dict(zip([d[0] for d in cursor.description], row))
+        entry['columns'] = json.loads(entry['columns'])
+        entry['column_stats'] = json.loads(entry['column_stats']) if entry['column_stats'] else {}
+        entries.append(entry)
+    return entries
+
+
+def clear_partition_catalogs(conn: sqlite3.Connection, table_name: str) -> None:
+    """
+    Удаляет записи частей таблицы (после загрузки таблицы целиком).
+    Изменения не фиксируются.
+    """
+    ensure_catalog(conn)
+    prefix = table_name + PARTITION_SEPARATOR
+    conn.execute(f"DELETE FROM {CATALOG_TABLE} WHERE substr(table_name, 1, ?) = ?",
+                 (len(prefix), prefix))
+
+
+def read_catalog(conn: sqlite3.Connection, table_name: str) -> Optional[dict]:
+    """Запись каталога для таблицы или None, если каталога/записи нет."""
+    entries = _catalog_entries(conn, "table_name = ?", (table_name,))
+    return entries[0] if entries else None
+
+
+def read_partition_catalogs(conn: sqlite3.Connection, table_name: str) -> List[dict]:
+    """Записи каталога частей таблицы (с ключом 'partition'), по имени части."""
+    prefix = table_name + PARTITION_SEPARATOR
+    entries = _catalog_entries(conn, "substr(table_name, 1, ?) = ?", (len(prefix), prefix))
+    for entry in entries:
+        entry['partition'] = entry['table_name'][len(prefix):]
+    return entries
+
+
+def format_column_stats(column_stats: dict) -> str:
+    """Таблица числовой статистики из каталога в формате describe()."""
+    numeric = {
+        col: {key: stats[key] for key in ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']}
+        for col, stats in column_stats.items()
+        if 'mean' in stats
+    }
+    if not numeric:
+        return ""
+    import pandas as pd
+
+    return pd.DataFrame(numeric).to_string()
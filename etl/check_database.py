@@ -3,13 +3,19 @@
 """
 
 import sqlite3
-import pandas as pd
 from pathlib import Path
 
+from etl.catalog import CATALOG_TABLE, format_column_stats, read_catalog, read_partition_catalogs
+from etl.sqlite_compact import is_storage_table
+
 
 def check_sqlite_database(db_path: str = 'data/processed/data.db') -> None:
     """
     Проверяет содержимое SQLite базы данных
+
+    Для таблиц, загруженных через ETL, схема, количество строк и
+    статистика читаются из каталога etl_catalog без сканирования таблицы.
+    Для таблицы из частей (режим --watch) статистика выводится по каждой части.
     """
     if not Path(db_path).exists():
         print(f"❌ БД не найдена: {db_path}")
@@ -22,34 +28,59 @@ def check_sqlite_database(db_path: str = 'data/processed/data.db') -> None:
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    # Получаем список всех таблиц
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = cursor.fetchall()
+    # Получаем список всех таблиц (компактная выгрузка — представление
+    # над служебными таблицами кодов и словарей, они не показываются)
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+        "AND name NOT LIKE 'sqlite_%' AND name != ?;",
+        (CATALOG_TABLE,)
+    )
+    tables = [table for table in cursor.fetchall() if not is_storage_table(table[0])]
 
     if not tables:
         print("❌ В БД нет таблиц")
         conn.close()
         return
 
+    import pandas as pd
+
     for table in tables:
         table_name = table[0]
         print(f"📋 Таблица: {table_name}")
         print(f"{'-' * 70}")
 
+        entry = read_catalog(conn, table_name)
+        parts = read_partition_catalogs(conn, table_name)
+
         # Информация о таблице
-        cursor.execute(f"PRAGMA table_info({table_name});")
-        columns = cursor.fetchall()
+        if entry:
+            columns = [(col['name'], col['type'], None) for col in entry['columns']]
+        else:
+            cursor.execute(f"PRAGMA table_info({table_name});")
+            columns = [(col[1], col[2], col[3]) for col in cursor.fetchall()]
 
         print(f"Столбцы ({len(columns)}):")
-        for col in columns:
-            col_id, col_name, col_type, not_null, default_val, primary_key = col
-            nullable = "NOT NULL" if not_null else "NULL"
-            print(f"  • {col_name} ({col_type}) {nullable}")
+        for col_name, col_type, not_null in columns:
+            if not_null is None:
+                print(f"  • {col_name} ({col_type})")
+            else:
+                nullable = "NOT NULL" if not_null else "NULL"
+                print(f"  • {col_name} ({col_type}) {nullable}")
 
         # Количество строк
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
-        row_count = cursor.fetchone()[0]
-        print(f"\nКоличество строк: {row_count}\n")
+        if entry:
+            row_count = entry['row_count']
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
+            row_count = cursor.fetchone()[0]
+        print(f"\nКоличество строк: {row_count}")
+        if entry:
+            print(f"Загружено: {entry['loaded_at']}")
+        for part in parts or ([entry] if entry else []):
+            label = f"  {part['partition']}: {part['row_count']} строк, " if parts else ""
+            print(f"{label}Отпечаток источника: {part['source_fingerprint']}, "
+                  f"данных: {part['data_fingerprint']}")
+        print()
 
         # Первые 10 строк
         print(f"Первые 10 строк:")
@@ -58,10 +89,19 @@ def check_sqlite_database(db_path: str = 'data/processed/data.db') -> None:
         print()
 
         # Статистика
-        print(f"Статистика:")
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-        if len(numeric_cols) > 0:
-            print(df[numeric_cols].describe().to_string())
+        if parts:
+            for part in parts:
+                print(f"Статистика части {part['partition']} "
+                      f"(по {part['source_rows']} строкам файла, из каталога):")
+                print(format_column_stats(part['column_stats']))
+        elif entry and entry['column_stats']:
+            print(f"Статистика (по {entry['source_rows']} строкам датасета, из каталога):")
+            print(format_column_stats(entry['column_stats']))
+        else:
+            print(f"Статистика (по первым 10 строкам, каталога нет):")
+            numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
+            if len(numeric_cols) > 0:
+                print(df[numeric_cols].describe().to_string())
         print(f"\n{'=' * 70}\n")
 
     conn.close()
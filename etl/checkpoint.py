@@ -0,0 +1,209 @@
+"""
+Чекпоинты ETL процесса и атомарная публикация файлов.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+DEFAULT_STATE_PATH = 'data/processed/.etl_state.json'
+
+# Сколько ждать ответа Google Drive при проверке версии файла, секунды
+DRIVE_PROBE_TIMEOUT = 5.0
+
+# Куда скачиваются файлы Google Drive перед чтением
+DRIVE_DOWNLOAD_DIR = Path('data/raw/drive')
+
+# Файлы Google Drive, скачанные для отпечатка и еще не прочитанные extract
+_DRIVE_DOWNLOADS: Dict[str, Path] = {}
+
+
+@contextmanager
+def atomic_path(target: Union[str, Path]):
+    """
+    Отдает временный путь в той же папке, что и target.
+    После успешной записи файл атомарно переименовывается в target,
+    при ошибке временный файл удаляется, а target остается прежним.
+    """
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    # Суффиксы сохраняем, чтобы pandas/pyarrow правильно определяли сжатие
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{target.name}.tmp-",
+        suffix=''.join(target.suffixes),
+        dir=target.parent
+    )
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+
+    try:
+        yield tmp_path
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def drive_download_url(file_id: str) -> str:
+    """Адрес скачивания файла с Google Drive."""
+    return f"https://drive.google.com/uc?id={file_id}&export=download"
+
+
+def drive_file_version(file_id: str, timeout: float = DRIVE_PROBE_TIMEOUT) -> Optional[str]:
+    """
+    Версия файла на Google Drive без скачивания: валидаторы ETag и
+    Last-Modified ответа на HEAD запрос. None, если Drive недоступен или
+    не вернул валидаторов (Content-Length и прочие заголовки ответа
+    меняются между запросами и версией не считаются).
+    """
+    from urllib.error import URLError
+    from urllib.request import Request, urlopen
+
+    request = Request(drive_download_url(file_id), method='HEAD')
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            headers = [response.headers.get(name) for name in ('ETag', 'Last-Modified')]
+    except (URLError, OSError, ValueError):
+        return None
+    return '|'.join(value or '' for value in headers) if any(headers) else None
+
+
+def download_drive_file(file_id: str, keep: bool = False) -> Path:
+    """
+    Скачивает файл с Google Drive в DRIVE_DOWNLOAD_DIR и возвращает путь.
+
+    keep=True оставляет файл для следующего вызова в этом процессе:
+    source_fingerprint считает отпечаток по содержимому, и extract
+    читает тот же файл без повторного скачивания.
+    """
+    path = _DRIVE_DOWNLOADS.pop(file_id, None)
+    if path is None or not path.exists():
+        from urllib.request import urlopen
+
+        path = DRIVE_DOWNLOAD_DIR / f"{file_id}.csv"
+        with atomic_path(path) as tmp_path:
+            with urlopen(drive_download_url(file_id)) as response, open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(response, f)
+    if keep:
+        _DRIVE_DOWNLOADS[file_id] = path
+    return path
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """SHA-256 содержимого файла (читается блоками)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(input_file: Optional[str] = None,
+                       google_drive_id: Optional[str] = None) -> str:
+    """
+    Отпечаток источника: путь + размер + mtime для локального файла,
+    ID и версия (drive_file_version) файла на Google Drive. Если Drive
+    не вернул валидаторов, файл скачивается и в отпечаток идет хеш его
+    содержимого (extract затем читает скачанный файл). Если не удалось
+    и скачать, отпечаток — только ID, и закешированный EXTRACT может
+    быть устаревшим: об этом печатается предупреждение.
+    """
+    parts = {'google_drive_id': google_drive_id}
+
+    if google_drive_id:
+        version = drive_file_version(google_drive_id)
+        if version is not None:
+            parts['drive_version'] = version
+        else:
+            from urllib.error import URLError
+            try:
+                parts['drive_digest'] = file_digest(download_drive_file(google_drive_id, keep=True))
+            except (URLError, OSError, ValueError):
+                print("⚠ Не удалось проверить версию файла на Google Drive: результат EXTRACT "
+                      "из кеша может быть устаревшим, обновить — --from-stage extract\n")
+
+    if input_file:
+        path = Path(input_file).resolve()
+        parts['input_file'] = str(path)
+        if path.exists():
+            stat = path.stat()
+            parts['size'] = stat.st_size
+            parts['mtime_ns'] = stat.st_mtime_ns
+
+    raw = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class LoadCheckpoint:
+    """
+    Состояние загрузки, сохраняемое в небольшом JSON файле.
+
+    Для каждого синка хранит количество закоммиченных строк, чтобы
+    повторный запуск продолжил работу с последнего закоммиченного чанка.
+    run_key — ключ этапа LOAD в графе (etl.pipeline): он меняется вместе
+    с данными и параметрами загрузки, и тогда состояние сбрасывается.
+    Сами данные для повторного запуска берутся из кеша этапов.
+    """
+
+    def __init__(self, run_key: str, state_path: Union[str, Path] = DEFAULT_STATE_PATH):
+        self.run_key = run_key
+        self.state_path = Path(state_path)
+        self.state = self._read()
+
+    def _read(self) -> dict:
+        if self.state_path.exists():
+            try:
+                state = json.loads(self.state_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                state = {}
+            if state.get('run_key') == self.run_key:
+                return state
+
+        return {'run_key': self.run_key, 'sinks': {}}
+
+    def save(self) -> None:
+        """Атомарно сохраняет файл состояния."""
+        self.state['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        with atomic_path(self.state_path) as tmp_path:
+            tmp_path.write_text(
+                json.dumps(self.state, ensure_ascii=False, indent=2),
+                encoding='utf-8'
+            )
+
+    def _sink(self, sink: str, target: str) -> dict:
+        entry = self.state['sinks'].get(sink)
+        if entry is None or entry.get('target') != target:
+            entry = {'target': target, 'rows': 0, 'chunks': 0, 'done': False}
+            self.state['sinks'][sink] = entry
+        return entry
+
+    def is_done(self, sink: str, target: str) -> bool:
+        return self._sink(sink, target)['done']
+
+    def committed_rows(self, sink: str, target: str) -> int:
+        return self._sink(sink, target)['rows']
+
+    def commit_chunk(self, sink: str, target: str, rows: int) -> None:
+        """Фиксирует, что первые rows строк синка закоммичены."""
+        entry = self._sink(sink, target)
+        entry['rows'] = rows
+        entry['chunks'] += 1
+        self.save()
+
+    def mark_done(self, sink: str, target: str) -> None:
+        self._sink(sink, target)['done'] = True
+        self.save()
+
+    def clear(self) -> None:
+        """Удаляет файл состояния."""
+        if self.state_path.exists():
+            self.state_path.unlink()
+        self.state = {'run_key': self.run_key, 'sinks': {}}
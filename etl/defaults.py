@@ -0,0 +1,18 @@
+"""
+Значения по умолчанию, нужные CLI до запуска этапов.
+
+Модуль не импортирует pandas, SQLAlchemy и pyarrow: `python -m etl.main
+--help` и разбор аргументов не должны платить за загрузку тяжелых
+зависимостей.
+"""
+
+# Индексы processed_data по умолчанию: аналитики чаще всего фильтруют
+# по оттоку и типу контракта. Отсутствующие в датасете столбцы пропускаются.
+DEFAULT_SQLITE_INDEXES = ('Churn, Contract', 'Contract')
+
+# Столбец индекса точечного поиска (etl.key_index), --key-index без значения
+DEFAULT_KEY_COLUMN = 'customerID'
+
+STAGE_NAMES = ('extract', 'transform', 'validate', 'aggregate', 'load')
+
+PROFILE_MODES = ('cpu', 'memory', 'both')
@@ -0,0 +1,339 @@
+"""
+Производные столбцы, заданные конфигурацией.
+
+Конфигурация — словарь {имя: выражение} или {имя: {"expr": ...,
+"dtype": ..., "keep": false}} (в CLI — JSON файл, --derived).
+Выражение — подмножество Python: арифметика, сравнения, and/or/not,
+столбцы по имени (или в `обратных кавычках`), числа, строки, списки и
+функции из FUNCTIONS. Каждое выражение один раз компилируется в
+функцию над столбцами из векторных операций numpy/pandas (без apply
+по строкам). По ссылкам между столбцами строится порядок вычисления;
+столбцы с keep=false вычисляются, только если от них зависит
+сохраняемый столбец, и в результат не попадают. Строки обрабатываются
+чанками по DERIVE_CHUNK_ROWS: промежуточные массивы выражения занимают
+память по размеру чанка, а не всего датасета.
+
+Пример конфигурации:
+    {
+      "TotalChargesNum": {"expr": "to_number(TotalCharges)", "dtype": "float32"},
+      "avg_charge": {"expr": "TotalChargesNum / where(tenure > 0, tenure, nan)", "keep": false},
+      "high_avg_charge": "avg_charge > 70",
+      "tenure_bucket": "bucket(tenure, [0, 12, 24, 36, 48, 60, 72])",
+      "is_monthly": "Contract == 'Month-to-month' and PaperlessBilling == 'Yes'"
+    }
+"""
+
+import ast
+import operator
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Строк в чанке вычисления
+DERIVE_CHUNK_ROWS = 65_536
+
+DerivedConfig = Dict[str, Union[str, dict]]
+
+
+NUMBER_PATTERN = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+
+
+def to_number(values) -> pd.Series:
+    """
+    Число или NaN (пустые строки и текст → NaN). Строки в Arrow
+    (str в pandas 3) разбираются функциями pyarrow.compute, в несколько
+    раз быстрее pd.to_numeric.
+    """
+    series = pd.Series(values)
+    if type(series.array).__name__ == 'ArrowStringArray':
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        strings = pa.array(series.array)
+        numbers = pc.if_else(pc.match_substring_regex(strings, NUMBER_PATTERN), strings, None)
+        parsed = pc.cast(pc.utf8_trim_whitespace(numbers), pa.float64())
+        return pd.Series(parsed.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+    return pd.to_numeric(series, errors='coerce').astype('float64')
+
+
+def bucket(values, edges: Sequence[float], labels: Optional[Sequence[str]] = None) -> pd.Series:
+    """
+    Интервалы (lo, hi] c включенной левой границей первого:
+    '0-12', '12-24', ..., последний — открытый '72+'.
+    """
+    edges = list(edges)
+    if labels is None:
+        labels = [f"{lo}-{hi}" for lo, hi in zip(edges, edges[1:])] + [f"{edges[-1]}+"]
+    return pd.cut(pd.to_numeric(pd.Series(values), errors='coerce'), bins=edges + [np.inf],
+                  labels=list(labels), include_lowest=True)
+
+
+def where(condition, if_true, if_false):
+    # NULL в условии считается ложью
+    return np.where(pd.Series(condition).fillna(False).to_numpy(dtype=bool), if_true, if_false)
+
+
+def fillna(values, fill):
+    return pd.Series(values).fillna(fill)
+
+
+FUNCTIONS: Dict[str, Callable] = {
+    'where': where,
+    'to_number': to_number,
+    'bucket': bucket,
+    'isnull': pd.isna,
+    'notnull': pd.notna,
+    'fillna': fillna,
+    'abs': np.abs,
+    'log': np.log,
+    'log1p': np.log1p,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'round': np.round,
+    'clip': np.clip,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+}
+
+CONSTANTS = {'nan': np.nan, 'inf': np.inf, 'True': True, 'False': False}
+
+BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.Pow: operator.pow, ast.BitAnd: operator.and_, ast.BitOr: operator.or_,
+}
+COMPARE_OPS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.invert,
+             ast.Invert: operator.invert}
+
+BACKTICK_NAME = re.compile(r'`([^`]+)`')
+
+Env = Dict[str, Any]
+
+
+def compile_expression(expr: str) -> Tuple[Callable[[Env], Any], Set[str]]:
+    """
+    Компилирует выражение в функцию env → значение, где env — столбцы
+    чанка по имени. Возвращает (функция, имена столбцов в выражении).
+    """
+    aliases: Dict[str, str] = {}
+
+    def quote(match):
+        alias = f"__column_{len(aliases)}"
+        aliases[alias] = match.group(1)
+        return alias
+
+    try:
+        tree = ast.parse(BACKTICK_NAME.sub(quote, expr).strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Синтаксическая ошибка в выражении {expr!r}: {e.msg}")
+
+    names: Set[str] = set()
+
+    def build(node) -> Callable[[Env], Any]:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+            value = node.value
+            return lambda env: value
+
+        if isinstance(node, ast.Name):
+            if node.id in CONSTANTS:
+                value = CONSTANTS[node.id]
+                return lambda env: value
+            name = aliases.get(node.id, node.id)
+            names.add(name)
+            return lambda env: env[name]
+
+        if isinstance(node, (ast.List, ast.Tuple)):
+            items = [build(item) for item in node.elts]
+            return lambda env: [item(env) for item in items]
+
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+            op, left, right = BINARY_OPS[type(node.op)], build(node.left), build(node.right)
+            return lambda env: op(left(env), right(env))
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS:
+            op, operand = UNARY_OPS[type(node.op)], build(node.operand)
+            return lambda env: op(operand(env))
+
+        if isinstance(node, ast.BoolOp):
+            # and/or над столбцами — поэлементные & и |
+            op = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+            values = [build(value) for value in node.values]
+
+            def bool_op(env):
+                result = values[0](env)
+                for value in values[1:]:
+                    result = op(result, value(env))
+                return result
+            return bool_op
+
+        if isinstance(node, ast.Compare) and all(type(op) in COMPARE_OPS for op in node.ops):
+            operands = [build(node.left)] + [build(comparator) for comparator in node.comparators]
+            ops = [COMPARE_OPS[type(op)] for op in node.ops]
+
+            def compare(env):
+                values = [operand(env) for operand in operands]
+                result = ops[0](values[0], values[1])
+                for i in range(1, len(ops)):
+                    result = result & ops[i](values[i], values[i + 1])
+                return result
+            return compare
+
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in FUNCTIONS and not node.keywords):
+            func, args = FUNCTIONS[node.func.id], [build(arg) for arg in node.args]
+            return lambda env: func(*(arg(env) for arg in args))
+
+        if isinstance(node, ast.Call):
+            raise ValueError(f"Неизвестная функция в выражении {expr!r}; "
+                             f"доступны: {', '.join(sorted(FUNCTIONS))}")
+        raise ValueError(f"Недопустимая конструкция {type(node).__name__} в выражении {expr!r}")
+
+    return build(tree.body), names
+
+
+@dataclass
+class DerivedColumn:
+    """Производный столбец: выражение, итоговый тип и нужен ли он в результате."""
+    name: str
+    expr: str
+    dtype: Optional[str] = None
+    keep: bool = True
+    func: Callable[[Env], Any] = field(default=None, repr=False)
+    references: Set[str] = field(default_factory=set)
+
+    def __post_init__(self):
+        if self.func is None:
+            self.func, self.references = compile_expression(self.expr)
+
+
+def parse_derived_config(config: DerivedConfig) -> List[DerivedColumn]:
+    """Столбцы из конфигурации в порядке объявления."""
+    columns = []
+    for name, spec in config.items():
+        if isinstance(spec, str):
+            spec = {'expr': spec}
+        unknown = set(spec) - {'expr', 'dtype', 'keep'}
+        if 'expr' not in spec or unknown:
+            raise ValueError(f"Столбец {name}: ожидается выражение или "
+                             f"{{'expr', 'dtype', 'keep'}}, получено {sorted(spec)}")
+        columns.append(DerivedColumn(name, spec['expr'], spec.get('dtype'), spec.get('keep', True)))
+    return columns
+
+
+def plan_derived(columns: List[DerivedColumn],
+                 available: Sequence[str],
+                 outputs: Optional[Sequence[str]] = None) -> List[DerivedColumn]:
+    """
+    Порядок вычисления столбцов, нужных для outputs (по умолчанию — все
+    с keep=True). Ссылка столбца на собственное имя означает исходный
+    столбец с этим именем (замена: "TotalCharges": "to_number(TotalCharges)").
+    Неизвестные имена и циклические ссылки — ValueError.
+    """
+    by_name = {column.name: column for column in columns}
+    available = set(available)
+
+    def dependencies(column: DerivedColumn) -> List[str]:
+        deps = []
+        for name in sorted(column.references):
+            if name == column.name and name in available:
+                continue
+            if name in by_name:
+                deps.append(name)
+            elif name not in available:
+                raise ValueError(f"Столбец {column.name}: неизвестный столбец {name} в {column.expr!r}")
+        return deps
+
+    if outputs is None:
+        outputs = [column.name for column in columns if column.keep]
+    missing = [name for name in outputs if name not in by_name]
+    if missing:
+        raise ValueError(f"Нет производных столбцов: {', '.join(missing)}")
+
+    ordered: List[DerivedColumn] = []
+    state: Dict[str, str] = {}
+
+    def visit(name: str, path: Tuple[str, ...]):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Циклическая ссылка: {' → '.join(path + (name,))}")
+        state[name] = 'visiting'
+        for dep in dependencies(by_name[name]):
+            visit(dep, path + (name,))
+        state[name] = 'done'
+        ordered.append(by_name[name])
+
+    for name in outputs:
+        visit(name, ())
+    return ordered
+
+
+def _widen(series: pd.Series) -> pd.Series:
+    """Целые и float32 после downcast → int64/float64: без переполнения в выражениях."""
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series) and series.dtype != 'int64':
+        return series.astype('int64' if series.dtype.kind in 'iu' else 'Int64')
+    if pd.api.types.is_float_dtype(series) and series.dtype != 'float64':
+        return series.astype('float64')
+    return series
+
+
+def _as_series(value, index: pd.Index, name: str) -> pd.Series:
+    if isinstance(value, pd.Series):
+        return value.set_axis(index).rename(name)
+    if np.ndim(value) == 0:
+        value = np.full(len(index), value)
+    return pd.Series(value, index=index, name=name)
+
+
+def derive_columns(df: pd.DataFrame,
+                   config: Union[DerivedConfig, List[DerivedColumn]],
+                   outputs: Optional[Sequence[str]] = None,
+                   chunk_rows: int = DERIVE_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Добавляет (заменяет) производные столбцы из config.
+
+    Args:
+        config: конфигурация (см. описание модуля) или parse_derived_config
+        outputs: какие столбцы нужны в результате (по умолчанию keep=True)
+        chunk_rows: строк в чанке вычисления
+
+    Returns:
+        Копия df (без копирования данных) с производными столбцами
+    """
+    columns = parse_derived_config(config) if isinstance(config, dict) else config
+    plan = plan_derived(columns, df.columns, outputs)
+    kept = [column for column in plan if column.keep or (outputs and column.name in outputs)]
+
+    skipped = [column.name for column in columns if column not in plan]
+    print("\nПроизводные столбцы:")
+    for column in plan:
+        note = "" if column in kept else " (промежуточный)"
+        print(f"  {column.name} = {column.expr}{note}")
+    if skipped:
+        print(f"  Не используются, пропущены: {', '.join(skipped)}")
+
+    inputs = sorted({name for column in plan for name in column.references} & set(df.columns))
+
+    pieces: Dict[str, List[pd.Series]] = {column.name: [] for column in kept}
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        env: Env = {name: _widen(chunk[name]) for name in inputs}
+        for column in plan:
+            value = env[column.name] = _as_series(column.func(env), chunk.index, column.name)
+            if column.name in pieces:
+                pieces[column.name].append(value)
+
+    result = df.copy(deep=False)
+    for column in kept:
+        series = pd.concat(pieces[column.name]) if len(pieces[column.name]) > 1 else pieces[column.name][0]
+        result[column.name] = series.astype(column.dtype) if column.dtype else series
+    return result
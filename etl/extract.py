@@ -1,6 +1,17 @@
 import pandas as pd
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Union
+
+from etl.checkpoint import atomic_path, download_drive_file, source_fingerprint
+
+if TYPE_CHECKING:
+    from etl.memory import MemoryBudget
+
+RAW_DATA_PATH = Path('data/raw') / 'raw_data.csv'
+
+# Строк в выборке для оценки размера строки
+SAMPLE_ROWS = 10_000
 
 
 def validate_source(df: pd.DataFrame) -> bool:
@@ -13,28 +24,17 @@ def validate_source(df: pd.DataFrame) -> bool:
 
 
 def load_from_google_drive(file_id: str) -> pd.DataFrame:
-    """Загрузка файла с Google Drive."""
-    file_url = f"https://drive.google.com/uc?id={file_id}"
+    """Загрузка файла с Google Drive (см. checkpoint.download_drive_file)."""
     try:
-        df = pd.read_csv(file_url)
+        df = pd.read_csv(download_drive_file(file_id))
         print(f"✓ Загружено с Google Drive: {df.shape[0]} строк, {df.shape[1]} столбцов")
         return df
     except Exception as e:
         raise ValueError(f"Ошибка загрузки из Google Drive: {e}")
 
 
-def extract(source_path: Union[str, Path] = None, google_drive_id: str = None) -> pd.DataFrame:
-    """
-    Загрузка данных из источника.
-
-    Args:
-        source_path: Путь к исходному файлу (csv, xlsx, json)
-        google_drive_id: ID файла на Google Drive
-
-    Returns:
-        pandas.DataFrame с загруженными данными
-    """
-
+def read_source(source_path: Union[str, Path] = None, google_drive_id: str = None) -> pd.DataFrame:
+    """Чтение источника (csv, xlsx, json или Google Drive) без проверки и сохранения."""
     if google_drive_id:
         df = load_from_google_drive(google_drive_id)
     elif source_path:
@@ -53,15 +53,144 @@ def extract(source_path: Union[str, Path] = None, google_drive_id: str = None) -
             raise ValueError(f"Неподдерживаемый формат: {source_path.suffix}")
     else:
         raise ValueError("Необходимо указать source_path или google_drive_id")
+    return df
+
+
+def extract(source_path: Union[str, Path] = None, google_drive_id: str = None) -> pd.DataFrame:
+    """
+    Загрузка данных из источника.
+
+    Args:
+        source_path: Путь к исходному файлу (csv, xlsx, json)
+        google_drive_id: ID файла на Google Drive
+
+    Returns:
+        pandas.DataFrame с загруженными данными
+    """
+    df = read_source(source_path, google_drive_id)
 
     # Валидация
     validate_source(df)
 
     # Сохранение сырых данных
-    raw_dir = Path('data/raw')
-    raw_dir.mkdir(parents=True, exist_ok=True)
-    raw_path = raw_dir / 'raw_data.csv'
-    df.to_csv(raw_path, index=False)
-    print(f"✓ Сырые данные сохранены в {raw_path}")
+    with atomic_path(RAW_DATA_PATH) as tmp_path:
+        df.to_csv(tmp_path, index=False)
+    print(f"✓ Сырые данные сохранены в {RAW_DATA_PATH}")
 
     return df
+
+
+def merge_csv_dtype(left: Optional[str], right: str) -> str:
+    """
+    Тип столбца CSV по типам, которые read_csv вывел для двух частей
+    файла: целые и дробные дают float64, иначе значения читаются строками
+    (как при чтении файла целиком), object остается object.
+    """
+    if left is None or left == right:
+        return right
+    if {left, right} <= {'int64', 'float64'}:
+        return 'float64'
+    return 'object' if 'object' in (left, right) else 'str'
+
+
+@dataclass
+class ChunkedSource:
+    """
+    Результат extract при лимите памяти: сырые данные лежат в CSV
+    и читаются чанками по chunk_rows строк.
+
+    fingerprint защищает от чтения файла, перезаписанного другим
+    запуском после того, как этот результат попал в кеш этапов.
+    dtypes — типы столбцов по всему файлу: все чанки читаются с ними,
+    иначе read_csv выводит типы по каждому чанку (столбец с числами в
+    первых чанках и текстом дальше стал бы int64 и str, а одинаковые
+    строки в разных чанках получили бы разные хеши).
+    """
+    path: str
+    chunk_rows: int
+    rows: int
+    columns: int
+    row_bytes: float
+    fingerprint: str
+    dtypes: Dict[str, str]
+
+    @property
+    def shape(self):
+        return (self.rows, self.columns)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        if source_fingerprint(self.path) != self.fingerprint:
+            raise RuntimeError(
+                f"{self.path} изменен после EXTRACT; перезапустите с --from-stage extract"
+            )
+        yield from pd.read_csv(self.path, chunksize=self.chunk_rows, dtype=self.dtypes)
+
+
+def extract_chunked(budget: 'MemoryBudget',
+                    source_path: Union[str, Path] = None,
+                    google_drive_id: str = None) -> Union[pd.DataFrame, ChunkedSource]:
+    """
+    Загрузка CSV источника чанками в пределах бюджета памяти.
+
+    Размер строки оценивается по первым SAMPLE_ROWS строкам, размер
+    чанка выбирается по бюджету (см. etl.memory.MemoryBudget). Чанки
+    проверяются и дописываются в data/raw/raw_data.csv, в памяти
+    одновременно находится один чанк. Excel и JSON не читаются чанками:
+    для них выполняется обычный extract.
+    """
+    from etl.memory import format_bytes, frame_row_bytes
+
+    if google_drive_id:
+        try:
+            source = download_drive_file(google_drive_id)
+        except Exception as e:
+            raise ValueError(f"Ошибка загрузки из Google Drive: {e}")
+    elif source_path:
+        source_path = Path(source_path)
+        if not source_path.exists():
+            raise FileNotFoundError(f"Файл не найден: {source_path}")
+        if source_path.suffix != '.csv':
+            print(f"⚠ {source_path.suffix} не читается чанками, файл загружается целиком")
+            return extract(source_path)
+        source = source_path
+    else:
+        raise ValueError("Необходимо указать source_path или google_drive_id")
+
+    row_bytes = frame_row_bytes(pd.read_csv(source, nrows=SAMPLE_ROWS))
+    # Чанк CSV + его копия в to_csv
+    chunk_rows = budget.chunk_rows(row_bytes, overhead=2.0)
+    print(f"  Оценка: {format_bytes(row_bytes)} на строку, чанк {chunk_rows:,} строк "
+          f"({budget.describe()})")
+
+    rows, columns, non_null, dtypes = 0, 0, None, {}
+    with atomic_path(RAW_DATA_PATH) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            for chunk in pd.read_csv(source, chunksize=chunk_rows):
+                counts = chunk.notna().sum()
+                non_null = counts if non_null is None else non_null.add(counts, fill_value=0)
+                # Столбец без значений в чанке read_csv делает float64 — тип не учитывается
+                for col, dtype in chunk.dtypes.items():
+                    if counts[col]:
+                        dtypes[col] = merge_csv_dtype(dtypes.get(col), str(dtype))
+                chunk.to_csv(f, header=rows == 0, index=False)
+                rows += len(chunk)
+                columns = chunk.shape[1]
+
+        if rows == 0:
+            raise ValueError("Датасет пуст")
+        if (non_null == 0).any():
+            raise ValueError("Найдены столбцы полностью состоящие из NULL")
+
+    print(f"✓ Сырые данные сохранены в {RAW_DATA_PATH} ({rows:,} строк)")
+    return ChunkedSource(
+        path=str(RAW_DATA_PATH),
+        chunk_rows=chunk_rows,
+        rows=rows,
+        columns=columns,
+        row_bytes=row_bytes,
+        fingerprint=source_fingerprint(str(RAW_DATA_PATH)),
+        dtypes=dtypes,
+    )
@@ -0,0 +1,293 @@
+"""
+Индекс точечного поиска по ключу (customerID) в обработанных файлах.
+
+Рядом с data.feather / data.parquet хранится отсортированный массив
+ключей с позициями строк: <файл>.<столбец>.idx.npy (записи key, part,
+row — номер батча Feather или группы строк Parquet и строка в нем) и
+<файл>.<столбец>.idx.json (отпечаток файла данных). Поиск — бинарный
+поиск по memory map индекса и чтение одного батча файла через memory
+map, без загрузки датасета. Чтобы батч был небольшим, LOAD с индексом
+пишет Feather батчами по KEY_INDEX_BATCH_ROWS строк, а Parquet — группами
+по KEY_INDEX_ROW_GROUP_ROWS строк с bloom-фильтром по ключу (его
+используют внешние движки: DuckDB, Spark, Trino).
+
+Для быстрого поиска используйте Feather (файл по умолчанию): меньше
+миллисекунды на ключ. Группа строк Parquet распаковывается целиком
+(около 10 мс на 16 тыс. строк), поэтому KeyIndex хранит последнюю
+прочитанную группу: соседние и повторяющиеся ключи читаются из нее.
+
+Примеры:
+  python -m etl.key_index 7590-VHVEG
+  python -m etl.key_index 7590-VHVEG 5575-GNVDE --columns customerID,Churn
+  python -m etl.key_index 7590-VHVEG --file data/processed/data.parquet
+  python -m etl.key_index --build --file data/processed/data.feather
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
+from etl.checkpoint import atomic_path, source_fingerprint
+from etl.defaults import DEFAULT_KEY_COLUMN
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pyarrow as pa
+
+DEFAULT_DATA_PATH = 'data/processed/data.feather'
+
+# Строк в батче Feather: батч распаковывается целиком при чтении строки
+KEY_INDEX_BATCH_ROWS = 512
+# Строк в группе Parquet: группа читается целиком при чтении строки
+KEY_INDEX_ROW_GROUP_ROWS = 16384
+# Доля ложных срабатываний bloom-фильтра Parquet
+BLOOM_FILTER_FPP = 0.01
+
+# Открытые индексы, переиспользуемые между вызовами lookup
+_OPEN_INDEXES: Dict[Tuple[str, str, Optional[Tuple[str, ...]]], 'KeyIndex'] = {}
+
+
+def index_paths(data_path: Union[str, Path], column: str = DEFAULT_KEY_COLUMN) -> Tuple[Path, Path]:
+    """Пути (массив .npy, метаданные .json) индекса столбца column файла data_path."""
+    data_path = Path(data_path)
+    base = data_path.with_name(f"{data_path.name}.{column}.idx")
+    return base.with_name(base.name + '.npy'), base.with_name(base.name + '.json')
+
+
+def encode_keys(values: Sequence) -> 'np.ndarray':
+    """Ключи как байтовые строки UTF-8 фиксированной ширины (dtype S<n>)."""
+    import numpy as np
+
+    return np.char.encode(np.asarray([str(value) for value in values], dtype=str), 'utf-8')
+
+
+def _key_parts(data_path: Path, column: str) -> list:
+    """Столбец column по батчам Feather или группам строк Parquet (читается только он)."""
+    import pyarrow as pa
+
+    if data_path.suffix == '.feather':
+        schema = pa.ipc.open_file(pa.memory_map(str(data_path))).schema
+        if column not in schema.names:
+            raise ValueError(f"Нет столбца {column} в {data_path}")
+        reader = pa.ipc.open_file(
+            pa.memory_map(str(data_path)),
+            options=pa.ipc.IpcReadOptions(included_fields=[schema.get_field_index(column)])
+        )
+        return [reader.get_batch(i).column(0) for i in range(reader.num_record_batches)]
+
+    if data_path.suffix == '.parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(data_path, memory_map=True)
+        if column not in parquet_file.schema_arrow.names:
+            raise ValueError(f"Нет столбца {column} в {data_path}")
+        return [parquet_file.read_row_group(i, columns=[column]).column(0).combine_chunks()
+                for i in range(parquet_file.num_row_groups)]
+
+    raise ValueError(f"Индекс строится только для .feather и .parquet: {data_path}")
+
+
+def build_key_index(data_path: Union[str, Path], column: str = DEFAULT_KEY_COLUMN) -> dict:
+    """
+    Строит индекс столбца column файла data_path и возвращает его
+    метаданные. Строки с NULL в ключе в индекс не попадают, повторяющиеся
+    ключи сохраняются все (lookup вернет все строки).
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    data_path = Path(data_path)
+    parts = _key_parts(data_path, column)
+
+    keys, part_ids, rows = [], [], []
+    for part, values in enumerate(parts):
+        values = values.cast(pa.string())
+        valid = np.flatnonzero(values.is_valid().to_numpy(zero_copy_only=False))
+        keys.append(encode_keys(values.to_numpy(zero_copy_only=False)[valid]))
+        part_ids.append(np.full(len(valid), part, dtype=np.uint32))
+        rows.append(valid.astype(np.uint32))
+
+    all_keys = np.concatenate(keys) if keys else np.empty(0, dtype='S1')
+    index = np.empty(len(all_keys), dtype=[('key', all_keys.dtype), ('part', '<u4'), ('row', '<u4')])
+    order = np.argsort(all_keys, kind='stable')
+    index['key'] = all_keys[order]
+    index['part'] = np.concatenate(part_ids)[order] if part_ids else []
+    index['row'] = np.concatenate(rows)[order] if rows else []
+
+    npy_path, meta_path = index_paths(data_path, column)
+    with atomic_path(npy_path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, index)
+
+    meta = {
+        'data_path': str(data_path),
+        'column': column,
+        'format': data_path.suffix.lstrip('.'),
+        'parts': len(parts),
+        'keys': len(index),
+        'unique_keys': int(len(index) - np.count_nonzero(index['key'][1:] == index['key'][:-1])),
+        'key_bytes': all_keys.dtype.itemsize,
+        'data_fingerprint': source_fingerprint(str(data_path)),
+    }
+    # Метаданные пишутся последними: индекс без них не считается построенным
+    with atomic_path(meta_path) as tmp_path:
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+    return meta
+
+
+class KeyIndex:
+    """
+    Открытый индекс файла данных для многократного поиска.
+
+    Индекс и файл данных отображаются в память; при каждом поиске
+    читаются несколько страниц индекса и один батч (группа строк) файла.
+    Последняя распакованная группа строк Parquet хранится до следующего
+    поиска в другой группе. columns ограничивает возвращаемые столбцы:
+    остальные не читаются и не распаковываются.
+    """
+
+    def __init__(self, data_path: Union[str, Path] = DEFAULT_DATA_PATH,
+                 column: str = DEFAULT_KEY_COLUMN,
+                 columns: Optional[Sequence[str]] = None):
+        import numpy as np
+        import pyarrow as pa
+
+        self.data_path = Path(data_path)
+        self.column = column
+        self.columns = list(columns) if columns else None
+
+        npy_path, meta_path = index_paths(self.data_path, column)
+        if not meta_path.exists():
+            raise FileNotFoundError(
+                f"Нет индекса {column} для {self.data_path}: "
+                f"python -m etl.key_index --build --file {self.data_path}"
+            )
+        self.meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        if not self.is_current():
+            raise RuntimeError(
+                f"{self.data_path} изменен после построения индекса {column}: "
+                f"python -m etl.key_index --build --file {self.data_path}"
+            )
+
+        self._index = np.load(npy_path, mmap_mode='r')
+        self._keys = self._index['key']
+
+        if self.meta['format'] == 'feather':
+            options = None
+            if self.columns:
+                schema = pa.ipc.open_file(pa.memory_map(str(self.data_path))).schema
+                missing = [name for name in self.columns if name not in schema.names]
+                if missing:
+                    raise ValueError(f"Нет столбцов в файле: {', '.join(missing)}")
+                options = pa.ipc.IpcReadOptions(
+                    included_fields=[schema.get_field_index(name) for name in self.columns]
+                )
+            self._reader = pa.ipc.open_file(pa.memory_map(str(self.data_path)), options=options)
+        else:
+            import pyarrow.parquet as pq
+
+            self._reader = pq.ParquetFile(self.data_path, memory_map=True)
+        # (номер группы строк, таблица) последней прочитанной группы Parquet
+        self._cached_part: Optional[Tuple[int, 'pa.Table']] = None
+
+    def is_current(self) -> bool:
+        """Совпадает ли файл данных с тем, по которому построен индекс."""
+        return source_fingerprint(str(self.data_path)) == self.meta['data_fingerprint']
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def positions(self, key) -> List[Tuple[int, int]]:
+        """Позиции (батч или группа строк, строка в нем) всех строк с ключом key."""
+        import numpy as np
+
+        encoded = str(key).encode('utf-8')
+        if len(encoded) > self._keys.dtype.itemsize:
+            return []
+        lo = int(np.searchsorted(self._keys, encoded, side='left'))
+        hi = int(np.searchsorted(self._keys, encoded, side='right'))
+        return [(int(self._index['part'][i]), int(self._index['row'][i])) for i in range(lo, hi)]
+
+    def _part(self, part: int):
+        """Батч Feather или группа строк Parquet (последняя группа из кеша)."""
+        if self.meta['format'] == 'feather':
+            return self._reader.get_batch(part)
+        if self._cached_part is None or self._cached_part[0] != part:
+            self._cached_part = (part, self._reader.read_row_group(part, columns=self.columns))
+        return self._cached_part[1]
+
+    def get(self, key) -> List[dict]:
+        """Строки с ключом key как словари (пустой список, если ключа нет)."""
+        rows = []
+        for part, row in self.positions(key):
+            rows.extend(self._part(part).slice(row, 1).to_pylist())
+        return rows
+
+
+def lookup(key,
+           data_path: Union[str, Path] = DEFAULT_DATA_PATH,
+           column: str = DEFAULT_KEY_COLUMN,
+           columns: Optional[Sequence[str]] = None) -> List[dict]:
+    """
+    Строки файла data_path с ключом key. Индекс открывается один раз и
+    переиспользуется, пока файл данных не изменится.
+
+        lookup('7590-VHVEG')
+        lookup('7590-VHVEG', 'data/processed/data.parquet', columns=['Churn'])
+    """
+    cache_key = (str(Path(data_path).resolve()), column, tuple(columns) if columns else None)
+    index = _OPEN_INDEXES.get(cache_key)
+    if index is None or not index.is_current():
+        index = _OPEN_INDEXES[cache_key] = KeyIndex(data_path, column, columns)
+    return index.get(key)
+
+
+def main():
+    """CLI точечного поиска и построения индекса."""
+    parser = argparse.ArgumentParser(
+        description="Поиск строк по ключу через индекс обработанного файла",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Примеры:')[1]
+    )
+    parser.add_argument('keys', nargs='*', help='Значения ключа')
+    parser.add_argument('--file', default=DEFAULT_DATA_PATH,
+                        help=f'Файл .feather или .parquet (по умолчанию: {DEFAULT_DATA_PATH})')
+    parser.add_argument('--column', default=DEFAULT_KEY_COLUMN,
+                        help=f'Столбец ключа (по умолчанию: {DEFAULT_KEY_COLUMN})')
+    parser.add_argument('--columns', default=None, help='Возвращаемые столбцы через запятую')
+    parser.add_argument('--build', action='store_true', help='Построить (перестроить) индекс')
+    args = parser.parse_args()
+
+    if not args.keys and not args.build:
+        parser.error("укажите ключи или --build")
+
+    try:
+        if args.build:
+            started = time.perf_counter()
+            meta = build_key_index(args.file, args.column)
+            print(f"✓ Индекс {args.column} для {args.file}: {meta['keys']:,} ключей "
+                  f"({meta['unique_keys']:,} уникальных) за {time.perf_counter() - started:.2f} сек")
+
+        if args.keys:
+            if Path(args.file).suffix == '.parquet':
+                print("Parquet: группа строк распаковывается целиком (~10 мс на ключ), "
+                      "для быстрого поиска используйте .feather")
+            index = KeyIndex(args.file, args.column,
+                             args.columns.split(',') if args.columns else None)
+            for key in args.keys:
+                started = time.perf_counter()
+                rows = index.get(key)
+                elapsed = (time.perf_counter() - started) * 1000
+                if not rows:
+                    print(f"{key}: не найден ({elapsed:.3f} мс)")
+                for row in rows:
+                    print(f"{key} ({elapsed:.3f} мс): {json.dumps(row, ensure_ascii=False, default=str)}")
+
+    except (FileNotFoundError, RuntimeError, ValueError) as e:
+        parser.exit(1, f"Ошибка: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
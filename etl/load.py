@@ -1,20 +1,52 @@
 import pandas as pd
 import sqlite3
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Union, Optional, Dict
+from typing import Callable, Union, Optional, Dict, List, Sequence
+import functools
 import logging
 import os
+import re
 
-try:
-    from sqlalchemy import create_engine
+from etl.catalog import clear_partition_catalogs, write_catalog
+from etl.defaults import DEFAULT_SQLITE_INDEXES
+from etl.checkpoint import LoadCheckpoint, atomic_path
+from etl.key_index import BLOOM_FILTER_FPP, KEY_INDEX_BATCH_ROWS, KEY_INDEX_ROW_GROUP_ROWS
+from etl.metrics import MetricsRecorder
+from etl.sqlite_compact import (
+    create_view, data_table, drop_object, drop_storage_tables, encode_compact, write_storage
+)
+from etl.csv_export import PYARROW_AVAILABLE, remove_stale_shards, with_compression_suffix, write_csv_arrow
 
-    SQLALCHEMY_AVAILABLE = True
-except ImportError:
-    SQLALCHEMY_AVAILABLE = False
+# SQLAlchemy импортируется только при подключении к PostgreSQL
+SQLALCHEMY_AVAILABLE = find_spec('sqlalchemy') is not None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Engine'ы PostgreSQL, переиспользуемые между загрузками (режим --watch)
+_ENGINE_CACHE: Dict[str, object] = {}
+
+# Суффиксы таблиц SQLite при загрузке с подменой (swap=True)
+SQLITE_STAGING_SUFFIX = '__new'
+SQLITE_RETIRED_SUFFIX = '__old'
+
+# Столбец БД с именем исходного файла при загрузке по частям (режим --watch)
+PARTITION_COLUMN = 'source_file'
+
+
+def partition_path(path: Union[str, Path], partition: str) -> Path:
+    """
+    Путь выгрузки части partition (исходного файла): data.parquet →
+    data.<partition>.parquet, для папки (кубы, снимки) — <папка>/<partition>.
+    """
+    path = Path(path)
+    name = re.sub(r'[^\w-]+', '_', partition)
+    if not path.suffix:
+        return path / name
+    stem = path.name.split('.')[0]
+    return path.with_name(f"{stem}.{name}{path.name[len(stem):]}")
+
 
 def load_credentials_from_sqlite(db_path: str = "creds.db") -> Dict[str, str]:
     """Загружает учетные данные из SQLite базы данных."""
@@ -43,10 +75,16 @@ def load_credentials_from_sqlite(db_path: str = "creds.db") -> Dict[str, str]:
         raise
 
 
-def create_postgresql_engine(credentials: Dict[str, str]):
-    """Создает SQLAlchemy engine для PostgreSQL."""
+def create_postgresql_engine(credentials: Dict[str, str], reuse: bool = False):
+    """
+    Создает SQLAlchemy engine для PostgreSQL.
+
+    reuse=True возвращает ранее созданный engine с тем же URL: пул
+    соединений остается открытым между загрузками.
+    """
     if not SQLALCHEMY_AVAILABLE:
         raise ImportError("SQLAlchemy не установлен. Установите: pip install sqlalchemy psycopg2")
+    from sqlalchemy import create_engine
 
     user = credentials.get("user")
     password = credentials.get("password")
@@ -58,11 +96,15 @@ def create_postgresql_engine(credentials: Dict[str, str]):
         raise ValueError("Неполные credentials для подключения")
 
     engine_url = f"postgresql+psycopg2://{user}:{password}@{url}:{port}/{dbname}"
+    if reuse and engine_url in _ENGINE_CACHE:
+        return _ENGINE_CACHE[engine_url]
 
     try:
         engine = create_engine(engine_url)
         with engine.connect() as conn:
             logger.info("✓ Подключение к PostgreSQL успешно")
+        if reuse:
+            _ENGINE_CACHE[engine_url] = engine
         return engine
     except Exception as e:
         logger.error(f"Ошибка подключения к PostgreSQL: {e}")
@@ -74,23 +116,63 @@ def load_to_postgresql(df: pd.DataFrame,
                        schema: str = "public",
                        max_rows: int = 100,
                        if_exists: str = 'replace',
-                       credentials_path: str = "creds.db") -> bool:
-    """Загрузка данных в PostgreSQL БД."""
+                       credentials_path: str = "creds.db",
+                       chunksize: int = 1000,
+                       checkpoint: Optional[LoadCheckpoint] = None,
+                       reuse_engine: bool = False,
+                       partition: Optional[str] = None) -> bool:
+    """
+    Загрузка данных в PostgreSQL БД.
+
+    Данные пишутся чанками по chunksize строк, каждый чанк коммитится
+    отдельно и фиксируется в checkpoint. reuse_engine=True оставляет
+    пул соединений открытым для следующих загрузок.
+
+    partition — имя исходного файла: строки дописываются в таблицу со
+    столбцом PARTITION_COLUMN, прежние строки этого файла удаляются,
+    строки других файлов остаются.
+    """
     try:
         df_limited = df.head(max_rows)
         actual_rows = len(df_limited)
+        target = f"{schema}.{table_name}"
 
         credentials = load_credentials_from_sqlite(credentials_path)
-        engine = create_postgresql_engine(credentials)
-
-        df_limited.to_sql(
-            name=table_name,
-            con=engine,
-            schema=schema,
-            if_exists=if_exists,
-            index=False,
-            chunksize=1000
-        )
+        engine = create_postgresql_engine(credentials, reuse=reuse_engine)
+        from sqlalchemy import inspect, text
+
+        rows, where, params = df_limited, '', {}
+        if partition:
+            rows = df_limited.assign(**{PARTITION_COLUMN: partition})
+            where, params = f' WHERE "{PARTITION_COLUMN}" = :partition', {'partition': partition}
+
+        start = 0
+        if checkpoint and checkpoint.committed_rows('PostgreSQL', target):
+            if inspect(engine).has_table(table_name, schema=schema):
+                with engine.connect() as conn:
+                    start = conn.execute(
+                        text(f'SELECT COUNT(*) FROM "{schema}"."{table_name}"{where}'), params
+                    ).scalar()
+            print(f"  Продолжение загрузки с строки {start}")
+        elif partition and inspect(engine).has_table(table_name, schema=schema):
+            columns = {col['name'] for col in inspect(engine).get_columns(table_name, schema=schema)}
+            if PARTITION_COLUMN in columns:
+                # Прежняя загрузка этого файла заменяется, остальные файлы остаются
+                if_exists = 'append'
+                with engine.begin() as conn:
+                    conn.execute(text(f'DELETE FROM "{schema}"."{table_name}"{where}'), params)
+
+        for offset in range(start, max(actual_rows, 1), chunksize):
+            chunk = rows.iloc[offset:offset + chunksize]
+            chunk.to_sql(
+                name=table_name,
+                con=engine,
+                schema=schema,
+                if_exists=if_exists if offset == 0 else 'append',
+                index=False
+            )
+            if checkpoint:
+                checkpoint.commit_chunk('PostgreSQL', target, offset + len(chunk))
 
         logger.info(f"✓ {actual_rows} строк загружено в PostgreSQL: {table_name}")
         print(f"✓ Загружено в PostgreSQL: {actual_rows} строк")
@@ -99,7 +181,8 @@ def load_to_postgresql(df: pd.DataFrame,
         check_df = pd.read_sql_table(table_name, con=engine, schema=schema)
         print(f"  Проверка: {len(check_df)} строк в таблице")
 
-        engine.dispose()
+        if not reuse_engine:
+            engine.dispose()
         return True
 
     except Exception as e:
@@ -119,11 +202,9 @@ def setup_sqlite_database(db_path: str, table_name: str = 'processed_data') -> s
 
 
 def validate_sqlite_write(conn: sqlite3.Connection, table_name: str,
-                          expected_rows: int) -> bool:
-    """Проверка успешной записи в SQLite БД."""
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-    actual_rows = cursor.fetchone()[0]
+                          expected_rows: int, partition: Optional[str] = None) -> bool:
+    """Проверка успешной записи в SQLite БД (строк части partition, если задана)."""
+    actual_rows = sqlite_table_row_count(conn, table_name, partition)
 
     if actual_rows != expected_rows:
         logger.warning(
@@ -135,30 +216,267 @@ def validate_sqlite_write(conn: sqlite3.Connection, table_name: str,
     return True
 
 
+def sqlite_table_exists(conn: sqlite3.Connection, table_name: str) -> bool:
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+        (table_name,)
+    )
+    return cursor.fetchone() is not None
+
+
+def sqlite_table_row_count(conn: sqlite3.Connection, table_name: str,
+                           partition: Optional[str] = None) -> int:
+    """
+    Количество строк в таблице SQLite (0, если таблицы нет); при
+    partition — только строк с этим значением PARTITION_COLUMN.
+    """
+    if not sqlite_table_exists(conn, table_name):
+        return 0
+
+    cursor = conn.cursor()
+    if partition:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table_name}" WHERE "{PARTITION_COLUMN}" = ?',
+                       (partition,))
+    else:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table_name}"')
+    return cursor.fetchone()[0]
+
+
+def parse_index_spec(spec: Union[str, Sequence[str]]) -> List[str]:
+    """'Churn, Contract' или ('Churn', 'Contract') → ['Churn', 'Contract']."""
+    if isinstance(spec, str):
+        spec = spec.split(',')
+    return [col.strip() for col in spec if col.strip()]
+
+
+def build_sqlite_indexes(conn: sqlite3.Connection,
+                         table_name: str,
+                         indexes: Sequence[Union[str, Sequence[str]]],
+                         name_table: Optional[str] = None) -> List[str]:
+    """
+    Строит индексы после массовой вставки и обновляет статистику
+    планировщика (ANALYZE + PRAGMA optimize).
+
+    Args:
+        indexes: список индексов, каждый — столбец или составной
+            индекс ('Churn, Contract' либо ('Churn', 'Contract'))
+        name_table: таблица, по которой называются индексы (по умолчанию
+            table_name). Для промежуточной таблицы подмены это рабочая
+            таблица; если имя занято индексом другой таблицы, к нему
+            добавляется SQLITE_STAGING_SUFFIX, и при следующих подменах
+            имена чередуются.
+
+    Returns:
+        Имена построенных индексов
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    existing_columns = {col[1] for col in cursor.fetchall()}
+
+    built = []
+    for spec in indexes:
+        columns = parse_index_spec(spec)
+        missing = [col for col in columns if col not in existing_columns]
+        if not columns or missing:
+            logger.warning(f"Индекс {spec!r} пропущен: нет столбцов {missing}")
+            continue
+
+        index_name = "idx_" + "_".join(
+            re.sub(r'\W+', '_', name) for name in [name_table or table_name, *columns]
+        )
+        owner = cursor.execute(
+            "SELECT tbl_name FROM sqlite_master WHERE type='index' AND name=?", (index_name,)
+        ).fetchone()
+        if owner and owner[0] != table_name:
+            index_name += SQLITE_STAGING_SUFFIX
+        column_list = ", ".join(f'"{col}"' for col in columns)
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({column_list})'
+        )
+        built.append(index_name)
+
+    conn.commit()
+    cursor.execute("ANALYZE")
+    cursor.execute("PRAGMA optimize")
+    conn.commit()
+
+    return built
+
+
+def swap_sqlite_tables(conn: sqlite3.Connection,
+                       renames: Dict[str, str],
+                       on_swap: Optional[Callable[[], None]] = None) -> None:
+    """
+    Атомарно подменяет таблицы: renames — {промежуточная: рабочая}.
+
+    Все переименовки (и on_swap, например запись каталога) выполняются
+    в одной короткой транзакции: в WAL читатели видят либо старые, либо
+    новые таблицы целиком и не блокируются. Представление с именем
+    рабочей таблицы (компактная выгрузка) удаляется в той же транзакции.
+    Старые таблицы удаляются после фиксации отдельной транзакцией.
+    legacy_alter_table не дает SQLite переписать представления на
+    переименованные старые таблицы: они продолжают ссылаться на рабочие.
+    """
+    retired = [f"{table_name}{SQLITE_RETIRED_SUFFIX}" for table_name in renames.values()]
+    conn.commit()
+    conn.execute("PRAGMA legacy_alter_table=ON")
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for (staging_table, table_name), retired_table in zip(renames.items(), retired):
+                conn.execute(f'DROP TABLE IF EXISTS "{retired_table}"')
+                if sqlite_table_exists(conn, table_name):
+                    conn.execute(f'ALTER TABLE "{table_name}" RENAME TO "{retired_table}"')
+                else:
+                    drop_object(conn, table_name)
+                conn.execute(f'ALTER TABLE "{staging_table}" RENAME TO "{table_name}"')
+                # Статистику ANALYZE переименование не переносит
+                if sqlite_table_exists(conn, 'sqlite_stat1'):
+                    conn.execute("DELETE FROM sqlite_stat1 WHERE tbl = ?", (table_name,))
+                    conn.execute("UPDATE sqlite_stat1 SET tbl = ? WHERE tbl = ?",
+                                 (table_name, staging_table))
+            if on_swap:
+                on_swap()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute("PRAGMA legacy_alter_table=OFF")
+
+    for retired_table in retired:
+        conn.execute(f'DROP TABLE IF EXISTS "{retired_table}"')
+    conn.commit()
+
+
 def load_to_sqlite(df: pd.DataFrame,
                    db_path: str = 'data/processed/data.db',
                    table_name: str = 'processed_data',
                    max_rows: int = 100,
-                   if_exists: str = 'replace') -> bool:
-    """Загрузка данных в SQLite БД."""
+                   if_exists: str = 'replace',
+                   chunksize: int = 1000,
+                   checkpoint: Optional[LoadCheckpoint] = None,
+                   indexes: Optional[Sequence[Union[str, Sequence[str]]]] = DEFAULT_SQLITE_INDEXES,
+                   catalog: Optional[dict] = None,
+                   swap: bool = False,
+                   compact: bool = False,
+                   partition: Optional[str] = None) -> bool:
+    """
+    Загрузка данных в SQLite БД.
+
+    Данные пишутся чанками по chunksize строк, каждый чанк коммитится
+    отдельно и фиксируется в checkpoint. Индексы из indexes строятся
+    после вставки всех строк, затем выполняется ANALYZE. В конце
+    обновляется каталог метаданных (см. etl.catalog); catalog может
+    содержать column_stats и source_fingerprint.
+
+    swap=True: строки и индексы пишутся в <table_name>__new, которая
+    затем подменяет table_name переименованием (см. swap_sqlite_tables).
+    Пока идет загрузка, читатели видят прежнюю таблицу целиком.
+
+    compact=True: категории хранятся кодами со словарями, даты — эпохой
+    (см. etl.sqlite_compact). Строки пишутся в <table_name>__data,
+    table_name становится представлением, которое их декодирует.
+
+    partition — имя исходного файла (режим --watch): строки с этим
+    значением в столбце PARTITION_COLUMN заменяются, строки других
+    файлов остаются. Таблица без этого столбца (полная загрузка)
+    заменяется целиком.
+    """
     try:
+        if (swap or compact) and (if_exists != 'replace' or partition):
+            raise ValueError("Подмена и компактное хранение поддерживаются только для полной замены таблицы")
+
         df_limited = df.head(max_rows)
         actual_rows = len(df_limited)
+        suffix = SQLITE_STAGING_SUFFIX if swap else ''
+        storage_name = data_table(table_name) if compact else table_name
+        target = f"{storage_name}{suffix}"
 
         conn = setup_sqlite_database(db_path, table_name)
 
-        df_limited.to_sql(
-            table_name,
-            conn,
-            if_exists=if_exists,
-            index=False,
-            chunksize=1000
-        )
-
-        if validate_sqlite_write(conn, table_name, actual_rows):
+        rows, encoded, storage = df_limited, None, []
+        if compact:
+            encoded = encode_compact(df_limited)
+            rows = encoded.frame
+            storage = write_storage(conn, table_name, encoded, suffix)
+            kinds = list(encoded.layout.values())
+            print(f"  Компактное хранение: кодами {kinds.count('code')} столбцов, "
+                  f"эпохой {len(kinds) - kinds.count('code') - kinds.count('value')}")
+        elif not swap and not sqlite_table_exists(conn, table_name):
+            # Представление компактной выгрузки занимает имя таблицы
+            drop_object(conn, table_name)
+
+        if partition:
+            rows = rows.assign(**{PARTITION_COLUMN: partition})
+            indexes = [PARTITION_COLUMN, *(indexes or [])]
+
+        # Чанки коммитятся по порядку, поэтому фактическое число строк
+        # в таблице (части) и есть точка продолжения
+        start = 0
+        if checkpoint and checkpoint.committed_rows('SQLite', db_path):
+            start = sqlite_table_row_count(conn, target, partition)
+            print(f"  Продолжение загрузки с строки {start}")
+        elif partition and sqlite_table_exists(conn, target):
+            columns = {col[1] for col in conn.execute(f'PRAGMA table_info("{target}")')}
+            if PARTITION_COLUMN in columns:
+                # Прежняя загрузка этого файла заменяется, остальные файлы остаются
+                if_exists = 'append'
+                conn.execute(f'DELETE FROM "{target}" WHERE "{PARTITION_COLUMN}" = ?', (partition,))
+                conn.commit()
+
+        for offset in range(start, max(actual_rows, 1), chunksize):
+            chunk = rows.iloc[offset:offset + chunksize]
+            chunk.to_sql(
+                target,
+                conn,
+                if_exists=if_exists if offset == 0 else 'append',
+                index=False
+            )
+            if checkpoint:
+                checkpoint.commit_chunk('SQLite', db_path, offset + len(chunk))
+
+        if validate_sqlite_write(conn, target, actual_rows, partition):
             logger.info(f"✓ {actual_rows} строк загружено в SQLite: {db_path}")
             print(f"✓ Загружено в SQLite: {actual_rows} строк")
 
+        if indexes:
+            built = build_sqlite_indexes(conn, target, indexes, name_table=storage_name)
+            print(f"  Индексы: {', '.join(built) if built else 'нет'}")
+
+        write = functools.partial(
+            write_catalog, conn, table_name, df_limited,
+            row_count=actual_rows,
+            source_rows=len(df),
+            partition=partition,
+            **(catalog or {})
+        )
+        renames = {target: storage_name}
+        renames.update({name: name[:len(name) - len(suffix)] for name in storage})
+
+        def publish():
+            # Обычная таблица и компактная выгрузка занимают одно имя:
+            # объекты другого вида удаляются
+            if compact:
+                drop_object(conn, table_name)
+                create_view(conn, table_name, encoded.layout)
+            drop_storage_tables(conn, table_name, keep=list(renames.values()))
+            write(commit=False)
+            if partition:
+                # Статистика и отпечатки — по файлу части, у таблицы — только общее число строк
+                write_catalog(conn, table_name, None,
+                              row_count=sqlite_table_row_count(conn, target), commit=False)
+            else:
+                clear_partition_catalogs(conn, table_name)
+
+        if swap:
+            swap_sqlite_tables(conn, renames, on_swap=publish)
+            print(f"  Таблица {target} подменила {storage_name}")
+        else:
+            publish()
+            conn.commit()
+
         cursor = conn.cursor()
         cursor.execute(f"PRAGMA table_info({table_name})")
         columns = cursor.fetchall()
@@ -175,12 +493,41 @@ def load_to_sqlite(df: pd.DataFrame,
 
 def load_to_parquet(df: pd.DataFrame,
                     output_path: str = 'data/processed/data.parquet',
-                    compression: str = 'snappy') -> bool:
-    """Сохранение данных в Parquet."""
-    try:
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                    compression: str = 'snappy',
+                    slice_rows: Optional[int] = None,
+                    key_column: Optional[str] = None) -> bool:
+    """
+    Сохранение данных в Parquet.
 
-        df.to_parquet(output_path, index=False, compression=compression)
+    slice_rows: если задан, данные преобразуются в Arrow и пишутся
+    группами строк по slice_rows, а не одной таблицей.
+    key_column: столбец точечного поиска (см. etl.key_index) — группы
+    строк уменьшаются до KEY_INDEX_ROW_GROUP_ROWS, по столбцу пишется
+    bloom-фильтр.
+    """
+    try:
+        options = {}
+        if key_column:
+            options['row_group_size'] = KEY_INDEX_ROW_GROUP_ROWS
+            if key_column in df.columns:
+                options['bloom_filter_options'] = {
+                    key_column: {'ndv': max(len(df), 1), 'fpp': BLOOM_FILTER_FPP}
+                }
+
+        with atomic_path(output_path) as tmp_path:
+            if slice_rows:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                schema = pa.Schema.from_pandas(df, preserve_index=False)
+                row_group_size = options.pop('row_group_size', None)
+                with pq.ParquetWriter(tmp_path, schema, compression=compression, **options) as writer:
+                    for start in range(0, max(len(df), 1), slice_rows):
+                        writer.write_table(pa.Table.from_pandas(
+                            df.iloc[start:start + slice_rows], schema=schema, preserve_index=False
+                        ), row_group_size=row_group_size)
+            else:
+                df.to_parquet(tmp_path, index=False, compression=compression, **options)
 
         file_size = Path(output_path).stat().st_size / 1024 / 1024
         logger.info(f"✓ Данные сохранены в {output_path}")
@@ -196,16 +543,46 @@ def load_to_parquet(df: pd.DataFrame,
 
 
 def load_to_csv(df: pd.DataFrame,
-                output_path: str = 'data/processed/data.csv') -> bool:
-    """Сохранение данных в CSV."""
+                output_path: str = 'data/processed/data.csv',
+                engine: str = 'pandas',
+                compression: Optional[str] = None,
+                shards: int = 1,
+                slice_rows: Optional[int] = None) -> bool:
+    """
+    Сохранение данных в CSV.
+
+    engine='pandas' — DataFrame.to_csv (формат, который читают партнеры
+    и ноутбук); engine='arrow' пишет через многопоточный писатель pyarrow
+    (см. etl.csv_export) и поддерживает шарды, но в своем диалекте: строки
+    в кавычках, true/false, даты с микросекундами.
+    compression: None, 'gzip' или 'zstd'. slice_rows ограничивает
+    количество строк, форматируемых за раз.
+    """
     try:
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-
-        df.to_csv(output_path, index=False, encoding='utf-8')
-
-        file_size = Path(output_path).stat().st_size / 1024 / 1024
-        logger.info(f"✓ Данные сохранены в {output_path}")
-        print(f"✓ Сохранено в CSV: {output_path}")
+        if engine == 'arrow' and not PYARROW_AVAILABLE:
+            logger.warning("pyarrow не установлен, CSV пишется через pandas")
+            engine = 'pandas'
+
+        if engine == 'arrow':
+            paths = write_csv_arrow(df, output_path, compression=compression, shards=shards,
+                                    slice_rows=slice_rows)
+        elif engine == 'pandas':
+            if shards != 1:
+                raise ValueError("Шарды поддерживаются только для engine='arrow'")
+            path = with_compression_suffix(output_path, compression)
+            with atomic_path(path) as tmp_path:
+                df.to_csv(tmp_path, index=False, encoding='utf-8', compression=compression,
+                          chunksize=slice_rows)
+            remove_stale_shards(path, keep=[])
+            paths = [path]
+        else:
+            raise ValueError(f"Неизвестный CSV engine: {engine}")
+
+        file_size = sum(path.stat().st_size for path in paths) / 1024 / 1024
+        logger.info(f"✓ Данные сохранены в {paths[0]}")
+        print(f"✓ Сохранено в CSV: {paths[0]}")
+        if len(paths) > 1:
+            print(f"  Шардов: {len(paths)}")
         print(f"  Размер файла: {file_size:.2f} МБ")
 
         return True
@@ -217,12 +594,33 @@ def load_to_csv(df: pd.DataFrame,
 
 
 def load_to_feather(df: pd.DataFrame,
-                    output_path: str = 'data/processed/data.feather') -> bool:
-    """Сохранение данных в Feather."""
-    try:
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                    output_path: str = 'data/processed/data.feather',
+                    slice_rows: Optional[int] = None,
+                    batch_rows: Optional[int] = None) -> bool:
+    """
+    Сохранение данных в Feather.
 
-        df.to_feather(output_path)
+    slice_rows: если задан, данные пишутся срезами по slice_rows строк
+    (Feather V2 с тем же сжатием lz4, что у DataFrame.to_feather).
+    batch_rows: максимум строк в батче файла (для точечного поиска
+    по etl.key_index батч должен быть небольшим).
+    """
+    try:
+        with atomic_path(output_path) as tmp_path:
+            if slice_rows:
+                import pyarrow as pa
+
+                schema = pa.Schema.from_pandas(df, preserve_index=False)
+                options = pa.ipc.IpcWriteOptions(
+                    compression='lz4' if pa.Codec.is_available('lz4') else None
+                )
+                with pa.ipc.new_file(str(tmp_path), schema, options=options) as writer:
+                    for start in range(0, max(len(df), 1), slice_rows):
+                        writer.write_table(pa.Table.from_pandas(
+                            df.iloc[start:start + slice_rows], schema=schema, preserve_index=False
+                        ), max_chunksize=batch_rows)
+            else:
+                df.to_feather(tmp_path, chunksize=batch_rows)
 
         file_size = Path(output_path).stat().st_size / 1024 / 1024
         logger.info(f"✓ Данные сохранены в {output_path}")
@@ -237,6 +635,57 @@ def load_to_feather(df: pd.DataFrame,
         return False
 
 
+def load_to_snapshot(df: pd.DataFrame,
+                     snapshot_dir: str = 'data/snapshots',
+                     source_fingerprint: Optional[str] = None) -> bool:
+    """
+    Сохранение версии данных в хранилище снимков (см. etl.snapshots).
+
+    Записываются только чанки, которых нет в прошлых версиях.
+    """
+    try:
+        from etl.snapshots import SnapshotStore
+
+        manifest = SnapshotStore(snapshot_dir).create(df, source_fingerprint=source_fingerprint)
+
+        if manifest.get('unchanged'):
+            print(f"✓ Снимок: данные не изменились, версия {manifest['version']}")
+        else:
+            logger.info(f"✓ Снимок {manifest['version']} сохранен в {snapshot_dir}")
+            print(f"✓ Снимок: версия {manifest['version']}")
+            print(f"  Чанков: {len(manifest['chunks'])}, новых {manifest['new_chunks']}, "
+                  f"записано {manifest['written_bytes'] / 1024 / 1024:.2f} МБ")
+
+        return True
+
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении снимка: {e}")
+        print(f"❌ Ошибка сохранения снимка: {e}")
+        return False
+
+
+def load_to_key_index(paths: Sequence[str], column: str) -> bool:
+    """
+    Построение индексов точечного поиска по column для файлов paths
+    (см. etl.key_index).
+    """
+    try:
+        from etl.key_index import build_key_index
+
+        for path in paths:
+            meta = build_key_index(path, column)
+            logger.info(f"✓ Индекс {column} для {path} построен")
+            print(f"✓ Индекс {column}: {path} ({meta['keys']} ключей, "
+                  f"{meta['unique_keys']} уникальных, {meta['parts']} частей файла)")
+
+        return True
+
+    except Exception as e:
+        logger.error(f"Ошибка при построении индекса {column}: {e}")
+        print(f"❌ Ошибка построения индекса {column}: {e}")
+        return False
+
+
 def generate_load_summary(results: dict) -> str:
     """Генерация итогового отчета."""
     summary = "\n" + "=" * 60 + "\n"
@@ -257,6 +706,34 @@ def generate_load_summary(results: dict) -> str:
     return summary
 
 
+def run_sink(name: str,
+             target: str,
+             writer: Callable[[], bool],
+             checkpoint: Optional[LoadCheckpoint] = None,
+             metrics: Optional[MetricsRecorder] = None,
+             rows: Optional[int] = None) -> bool:
+    """
+    Запуск одного синка с учетом чекпоинта: синки, завершенные
+    в предыдущем запуске, пропускаются. Если передан metrics,
+    время, строки и ввод-вывод синка записываются как отдельный шаг.
+    """
+    if checkpoint and checkpoint.is_done(name, target):
+        print(f"✓ {name}: уже загружено в предыдущем запуске, пропуск")
+        return True
+
+    if metrics is None:
+        success = writer()
+    else:
+        with metrics.measure(name, kind='sink', rows_in=rows) as step:
+            success = writer()
+            step['rows_out'] = rows if success else 0
+
+    if success and checkpoint:
+        checkpoint.mark_done(name, target)
+
+    return success
+
+
 def load(df: pd.DataFrame,
          sqlite_db_path: Optional[str] = None,
          postgresql_table: Optional[str] = None,
@@ -265,44 +742,149 @@ def load(df: pd.DataFrame,
          csv_path: Optional[str] = None,
          feather_path: Optional[str] = None,
          max_rows: int = 100,
-         verbose: bool = True) -> dict:
+         verbose: bool = True,
+         chunksize: int = 1000,
+         checkpoint: Optional[LoadCheckpoint] = None,
+         csv_options: Optional[dict] = None,
+         sqlite_indexes: Optional[Sequence[Union[str, Sequence[str]]]] = DEFAULT_SQLITE_INDEXES,
+         catalog: Optional[dict] = None,
+         metrics: Optional[MetricsRecorder] = None,
+         reuse_connections: bool = False,
+         cubes: Optional[Dict[str, pd.DataFrame]] = None,
+         cubes_dir: Optional[str] = None,
+         slice_rows: Optional[int] = None,
+         snapshot_dir: Optional[str] = None,
+         key_index: Optional[str] = None,
+         sqlite_swap: bool = False,
+         sqlite_compact: bool = False,
+         partition: Optional[str] = None) -> dict:
     """
     Основная функция загрузки во все форматы.
+
+    Если передан checkpoint, БД пишутся с коммитом по чанкам,
+    а повторный запуск продолжает загрузку с места сбоя.
+    csv_options передаются в load_to_csv (engine, compression, shards),
+    sqlite_indexes, catalog, sqlite_swap (подмена таблицы после
+    загрузки) и sqlite_compact (коды и словари вместо значений) —
+    в load_to_sqlite. metrics собирает метрики по каждому синку.
+    reuse_connections=True не закрывает соединения с PostgreSQL после
+    загрузки (долгоживущий процесс).
+    cubes (результат etl.aggregate.build_cubes) сохраняются в
+    sqlite_db_path как таблицы cube_* и в cubes_dir как Parquet.
+    slice_rows (задается при лимите памяти) — файлы пишутся срезами.
+    snapshot_dir — хранилище версий данных (etl.snapshots).
+    key_index — столбец, по которому для Feather и Parquet строится
+    индекс точечного поиска (etl.key_index).
+    partition — имя исходного файла (режим --watch): файлы и снимки
+    пишутся в отдельные пути части (partition_path), в БД строки файла
+    заменяют только его прежние строки, кубы сохраняются только в
+    cubes_dir части. Загрузка следующего файла не затирает предыдущие.
     """
     results = {}
+    db_rows = min(len(df), max_rows)
+
+    if partition:
+        parquet_path, csv_path, feather_path, snapshot_dir, cubes_dir = (
+            path and str(partition_path(path, partition))
+            for path in (parquet_path, csv_path, feather_path, snapshot_dir, cubes_dir)
+        )
 
     print("\n" + "=" * 60)
-    print("📤 ЭТАП 4: LOAD (Загрузка)")
+    print("📤 ЭТАП 5: LOAD (Загрузка)")
     print("=" * 60 + "\n")
 
     if sqlite_db_path:
         print("Загрузка в SQLite БД...")
-        results['SQLite'] = load_to_sqlite(df, sqlite_db_path, max_rows=max_rows)
+        results['SQLite'] = run_sink(
+            'SQLite', sqlite_db_path,
+            lambda: load_to_sqlite(df, sqlite_db_path, max_rows=max_rows,
+                                   chunksize=chunksize, checkpoint=checkpoint,
+                                   indexes=sqlite_indexes, catalog=catalog,
+                                   swap=sqlite_swap, compact=sqlite_compact,
+                                   partition=partition),
+            checkpoint, metrics, db_rows
+        )
         print()
 
     if postgresql_table:
         print("Загрузка в PostgreSQL БД...")
-        results['PostgreSQL'] = load_to_postgresql(
-            df,
-            table_name=postgresql_table,
-            max_rows=max_rows,
-            credentials_path=postgresql_creds
+        results['PostgreSQL'] = run_sink(
+            'PostgreSQL', f"public.{postgresql_table}",
+            lambda: load_to_postgresql(
+                df,
+                table_name=postgresql_table,
+                max_rows=max_rows,
+                credentials_path=postgresql_creds,
+                chunksize=chunksize,
+                checkpoint=checkpoint,
+                reuse_engine=reuse_connections,
+                partition=partition
+            ),
+            checkpoint, metrics, db_rows
         )
         print()
 
     if parquet_path:
         print("Загрузка в Parquet...")
-        results['Parquet'] = load_to_parquet(df, parquet_path)
+        results['Parquet'] = run_sink(
+            'Parquet', parquet_path,
+            lambda: load_to_parquet(df, parquet_path, slice_rows=slice_rows,
+                                    key_column=key_index),
+            checkpoint, metrics, len(df)
+        )
         print()
 
     if csv_path:
         print("Загрузка в CSV...")
-        results['CSV'] = load_to_csv(df, csv_path)
+        results['CSV'] = run_sink(
+            'CSV', csv_path,
+            lambda: load_to_csv(df, csv_path, slice_rows=slice_rows, **(csv_options or {})),
+            checkpoint, metrics, len(df)
+        )
         print()
 
     if feather_path:
         print("Загрузка в Feather...")
-        results['Feather'] = load_to_feather(df, feather_path)
+        results['Feather'] = run_sink(
+            'Feather', feather_path,
+            lambda: load_to_feather(df, feather_path, slice_rows=slice_rows,
+                                    batch_rows=KEY_INDEX_BATCH_ROWS if key_index else None),
+            checkpoint, metrics, len(df)
+        )
+        print()
+
+    index_paths = [path for path, sink in ((feather_path, 'Feather'), (parquet_path, 'Parquet'))
+                   if path and results.get(sink)]
+    if key_index and index_paths:
+        print(f"Построение индекса {key_index}...")
+        results['KeyIndex'] = run_sink(
+            'KeyIndex', f"{key_index}: {', '.join(index_paths)}",
+            lambda: load_to_key_index(index_paths, key_index),
+            checkpoint, metrics, len(df)
+        )
+        print()
+
+    if snapshot_dir:
+        print("Сохранение снимка версии...")
+        results['Snapshot'] = run_sink(
+            'Snapshot', snapshot_dir,
+            lambda: load_to_snapshot(df, snapshot_dir,
+                                     source_fingerprint=(catalog or {}).get('source_fingerprint')),
+            checkpoint, metrics, len(df)
+        )
+        print()
+
+    # Таблицы cube_* общие для БД, поэтому кубы части пишутся только в ее папку
+    cubes_db_path = None if partition else sqlite_db_path
+    if cubes and (cubes_db_path or cubes_dir):
+        from etl.aggregate import load_cubes
+
+        print("Загрузка кубов...")
+        results['Cubes'] = run_sink(
+            'Cubes', cubes_dir or cubes_db_path,
+            lambda: load_cubes(cubes, cubes_db_path, cubes_dir),
+            checkpoint, metrics, sum(len(cube) for cube in cubes.values())
+        )
         print()
 
     if verbose and results:
@@ -1,26 +1,62 @@
 """
 Главный модуль ETL пакета с CLI интерфейсом.
+
+Тяжелые зависимости (pandas, SQLAlchemy, pyarrow) и модули этапов
+импортируются внутри функций, которым они нужны: `--help` и разбор
+аргументов не загружают их (см. benchmarks/bench_startup.py).
 """
 
 import argparse
+import functools
+import json
 import sys
-import sqlite3
-import pandas as pd
-from etl.extract import extract
-from etl.transform import transform
-from etl.load import load
-from etl.validate import validate_output
+from typing import TYPE_CHECKING
+
+from etl.defaults import DEFAULT_KEY_COLUMN, DEFAULT_SQLITE_INDEXES, PROFILE_MODES, STAGE_NAMES
+from etl.memory import parse_memory_limit
+from etl.metrics import DEFAULT_METRICS_PATH, MetricsRecorder
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from etl.pipeline import Pipeline
+
+
+def read_derived_config(path: str) -> dict:
+    """Конфигурация производных столбцов из JSON файла (для argparse)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise argparse.ArgumentTypeError(f"не удалось прочитать {path}: {e}")
+    if not isinstance(config, dict):
+        raise argparse.ArgumentTypeError(f"{path}: ожидается объект {{\"имя\": \"выражение\"}}")
+    return config
 
 
 def show_database_content(db_path: str = 'data/processed/data.db', table_name: str = 'processed_data') -> None:
     """
     Показывает содержимое БД
+
+    Схема и количество строк берутся из каталога (etl_catalog),
+    если он есть, иначе считаются по таблице.
     """
+    import sqlite3
+    import pandas as pd
+    from etl.catalog import read_catalog
+
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name});")
-        columns = cursor.fetchall()
+        entry = read_catalog(conn, table_name)
+
+        if entry:
+            columns = [(col['name'], col['type']) for col in entry['columns']]
+            row_count = entry['row_count']
+        else:
+            cursor.execute(f"PRAGMA table_info({table_name});")
+            columns = [(col[1], col[2]) for col in cursor.fetchall()]
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
+            row_count = cursor.fetchone()[0]
 
         print("\n" + "="*70)
         print("СОДЕРЖИМОЕ SQLite БД")
@@ -28,14 +64,13 @@ def show_database_content(db_path: str = 'data/processed/data.db', table_name: s
 
         print(f"Таблица: {table_name}")
         print(f"Столбцы ({len(columns)}):")
-        for col in columns:
-            col_name = col[1]
-            col_type = col[2]
+        for col_name, col_type in columns:
             print(f"  {col_name}: {col_type}")
 
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
-        row_count = cursor.fetchone()[0]
-        print(f"\nВсего строк: {row_count}\n")
+        print(f"\nВсего строк: {row_count}")
+        if entry:
+            print(f"Загружено: {entry['loaded_at']} (данные: {entry['data_fingerprint']})")
+        print()
 
         print("-"*70)
         print("Первые 10 строк из БД:")
@@ -51,50 +86,303 @@ def show_database_content(db_path: str = 'data/processed/data.db', table_name: s
         print(f"Ошибка при чтении БД: {e}")
 
 
+def extract_stage(input_file: str = None, google_drive_id: str = None,
+                  memory_limit: int = None) -> 'pd.DataFrame':
+    """
+    Этап EXTRACT. При memory_limit CSV читается чанками и результатом
+    является etl.extract.ChunkedSource, а не DataFrame.
+    """
+    from etl.extract import extract, extract_chunked
+
+    print("ЭТАП 1: EXTRACT")
+    print("-"*70)
+    if memory_limit:
+        from etl.memory import MemoryBudget
+
+        df = extract_chunked(MemoryBudget(memory_limit), source_path=input_file,
+                             google_drive_id=google_drive_id)
+    else:
+        df = extract(source_path=input_file, google_drive_id=google_drive_id)
+    print(f"Загружено: {df.shape[0]} строк × {df.shape[1]} столбцов\n")
+    return df
+
+
+def transform_stage(raw: 'pd.DataFrame', memory_limit: int = None,
+                    derived: dict = None, workers: int = None) -> 'pd.DataFrame':
+    """
+    Этап TRANSFORM (чанками, если extract вернул ChunkedSource).
+    derived — конфигурация производных столбцов (см. etl.derive).
+    workers > 1 — шардированная обработка в нескольких процессах
+    (см. etl.shards).
+    """
+    from etl.extract import ChunkedSource
+    from etl.transform import transform, transform_chunks
+
+    print("ЭТАП 2: TRANSFORM")
+    print("-"*70)
+    if isinstance(raw, ChunkedSource):
+        from etl.memory import MemoryBudget
+
+        if workers and workers > 1:
+            print("  --workers не используется с --memory-limit: обработка чанками в одном процессе")
+        df = transform_chunks(raw.chunks(), MemoryBudget(memory_limit), derived=derived)
+    elif workers and workers > 1:
+        from etl.shards import transform_sharded
+
+        df = transform_sharded(raw, workers, derived=derived)
+    else:
+        df = transform(raw, derived=derived)
+    print()
+    return df
+
+
+def validate_stage(df: 'pd.DataFrame', workers: int = None) -> dict:
+    """
+    Этап VALIDATE: возвращает статистику столбцов для каталога.
+    workers > 1 — статистика шардов объединяется (см. etl.shards).
+    """
+    from etl.validate import validate_dataset
+
+    print("ЭТАП 3: VALIDATE")
+    print("-"*70)
+    if workers and workers > 1:
+        from etl.shards import validate_sharded
+
+        column_stats, _ = validate_sharded(df, workers)
+    else:
+        column_stats, _ = validate_dataset(df)
+    print("Валидация пройдена успешно\n")
+    return column_stats
+
+
+def aggregate_stage(df: 'pd.DataFrame', **options) -> dict:
+    """Этап AGGREGATE: кубы для EDA и дашбордов (см. etl.aggregate)."""
+    from etl.aggregate import build_cubes
+
+    print("ЭТАП 4: AGGREGATE")
+    print("-"*70)
+    cubes = build_cubes(df, **options)
+    print(f"Кубов: {len(cubes)}, строк в них: {sum(len(cube) for cube in cubes.values())}\n")
+    return cubes
+
+
+def load_stage(df: 'pd.DataFrame',
+               column_stats: dict,
+               cubes: dict,
+               stage_key: str,
+               source: str = None,
+               metrics: MetricsRecorder = None,
+               memory_limit: int = None,
+               **load_options) -> dict:
+    """
+    Этап LOAD. Чекпоинт синков привязан к ключу этапа, поэтому
+    повторный запуск после сбоя продолжает загрузку с места остановки.
+    При memory_limit размер чанков БД и срезов файлов выбирается по
+    размеру строки датасета.
+    """
+    from etl.checkpoint import LoadCheckpoint
+    from etl.load import load
+
+    checkpoint = LoadCheckpoint(stage_key)
+
+    print("ЭТАП 5: LOAD")
+    print("-"*70)
+    if memory_limit:
+        from etl.memory import MemoryBudget, format_bytes, frame_row_bytes
+
+        budget = MemoryBudget(memory_limit)
+        row_bytes = frame_row_bytes(df)
+        # Срез в Arrow/SQL параметрах занимает несколько своих размеров в pandas
+        slice_rows = budget.chunk_rows(row_bytes, overhead=4.0)
+        load_options['slice_rows'] = slice_rows
+        load_options['chunksize'] = min(load_options.get('chunksize') or slice_rows, slice_rows)
+        print(f"Оценка: {format_bytes(row_bytes)} на строку, срез {slice_rows:,} строк "
+              f"({budget.describe()})")
+    results = load(
+        df,
+        verbose=True,
+        checkpoint=checkpoint,
+        catalog={'column_stats': column_stats, 'source_fingerprint': source},
+        metrics=metrics,
+        cubes=cubes,
+        **load_options
+    )
+
+    if all(results.values()):
+        checkpoint.clear()
+    else:
+        failed = ', '.join(name for name, ok in results.items() if not ok)
+        print(f"⚠ Не удалось загрузить: {failed}. "
+              f"Повторный запуск продолжит загрузку с места сбоя\n")
+
+    return results
+
+
+def build_pipeline(input_file: str = None,
+                   google_drive_id: str = None,
+                   postgresql_table: str = None,
+                   max_rows: int = 100,
+                   chunksize: int = 1000,
+                   csv_options: dict = None,
+                   sqlite_indexes: list = None,
+                   metrics: MetricsRecorder = None,
+                   reuse_connections: bool = False,
+                   memory_limit: int = None,
+                   key_index: str = None,
+                   sqlite_swap: bool = False,
+                   sqlite_compact: bool = False,
+                   derived: dict = None,
+                   workers: int = None,
+                   partition: str = None,
+                   cache_stages: bool = True) -> 'Pipeline':
+    """
+    Граф этапов ETL: extract → transform → validate, aggregate → load.
+
+    Результаты extract, transform и validate кешируются на диске по
+    ключу из параметров, кода этапа и ключей входов. load выполняется
+    всегда, поэтому смена опций синков не вызывает повторную загрузку
+    и трансформацию исходных данных.
+
+    Модули этапов передаются в code именами: их код хешируется без
+    импорта, модуль загружается, только когда этап выполняется.
+    memory_limit (байты) включает чанковую обработку (см. etl.memory).
+    key_index — столбец индекса точечного поиска (см. etl.key_index).
+    sqlite_swap=True пишет SQLite в промежуточную таблицу и подменяет
+    processed_data после загрузки (читатели не видят неполную таблицу).
+    sqlite_compact=True хранит категории SQLite кодами со словарями,
+    а processed_data — представление (см. etl.sqlite_compact).
+    derived — производные столбцы TRANSFORM (см. etl.derive); входят в
+    ключ кеша этапа. workers — число процессов TRANSFORM и VALIDATE
+    (см. etl.shards). partition — имя исходного файла, выгрузки которого
+    не затирают выгрузки других файлов (см. etl.load.load).
+    cache_stages=False не сохраняет результаты этапов в кеш: в режиме
+    --watch каждый файл обрабатывается один раз, и кеш только растет.
+    """
+    from etl.checkpoint import source_fingerprint
+    from etl.pipeline import Pipeline, Stage
+
+    source = source_fingerprint(input_file, google_drive_id)
+    metrics = metrics or MetricsRecorder()
+
+    return Pipeline([
+        Stage('extract', extract_stage,
+              params={'input_file': input_file, 'google_drive_id': google_drive_id,
+                      'memory_limit': memory_limit},
+              key_params={'source': source},
+              code=('etl.extract', 'etl.memory'),
+              cacheable=cache_stages),
+        Stage('transform', transform_stage, inputs=('extract',),
+              params={'memory_limit': memory_limit, 'derived': derived, 'workers': workers},
+              code=('etl.transform', 'etl.memory', 'etl.derive', 'etl.shards'),
+              cacheable=cache_stages),
+        Stage('validate', validate_stage, inputs=('transform',),
+              params={'workers': workers},
+              code=('etl.validate', 'etl.shards'),
+              cacheable=cache_stages),
+        Stage('aggregate', aggregate_stage, inputs=('transform',),
+              params={'target': 'Churn', 'max_categories': 20, 'bins': 20},
+              code=('etl.aggregate',),
+              cacheable=cache_stages),
+        Stage('load', functools.partial(load_stage, metrics=metrics),
+              inputs=('transform', 'validate', 'aggregate'),
+              params={
+                  'source': source,
+                  'sqlite_db_path': 'data/processed/data.db',
+                  'postgresql_table': postgresql_table,
+                  'parquet_path': 'data/processed/data.parquet',
+                  'csv_path': 'data/processed/data.csv',
+                  'feather_path': 'data/processed/data.feather',
+                  'cubes_dir': 'data/processed/cubes',
+                  'snapshot_dir': 'data/snapshots',
+                  'max_rows': max_rows,
+                  'chunksize': chunksize,
+                  'csv_options': csv_options,
+                  'sqlite_indexes': DEFAULT_SQLITE_INDEXES if sqlite_indexes is None else sqlite_indexes,
+                  'reuse_connections': reuse_connections,
+                  'memory_limit': memory_limit,
+                  'key_index': key_index,
+                  'sqlite_swap': sqlite_swap,
+                  'sqlite_compact': sqlite_compact,
+                  'partition': partition,
+              },
+              code=('etl.load',),
+              cacheable=False,
+              with_key=True),
+    ], metrics=metrics)
+
+
 def run_etl(input_file: str = None,
             google_drive_id: str = None,
             postgresql_table: str = None,
-            max_rows: int = 100) -> None:
+            max_rows: int = 100,
+            chunksize: int = 1000,
+            fresh: bool = False,
+            csv_options: dict = None,
+            sqlite_indexes: list = None,
+            from_stage: str = None,
+            only: list = None,
+            metrics_out: str = DEFAULT_METRICS_PATH,
+            profile: str = None,
+            profile_dir: str = None,
+            profile_top: int = 15,
+            memory_limit: int = None,
+            key_index: str = None,
+            sqlite_swap: bool = False,
+            sqlite_compact: bool = False,
+            derived: dict = None,
+            workers: int = None) -> None:
     """
     Запускает полный ETL процесс
+
+    Этапы с закешированным результатом пропускаются (см. build_pipeline).
+    from_stage пересчитывает указанный этап и все ниже него, only — только
+    указанные этапы (входы из кеша). fresh=True пересчитывает все этапы
+    и сбрасывает чекпоинт загрузки. Метрики этапов и синков сохраняются
+    в metrics_out (JSON) и рядом в .prom для Prometheus. profile
+    ('cpu', 'memory', 'both') включает профилирование каждого шага.
+    memory_limit (байты) — бюджет памяти, см. etl.memory. key_index —
+    столбец индекса точечного поиска по Feather и Parquet. sqlite_swap —
+    загрузка SQLite с подменой таблицы, sqlite_compact — с кодированием
+    категорий и дат. derived — производные столбцы. workers — число
+    процессов TRANSFORM и VALIDATE.
     """
-    print("\nЗАПУСК ETL ПРОЦЕССА\n")
+    from etl.checkpoint import LoadCheckpoint
 
-    try:
-        # EXTRACT
-        print("ЭТАП 1: EXTRACT")
-        print("-"*70)
-        df = extract(source_path=input_file, google_drive_id=google_drive_id)
-        print(f"Загружено: {df.shape[0]} строк × {df.shape[1]} столбцов\n")
+    print("\nЗАПУСК ETL ПРОЦЕССА\n")
+    profiler = None
+    if profile:
+        from etl.profiling import StageProfiler, default_profile_dir
 
-        # TRANSFORM
-        print("ЭТАП 2: TRANSFORM")
-        print("-"*70)
-        df = transform(df)
-        print()
+        profiler = StageProfiler(profile, profile_dir or default_profile_dir(), top_n=profile_top)
+        print(f"Профилирование ({profile}): {profiler.out_dir}\n")
+    metrics = MetricsRecorder(profiler=profiler)
 
-        # VALIDATE
-        print("ЭТАП 3: VALIDATE")
-        print("-"*70)
-        validate_output(df, verbose=False)
-        print("Валидация пройдена успешно\n")
-
-        # LOAD
-        print("ЭТАП 4: LOAD")
-        print("-"*70)
-        results = load(
-            df,
-            sqlite_db_path='data/processed/data.db',
+    try:
+        pipeline = build_pipeline(
+            input_file=input_file,
+            google_drive_id=google_drive_id,
             postgresql_table=postgresql_table,
-            parquet_path='data/processed/data.parquet',
-            csv_path='data/processed/data.csv',
-            feather_path='data/processed/data.feather',
             max_rows=max_rows,
-            verbose=True
+            chunksize=chunksize,
+            csv_options=csv_options,
+            sqlite_indexes=sqlite_indexes,
+            metrics=metrics,
+            memory_limit=memory_limit,
+            key_index=key_index,
+            sqlite_swap=sqlite_swap,
+            sqlite_compact=sqlite_compact,
+            derived=derived,
+            workers=workers
         )
+        if fresh:
+            LoadCheckpoint(pipeline.keys['load']).clear()
+            from_stage = 'extract'
+
+        values = pipeline.run(from_stage=from_stage, only=only)
 
         # Показываем содержимое БД
-        show_database_content()
+        if 'load' in values:
+            show_database_content()
 
         print("ETL ПРОЦЕСС ЗАВЕРШЕН УСПЕШНО!\n")
 
@@ -104,6 +392,12 @@ def run_etl(input_file: str = None,
         traceback.print_exc()
         sys.exit(1)
 
+    finally:
+        if metrics_out and metrics.steps:
+            prom_path = metrics.write(metrics_out)
+            print(metrics.summary())
+            print(f"\nМетрики: {metrics_out}, {prom_path}\n")
+
 
 def main():
     """
@@ -118,6 +412,8 @@ def main():
   python -m etl.main --file data/input.csv
   python -m etl.main --google-drive-id YOUR_FILE_ID
   python -m etl.main --google-drive-id YOUR_FILE_ID --table my_table --max-rows 100
+  python -m etl.main --watch data/incoming
+  python -m etl.main --file data/input.csv --plan
         """
     )
 
@@ -136,6 +432,29 @@ def main():
         type=str,
         help='Google Drive FILE_ID для загрузки данных'
     )
+    source_group.add_argument(
+        '--watch',
+        type=str,
+        metavar='DIR',
+        help='Режим демона: обрабатывать новые файлы в папке DIR, не завершая процесс. '
+             'Выгрузки каждого файла пишутся отдельно (строки source_file в БД, '
+             'data.<файл>.parquet и т.д.); между файлами переиспользуются только '
+             'модули и engine PostgreSQL'
+    )
+
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=2.0,
+        help='Период проверки папки в режиме --watch, секунды (по умолчанию: 2)'
+    )
+
+    parser.add_argument(
+        '--watch-queue-size',
+        type=int,
+        default=100,
+        help='Максимум файлов в очереди обработки в режиме --watch (по умолчанию: 100)'
+    )
 
     parser.add_argument(
         '--table',
@@ -151,14 +470,247 @@ def main():
         help='Максимальное количество строк для БД (по умолчанию: 100)'
     )
 
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=1000,
+        help='Размер чанка при записи в БД, каждый чанк фиксируется в чекпоинте (по умолчанию: 1000)'
+    )
+
+    parser.add_argument(
+        '--memory-limit',
+        type=parse_memory_limit,
+        default=None,
+        metavar='SIZE',
+        help='Бюджет памяти процесса (512M, 2G, auto — лимит cgroup): размер чанков '
+             'выбирается по оценке размера строки, хеши дубликатов сбрасываются на диск'
+    )
+
+    parser.add_argument(
+        '--key-index',
+        nargs='?',
+        const=DEFAULT_KEY_COLUMN,
+        default=None,
+        metavar='COLUMN',
+        help='Построить индекс точечного поиска по столбцу для Feather и Parquet '
+             f'(без значения: {DEFAULT_KEY_COLUMN}), см. python -m etl.key_index'
+    )
+
+    parser.add_argument(
+        '--derived',
+        type=read_derived_config,
+        default=None,
+        metavar='FILE',
+        help='JSON конфигурация производных столбцов, вычисляемых в TRANSFORM '
+             '({"имя": "выражение"}, см. etl/derive.py)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Число процессов для TRANSFORM и VALIDATE: строки делятся на шарды, '
+             'результат совпадает с обработкой в одном процессе (см. etl/shards.py)'
+    )
+
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='Оценить запуск без записи результатов: этапы прогоняются на выборке, '
+             'выводятся время, пиковая память и размеры результатов для всего источника'
+    )
+
+    parser.add_argument(
+        '--fresh',
+        action='store_true',
+        help='Игнорировать кеш этапов и чекпоинт загрузки, начать с EXTRACT'
+    )
+
+    parser.add_argument(
+        '--from-stage',
+        choices=STAGE_NAMES,
+        default=None,
+        help='Пересчитать этап и все этапы ниже него, даже если есть кеш'
+    )
+
+    parser.add_argument(
+        '--only',
+        type=lambda value: [name.strip() for name in value.split(',') if name.strip()],
+        default=None,
+        metavar='STAGES',
+        help='Выполнить только указанные этапы через запятую, входы берутся из кеша '
+             '(например: --only load)'
+    )
+
+    parser.add_argument(
+        '--csv-engine',
+        choices=['arrow', 'pandas'],
+        default='pandas',
+        help='Писатель CSV: pandas.to_csv или многопоточный pyarrow — быстрее, но строки '
+             'пишутся в кавычках, логические значения как true/false (по умолчанию: pandas)'
+    )
+
+    parser.add_argument(
+        '--csv-compression',
+        choices=['none', 'gzip', 'zstd'],
+        default='none',
+        help='Потоковое сжатие CSV (по умолчанию: none)'
+    )
+
+    parser.add_argument(
+        '--csv-shards',
+        type=int,
+        default=1,
+        help='Количество CSV шардов, записываемых параллельно, только с --csv-engine arrow (по умолчанию: 1)'
+    )
+
+    parser.add_argument(
+        '--sqlite-index',
+        action='append',
+        default=None,
+        metavar='COLUMNS',
+        help='Индекс SQLite после загрузки, можно повторять: '
+             '--sqlite-index Churn --sqlite-index "Churn, Contract" '
+             f'(по умолчанию: {"; ".join(DEFAULT_SQLITE_INDEXES)})'
+    )
+
+    parser.add_argument(
+        '--no-sqlite-indexes',
+        action='store_true',
+        help='Не строить индексы SQLite'
+    )
+
+    parser.add_argument(
+        '--sqlite-swap',
+        action='store_true',
+        help='Писать SQLite в processed_data__new и подменять processed_data '
+             'переименованием: читатели не видят пустую или неполную таблицу'
+    )
+
+    parser.add_argument(
+        '--sqlite-compact',
+        action='store_true',
+        help='Хранить категории SQLite кодами со словарями, даты — числом секунд; '
+             'processed_data становится декодирующим представлением (меньше файл БД, '
+             'быстрее фильтры)'
+    )
+
+    parser.add_argument(
+        '--metrics-out',
+        type=str,
+        default=DEFAULT_METRICS_PATH,
+        help='JSON отчет с метриками этапов; рядом пишется .prom для '
+             f'Prometheus textfile-коллектора (по умолчанию: {DEFAULT_METRICS_PATH}). '
+             'Пустая строка отключает запись'
+    )
+
+    parser.add_argument(
+        '--profile',
+        choices=PROFILE_MODES,
+        default=None,
+        help='Профилировать каждый этап и синк: cpu (cProfile + folded stacks), '
+             'memory (tracemalloc) или both'
+    )
+
+    parser.add_argument(
+        '--profile-dir',
+        type=str,
+        default=None,
+        help='Папка для файлов профилирования (по умолчанию: data/profiles/<время>)'
+    )
+
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=15,
+        help='Сколько горячих мест печатать для каждого шага (по умолчанию: 15)'
+    )
+
     args = parser.parse_args()
 
+    csv_options = {
+        'engine': args.csv_engine,
+        'compression': None if args.csv_compression == 'none' else args.csv_compression,
+        'shards': args.csv_shards,
+    }
+    sqlite_indexes = [] if args.no_sqlite_indexes else args.sqlite_index
+    if args.csv_shards != 1 and args.csv_engine != 'arrow':
+        parser.error('--csv-shards требует --csv-engine arrow')
+
+    if args.plan:
+        if args.watch:
+            parser.error('--plan не используется с --watch')
+        from etl.plan import estimate_run, format_plan
+
+        plan = estimate_run(
+            input_file=args.file,
+            google_drive_id=args.google_drive_id,
+            postgresql_table=args.table,
+            max_rows=args.max_rows,
+            chunksize=args.chunk_size,
+            csv_options=csv_options,
+            sqlite_indexes=sqlite_indexes,
+            memory_limit=args.memory_limit,
+            key_index=args.key_index,
+            sqlite_swap=args.sqlite_swap,
+            sqlite_compact=args.sqlite_compact,
+            derived=args.derived,
+            workers=args.workers
+        )
+        print(format_plan(plan))
+        return
+
+    if args.watch:
+        from etl.watch import FolderWatcher
+
+        if args.sqlite_swap or args.sqlite_compact:
+            parser.error('--sqlite-swap и --sqlite-compact не используются с --watch: '
+                         'строки файлов дописываются в общую таблицу')
+
+        FolderWatcher(
+            args.watch,
+            pipeline_options={
+                'postgresql_table': args.table,
+                'max_rows': args.max_rows,
+                'chunksize': args.chunk_size,
+                'csv_options': csv_options,
+                'sqlite_indexes': sqlite_indexes,
+                'memory_limit': args.memory_limit,
+                'key_index': args.key_index,
+                'sqlite_swap': args.sqlite_swap,
+                'sqlite_compact': args.sqlite_compact,
+                'derived': args.derived,
+                'workers': args.workers,
+            },
+            interval=args.watch_interval,
+            queue_size=args.watch_queue_size,
+            metrics_out=args.metrics_out,
+        ).run()
+        return
+
     # Запуск ETL
     run_etl(
         input_file=args.file,
         google_drive_id=args.google_drive_id,
         postgresql_table=args.table,
-        max_rows=args.max_rows
+        max_rows=args.max_rows,
+        chunksize=args.chunk_size,
+        fresh=args.fresh,
+        csv_options=csv_options,
+        sqlite_indexes=sqlite_indexes,
+        from_stage=args.from_stage,
+        only=args.only,
+        metrics_out=args.metrics_out,
+        profile=args.profile,
+        profile_dir=args.profile_dir,
+        profile_top=args.profile_top,
+        memory_limit=args.memory_limit,
+        key_index=args.key_index,
+        sqlite_swap=args.sqlite_swap,
+        sqlite_compact=args.sqlite_compact,
+        derived=args.derived,
+        workers=args.workers
     )
 
 
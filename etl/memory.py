@@ -0,0 +1,251 @@
+"""
+Бюджет памяти ETL (--memory-limit).
+
+Размер строки оценивается по выборке, по нему выбираются размеры
+чанков extract/transform/load, чтобы процесс укладывался в лимит
+(например, жесткий лимит cgroup на общих воркерах). Состояние, которое
+растет вместе с данными (хеши строк для удаления дубликатов), при
+приближении к бюджету сбрасывается на диск.
+
+Модуль не импортирует pandas и numpy на верхнем уровне: parse_memory_limit
+используется при разборе аргументов CLI.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from etl.metrics import read_peak_rss
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+DEFAULT_SPILL_DIR = 'data/cache/spill'
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# Лимиты cgroup больше этого значения означают "без лимита" (cgroup v1)
+UNLIMITED_CGROUP_BYTES = 1 << 60
+
+
+class MemoryBudgetError(MemoryError):
+    """Данные не помещаются в заданный лимит памяти."""
+
+
+def cgroup_memory_limit() -> Optional[int]:
+    """Лимит памяти cgroup (v2 или v1) в байтах или None, если лимита нет."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            value = Path(path).read_text().strip()
+        except OSError:
+            continue
+        if value == 'max':
+            return None
+        limit = int(value)
+        return limit if limit < UNLIMITED_CGROUP_BYTES else None
+    return None
+
+
+def parse_memory_limit(value: str) -> int:
+    """
+    Лимит памяти из строки: '512M', '2G', '1.5G', '1073741824' или
+    'auto' (лимит cgroup текущего процесса).
+    """
+    value = value.strip().upper()
+    if value == 'AUTO':
+        limit = cgroup_memory_limit()
+        if limit is None:
+            raise ValueError("лимит памяти cgroup не задан, укажите размер явно")
+        return limit
+
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?', value)
+    if not match:
+        raise ValueError(f"неверный размер: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('Б', 'КБ', 'МБ', 'ГБ'):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ТБ"
+
+
+def current_rss() -> int:
+    """Текущий RSS процесса в байтах (в Linux — из /proc/self/statm)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return read_peak_rss()
+
+
+def release_memory() -> None:
+    """
+    Собирает мусор и возвращает системе освобожденную память кучи
+    (malloc_trim в glibc): без этого RSS после обработки чанков остается
+    на пиковом уровне, и проверки бюджета срабатывают раньше времени.
+    """
+    gc.collect()
+    libc_name = ctypes.util.find_library('c')
+    if libc_name:
+        try:
+            ctypes.CDLL(libc_name).malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+def frame_row_bytes(df: 'pd.DataFrame') -> float:
+    """Средний размер строки DataFrame в памяти (со строками Python объектов)."""
+    return float(df.memory_usage(deep=True, index=False).sum()) / max(len(df), 1)
+
+
+class MemoryBudget:
+    """
+    Бюджет памяти запуска.
+
+    Args:
+        limit_bytes: жесткий лимит процесса
+        reserve: доля лимита, оставляемая интерпретатору, библиотекам и
+            фрагментации аллокатора
+        chunk_share: доля рабочего бюджета на один чанк
+        spill_dir: папка для временных файлов сброса на диск
+    """
+
+    def __init__(self,
+                 limit_bytes: int,
+                 reserve: float = 0.25,
+                 chunk_share: float = 0.05,
+                 spill_dir: Union[str, Path] = DEFAULT_SPILL_DIR):
+        self.limit_bytes = limit_bytes
+        self.usable_bytes = int(limit_bytes * (1 - reserve))
+        self.chunk_share = chunk_share
+        self.spill_dir = Path(spill_dir)
+
+    def available(self) -> int:
+        """Сколько байт рабочего бюджета еще свободно."""
+        return self.usable_bytes - current_rss()
+
+    def near_limit(self, extra_bytes: int = 0) -> bool:
+        """Не уместятся ли еще extra_bytes в рабочий бюджет."""
+        if current_rss() + extra_bytes <= self.usable_bytes:
+            return False
+        release_memory()
+        return current_rss() + extra_bytes > self.usable_bytes
+
+    def chunk_rows(self, row_bytes: float, overhead: float = 1.0,
+                   minimum: int = 1_000, maximum: int = 1_000_000) -> int:
+        """
+        Строк в чанке, чтобы чанк с учетом промежуточных копий
+        (overhead — во сколько раз обработка чанка больше его самого)
+        занимал chunk_share рабочего бюджета.
+        """
+        rows = int(self.usable_bytes * self.chunk_share / max(row_bytes * overhead, 1.0))
+        return max(minimum, min(rows, maximum))
+
+    def describe(self) -> str:
+        return (f"лимит {format_bytes(self.limit_bytes)}, рабочий бюджет "
+                f"{format_bytes(self.usable_bytes)}, занято {format_bytes(current_rss())}")
+
+
+def _isin_sorted(sorted_values: 'np.ndarray', values: 'np.ndarray') -> 'np.ndarray':
+    import numpy as np
+
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_values, values)
+    positions[positions == len(sorted_values)] = 0
+    return sorted_values[positions] == values
+
+
+def hash_rows(df: 'pd.DataFrame') -> 'np.ndarray':
+    """
+    64-битные хеши строк. Числовые столбцы приводятся к float64, чтобы
+    одна и та же строка давала один хеш в чанках, где pandas вывел для
+    столбца int или float.
+    """
+    import pandas as pd
+
+    normalized = df.copy(deep=False)
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]):
+            normalized[column] = df[column].astype('float64')
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+class SpillingDeduplicator:
+    """
+    Удаление дубликатов строк между чанками с ограниченной памятью.
+
+    Хранит отсортированные хеши уже встреченных строк. Когда хеши в
+    памяти превышают budget_bytes, они сбрасываются на диск отсортированным
+    прогоном (.npy) и дальше проверяются через memory map: страницы файла
+    не занимают анонимную память процесса и вытесняются ядром.
+    Совпадение строк определяется по 64-битному хешу.
+    """
+
+    def __init__(self, budget_bytes: int, spill_dir: Union[str, Path] = DEFAULT_SPILL_DIR):
+        import numpy as np
+
+        self.budget_bytes = budget_bytes
+        self.spill_root = Path(spill_dir)
+        self._dir: Optional[Path] = None
+        self._memory = np.empty(0, dtype=np.uint64)
+        self._runs: List['np.ndarray'] = []
+        self.spilled_bytes = 0
+
+    def first_occurrences(self, chunk: 'pd.DataFrame') -> 'np.ndarray':
+        """Маска строк чанка, которые не встречались раньше (ни в чанке, ни до него)."""
+        import numpy as np
+
+        hashes = hash_rows(chunk)
+        unique, first_index = np.unique(hashes, return_index=True)
+
+        seen = _isin_sorted(self._memory, unique)
+        for run in self._runs:
+            seen |= _isin_sorted(run, unique)
+
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first_index[~seen]] = True
+
+        self._memory = np.union1d(self._memory, unique[~seen])
+        if self._memory.nbytes > self.budget_bytes:
+            self._spill()
+        return keep
+
+    def _spill(self) -> None:
+        import numpy as np
+
+        if self._dir is None:
+            self.spill_root.mkdir(parents=True, exist_ok=True)
+            self._dir = Path(tempfile.mkdtemp(prefix='dedup-', dir=self.spill_root))
+        path = self._dir / f"run-{len(self._runs):05d}.npy"
+        np.save(path, self._memory)
+        self.spilled_bytes += self._memory.nbytes
+        self._runs.append(np.load(path, mmap_mode='r'))
+        self._memory = np.empty(0, dtype=np.uint64)
+
+    @property
+    def spilled_runs(self) -> int:
+        return len(self._runs)
+
+    def close(self) -> None:
+        """Удаляет файлы сброса."""
+        self._runs = []
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self) -> 'SpillingDeduplicator':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,213 @@
+"""
+Метрики производительности этапов и синков ETL.
+
+Для каждого шага записываются wall/CPU время, строки на входе и выходе,
+строк/сек, байты чтения/записи процесса и пиковый RSS. Отчет сохраняется
+в JSON и в формате textfile-коллектора Prometheus (node_exporter).
+"""
+
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+from etl.checkpoint import atomic_path
+
+if TYPE_CHECKING:
+    from etl.profiling import StageProfiler
+
+DEFAULT_METRICS_PATH = 'data/metrics/etl_run.json'
+
+PROMETHEUS_METRICS = {
+    'wall_seconds': 'Wall time шага, секунды',
+    'cpu_seconds': 'CPU время процесса за шаг, секунды',
+    'rows_in': 'Строк на входе шага',
+    'rows_out': 'Строк на выходе шага',
+    'rows_per_second': 'Пропускная способность шага, строк в секунду',
+    'bytes_read': 'Байт прочитано процессом за шаг',
+    'bytes_written': 'Байт записано процессом за шаг',
+    'peak_rss_bytes': 'Пиковый RSS процесса во время шага, байты',
+}
+
+
+def read_io_counters() -> Dict[str, Optional[int]]:
+    """Счетчики ввода-вывода процесса из /proc/self/io (только Linux)."""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(':') for line in f.read().splitlines())
+        return {'read': int(counters['rchar']), 'written': int(counters['wchar'])}
+    except (OSError, KeyError, ValueError):
+        return {'read': None, 'written': None}
+
+
+def reset_peak_rss() -> bool:
+    """Сбрасывает пиковый RSS (VmHWM) процесса; доступно в Linux >= 4.0."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss() -> int:
+    """Пиковый RSS процесса в байтах (с момента последнего сброса, если он был)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В macOS ru_maxrss в байтах, в Linux — в килобайтах
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MetricsRecorder:
+    """
+    Сбор метрик шагов запуска.
+
+    Если передан profiler (etl.profiling.StageProfiler), каждый шаг
+    дополнительно профилируется.
+
+    Пример:
+        recorder = MetricsRecorder()
+        with recorder.measure('transform', rows_in=len(df)) as step:
+            df = transform(df)
+            step['rows_out'] = len(df)
+        recorder.write('data/metrics/etl_run.json')
+    """
+
+    def __init__(self, profiler: Optional['StageProfiler'] = None):
+        self.profiler = profiler
+        self.started_at = datetime.now()
+        self.steps: List[dict] = []
+        self._stack: List[dict] = []
+
+    @contextmanager
+    def measure(self, name: str, kind: str = 'stage', rows_in: Optional[int] = None):
+        """
+        Измеряет шаг. В отдаваемый словарь можно записать rows_out,
+        rows_in и cached. Вложенные шаги (синки внутри LOAD) учитываются
+        в пиковом RSS внешнего шага.
+        """
+        step = {'name': name, 'kind': kind, 'rows_in': rows_in, 'rows_out': None}
+        if self._stack:
+            # Сброс пика ниже потеряет пик внешнего шага — запоминаем его
+            parent = self._stack[-1]
+            parent['_child_peak'] = max(parent.get('_child_peak', 0), read_peak_rss())
+
+        io_before = read_io_counters()
+        peak_resettable = reset_peak_rss()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        self._stack.append(step)
+
+        try:
+            if self.profiler is None:
+                yield step
+            else:
+                with self.profiler.profile(f"{kind}-{name}"):
+                    yield step
+            step['status'] = 'ok'
+        except BaseException:
+            step['status'] = 'error'
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            io_after = read_io_counters()
+            self._stack.pop()
+
+            step['wall_seconds'] = wall
+            step['cpu_seconds'] = time.process_time() - cpu_start
+            step['bytes_read'] = (
+                io_after['read'] - io_before['read'] if io_before['read'] is not None else None
+            )
+            step['bytes_written'] = (
+                io_after['written'] - io_before['written'] if io_before['written'] is not None else None
+            )
+            step['peak_rss_bytes'] = max(read_peak_rss(), step.pop('_child_peak', 0))
+            step['peak_rss_exact'] = peak_resettable
+
+            rows = step['rows_out'] if step['rows_out'] is not None else step['rows_in']
+            step['rows_per_second'] = rows / wall if rows is not None and wall > 0 else None
+
+            if self._stack:
+                parent = self._stack[-1]
+                parent['_child_peak'] = max(parent.get('_child_peak', 0), step['peak_rss_bytes'])
+
+            self.steps.append(step)
+
+    def report(self) -> dict:
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'success': all(step['status'] == 'ok' for step in self.steps),
+            'steps': self.steps,
+        }
+
+    def to_prometheus(self) -> str:
+        """Отчет в текстовом формате Prometheus."""
+        lines = []
+        for metric, help_text in PROMETHEUS_METRICS.items():
+            name = f"etl_step_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for step in self.steps:
+                value = step.get(metric)
+                if value is None:
+                    continue
+                labels = f'step="{step["name"]}",kind="{step["kind"]}"'
+                if 'cached' in step:
+                    labels += f',cached="{str(step["cached"]).lower()}"'
+                lines.append(f"{name}{{{labels}}} {float(value):.6g}")
+
+        report = self.report()
+        lines += [
+            "# HELP etl_run_success 1, если все шаги запуска завершились успешно",
+            "# TYPE etl_run_success gauge",
+            f"etl_run_success {int(report['success'])}",
+            "# HELP etl_run_timestamp_seconds Время завершения запуска (unix)",
+            "# TYPE etl_run_timestamp_seconds gauge",
+            f"etl_run_timestamp_seconds {time.time():.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: Union[str, Path] = DEFAULT_METRICS_PATH) -> Path:
+        """
+        Пишет JSON отчет и рядом файл .prom для textfile-коллектора.
+
+        Returns:
+            Путь к .prom файлу
+        """
+        json_path = Path(json_path)
+        prom_path = json_path.with_suffix('.prom')
+
+        with atomic_path(json_path) as tmp_path:
+            tmp_path.write_text(
+                json.dumps(self.report(), ensure_ascii=False, indent=2), encoding='utf-8'
+            )
+        with atomic_path(prom_path) as tmp_path:
+            tmp_path.write_text(self.to_prometheus(), encoding='utf-8')
+
+        return prom_path
+
+    def summary(self) -> str:
+        """Короткая таблица для вывода в консоль."""
+        lines = [f"{'шаг':24} {'wall, с':>9} {'CPU, с':>9} {'строк':>10} {'строк/с':>12} {'RSS, МБ':>9}"]
+        for step in self.steps:
+            rows = step['rows_out'] if step['rows_out'] is not None else step['rows_in']
+            rate = step['rows_per_second']
+            lines.append(
+                f"{step['kind'] + ':' + step['name']:24} {step['wall_seconds']:9.3f} "
+                f"{step['cpu_seconds']:9.3f} {rows if rows is not None else '-':>10} "
+                f"{f'{rate:,.0f}' if rate else '-':>12} "
+                f"{step['peak_rss_bytes'] / 1024 / 1024:9.1f}"
+            )
+        return "\n".join(lines)
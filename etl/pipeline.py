@@ -0,0 +1,237 @@
+"""
+Граф этапов ETL с мемоизацией результатов на диске.
+
+Каждый этап объявляет входы (имена других этапов) и параметры. Ключ
+этапа — хеш имени, параметров, хеша кода и ключей входов, поэтому
+изменение параметра или кода этапа инвалидирует только его и этапы ниже
+по графу. Результаты кешируемых этапов хранятся в data/cache/stages.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import pickle
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from etl.checkpoint import atomic_path
+from etl.metrics import MetricsRecorder
+
+DEFAULT_CACHE_DIR = 'data/cache/stages'
+
+
+def code_hash(*objects: Union[Callable, ModuleType, str]) -> str:
+    """
+    Хеш исходного кода функций/модулей, от которых зависит этап.
+
+    Модуль можно передать именем ('etl.load'): тогда хешируется его файл
+    без импорта, и тяжелые зависимости модуля не загружаются, пока этап
+    не выполняется.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        if isinstance(obj, functools.partial):
+            obj = obj.func
+        if isinstance(obj, str):
+            spec = find_spec(obj)
+            digest.update(Path(spec.origin).read_bytes() if spec and spec.origin else obj.encode('utf-8'))
+            continue
+        try:
+            digest.update(inspect.getsource(obj).encode('utf-8'))
+        except (OSError, TypeError):
+            digest.update(repr(obj).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class Stage:
+    """
+    Этап графа.
+
+    func вызывается как func(*значения_входов, **params); если
+    with_key=True, дополнительно передается stage_key=<ключ этапа>.
+    key_params участвуют в ключе, но не передаются в func (например,
+    отпечаток исходного файла).
+    Некешируемые этапы (с побочными эффектами, например LOAD)
+    выполняются при каждом запуске.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+    key_params: Dict[str, Any] = field(default_factory=dict)
+    code: Tuple[Union[Callable, ModuleType, str], ...] = ()
+    cacheable: bool = True
+    with_key: bool = False
+
+
+def _rows(value: Any) -> Optional[int]:
+    """Количество строк для DataFrame-подобных значений."""
+    return len(value) if hasattr(value, 'shape') else None
+
+
+class StageCache:
+    """Хранилище результатов этапов: <cache_dir>/<этап>/<ключ>.pkl."""
+
+    def __init__(self, cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR, keep: int = 3):
+        self.cache_dir = Path(cache_dir)
+        self.keep = keep
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / stage / f"{key}.pkl"
+
+    def has(self, stage: str, key: str) -> bool:
+        return self._path(stage, key).exists()
+
+    def get(self, stage: str, key: str) -> Any:
+        with open(self._path(stage, key), 'rb') as f:
+            return pickle.load(f)
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        path = self._path(stage, key)
+        with atomic_path(path) as tmp_path:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._prune(stage, keep_path=path)
+
+    def _prune(self, stage: str, keep_path: Path) -> None:
+        """Оставляет keep последних результатов этапа."""
+        entries = sorted(
+            (self.cache_dir / stage).glob('*.pkl'),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        for stale in entries[self.keep:]:
+            if stale != keep_path:
+                stale.unlink()
+
+
+class Pipeline:
+    """
+    Исполнитель графа этапов.
+
+    Значения вычисляются лениво от целевых этапов: если результат
+    transform есть в кеше, extract не выполняется и не читается с диска.
+    """
+
+    def __init__(self, stages: Sequence[Stage], cache: Optional[StageCache] = None,
+                 metrics: Optional[MetricsRecorder] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache = cache or StageCache()
+        self.metrics = metrics or MetricsRecorder()
+        self.order = self._toposort()
+        self.keys = self._compute_keys()
+
+    def _toposort(self) -> List[str]:
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Цикл в графе этапов: {name}")
+            if name not in self.stages:
+                raise ValueError(f"Неизвестный этап: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].inputs:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _compute_keys(self) -> Dict[str, str]:
+        keys = {}
+        for name in self.order:
+            stage = self.stages[name]
+            payload = {
+                'stage': name,
+                'params': stage.params,
+                'key_params': stage.key_params,
+                'code': code_hash(stage.func, *stage.code),
+                'inputs': [keys[dep] for dep in stage.inputs],
+            }
+            raw = json.dumps(payload, sort_keys=True, default=str)
+            keys[name] = hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+        return keys
+
+    def downstream(self, names: Iterable[str]) -> Set[str]:
+        """Этапы names и все этапы, зависящие от них."""
+        result = set(names)
+        for name in self.order:
+            if any(dep in result for dep in self.stages[name].inputs):
+                result.add(name)
+        return result
+
+    def run(self, from_stage: Optional[str] = None,
+            only: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Выполняет граф.
+
+        Args:
+            from_stage: принудительно пересчитать этот этап и все ниже него
+            only: выполнить только эти этапы, входы берутся из кеша
+
+        Returns:
+            Значения вычисленных (или прочитанных из кеша) этапов
+        """
+        for name in [from_stage, *(only or [])]:
+            if name and name not in self.stages:
+                raise ValueError(f"Неизвестный этап: {name}. Доступны: {', '.join(self.order)}")
+
+        forced = self.downstream([from_stage]) if from_stage else set()
+        forced |= set(only or [])
+
+        if only:
+            targets = list(only)
+        else:
+            consumed = {dep for stage in self.stages.values() for dep in stage.inputs}
+            targets = [name for name in self.order if name not in consumed]
+
+        values: Dict[str, Any] = {}
+
+        def resolve(name: str) -> Any:
+            if name in values:
+                return values[name]
+
+            stage, key = self.stages[name], self.keys[name]
+            if name not in forced and stage.cacheable and self.cache.has(name, key):
+                print(f"ЭТАП {name.upper()}: результат из кеша ({key})\n")
+                with self.metrics.measure(name) as step:
+                    values[name] = self.cache.get(name, key)
+                    step['rows_out'] = _rows(values[name])
+                    step['cached'] = True
+                return values[name]
+
+            if only and name not in only:
+                raise RuntimeError(
+                    f"Нет закешированного результата этапа {name} ({key}); "
+                    f"запустите без --only"
+                )
+
+            args = [resolve(dep) for dep in stage.inputs]
+            kwargs = dict(stage.params)
+            if stage.with_key:
+                kwargs['stage_key'] = key
+
+            rows_in = [_rows(arg) for arg in args if _rows(arg) is not None]
+            with self.metrics.measure(name, rows_in=sum(rows_in) if rows_in else None) as step:
+                values[name] = stage.func(*args, **kwargs)
+                step['rows_out'] = _rows(values[name])
+                step['cached'] = False
+
+            if stage.cacheable:
+                self.cache.put(name, key, values[name])
+            return values[name]
+
+        for name in sorted(targets, key=self.order.index):
+            resolve(name)
+
+        return values
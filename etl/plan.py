@@ -0,0 +1,400 @@
+"""
+Оценка запуска без записи результатов (python -m etl.main --plan).
+
+Первые PLAN_SAMPLE_ROWS строк источника проходят этапы графа
+(etl.main.build_pipeline) с теми же параметрами, что и при запуске:
+сначала половина выборки, затем вся. По двум измерениям для каждого
+этапа и синка подбирается зависимость «постоянная часть + затраты на
+строку» для времени, памяти и размера результата. Затем она продлевается
+до числа строк всего источника (для CSV — по размеру файла); в SQLite и
+PostgreSQL пишется не больше max_rows строк.
+
+Память этапа — пик tracemalloc (pandas/numpy) плюс пик пула pyarrow.
+Результаты этапов живут до конца запуска, поэтому пик запуска — это
+память интерпретатора плюс результаты предыдущих этапов плюс пик
+текущего. Синки пишут выборку во временную папку, которая затем
+удаляется. PostgreSQL не измеряется. data/, кеш этапов и чекпоинт
+не изменяются.
+"""
+
+import contextlib
+import io
+import logging
+import pickle
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from etl.memory import current_rss, format_bytes
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from etl.pipeline import Pipeline
+
+PLAN_SAMPLE_ROWS = 20_000
+
+# Синк load → параметр с путем результата
+SINK_PATHS = {
+    'SQLite': 'sqlite_db_path',
+    'Parquet': 'parquet_path',
+    'CSV': 'csv_path',
+    'Feather': 'feather_path',
+    'Snapshot': 'snapshot_dir',
+    'Cubes': 'cubes_dir',
+}
+# Синки, в которые пишется не больше max_rows строк
+LIMITED_SINKS = ('SQLite', 'PostgreSQL')
+# Параметры этапов, отключаемые на выборке: она меньше чанка и шарда
+SAMPLE_OVERRIDES = {'memory_limit': None, 'workers': None}
+# Этапы, результат которых сохраняется в кеш (см. etl.pipeline.StageCache)
+CACHED_STAGES = ('extract', 'transform', 'validate')
+
+# Буфер Arrow освобождается через пул, из которого выделен: пулы
+# измерений живут до конца процесса, иначе освобождение упадет
+_ARROW_POOLS: list = []
+
+
+@dataclass
+class Cost:
+    """Затраты шага на выборке."""
+    rows: int
+    seconds: float = 0.0
+    peak_bytes: int = 0
+    # Память результата этапа или размер файлов синка
+    output_bytes: int = 0
+    cache_bytes: int = 0
+    cache_seconds: float = 0.0
+
+
+def project(small: float, large: float, rows_small: int, rows_large: int, rows: float) -> float:
+    """
+    Продлевает зависимость «постоянная часть + затраты на строку» по
+    двум измерениям до rows строк. Если шум измерений дал отрицательный
+    наклон, затраты считаются пропорциональными строкам (оценка сверху).
+    """
+    if rows_large == rows_small:
+        return large
+    slope = (large - small) / (rows_large - rows_small)
+    if slope <= 0:
+        return large * rows / rows_large
+    intercept = min(max(large - slope * rows_large, 0.0), large)
+    return intercept + slope * rows
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Скрывает вывод этапов и логи синков на время измерения."""
+    previous = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(previous)
+
+
+@contextlib.contextmanager
+def _measure(cost: Cost, trace_memory: bool):
+    """
+    Время шага или, при trace_memory, его пик памяти и память, которая
+    остается занятой результатом (трассировка замедляет шаг, поэтому
+    время и память измеряются в разных проходах).
+    """
+    if not trace_memory:
+        start = time.perf_counter()
+        yield
+        cost.seconds = time.perf_counter() - start
+        return
+
+    import pyarrow as pa
+
+    previous_pool = pa.default_memory_pool()
+    pool = pa.proxy_memory_pool(previous_pool)
+    _ARROW_POOLS.append(pool)
+    pa.set_memory_pool(pool)
+    tracemalloc.start()
+    try:
+        yield
+        current, peak = tracemalloc.get_traced_memory()
+        cost.peak_bytes = peak + pool.max_memory()
+        cost.output_bytes = current + pool.bytes_allocated()
+    finally:
+        tracemalloc.stop()
+        pa.set_memory_pool(previous_pool)
+
+
+def _cache_cost(cost: Cost, value: Any) -> None:
+    """Размер и время записи результата этапа в кеш (pickle)."""
+    start = time.perf_counter()
+    cost.cache_bytes = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    cost.cache_seconds = time.perf_counter() - start
+
+
+def _tree_size(path: Path, pattern: str = '*') -> int:
+    return sum(f.stat().st_size for f in path.rglob(pattern) if f.is_file())
+
+
+def read_sample(input_file: Optional[str], google_drive_id: Optional[str],
+                sample_rows: int) -> dict:
+    """
+    Выборка источника и оценка числа его строк.
+
+    CSV читается с начала, число строк оценивается по размеру файла и
+    среднему размеру строки выборки. Excel, JSON и Google Drive не
+    читаются частично: источник загружается целиком (время чтения и
+    число строк точные).
+    """
+    import pandas as pd
+    from etl.extract import read_source, validate_source
+
+    if input_file and Path(input_file).suffix == '.csv':
+        path = Path(input_file)
+        if not path.exists():
+            raise FileNotFoundError(f"Файл не найден: {path}")
+        sample = pd.read_csv(path, nrows=sample_rows)
+        validate_source(sample)
+        with open(path, 'rb') as f:
+            header = len(f.readline())
+            sample_bytes = sum(len(line) for _, line in zip(range(len(sample)), f))
+            whole = not f.read(1)
+        file_bytes = path.stat().st_size
+        rows = len(sample) if whole else round((file_bytes - header) / (sample_bytes / len(sample)))
+        return {'source': str(path), 'kind': 'CSV', 'source_bytes': file_bytes,
+                'frame': sample, 'rows': rows, 'rows_exact': whole, 'read_seconds': None}
+
+    start = time.perf_counter()
+    with _quiet():
+        df = read_source(input_file, google_drive_id)
+    read_seconds = time.perf_counter() - start
+    validate_source(df)
+    source = input_file or f"Google Drive {google_drive_id}"
+    kind = Path(input_file).suffix.lstrip('.').upper() if input_file else 'CSV'
+    return {'source': source, 'kind': kind,
+            'source_bytes': Path(input_file).stat().st_size if input_file else None,
+            'frame': df.head(sample_rows).copy(), 'rows': len(df), 'rows_exact': True,
+            'read_seconds': read_seconds}
+
+
+def measure_sample(raw: 'pd.DataFrame', source: dict, pipeline: 'Pipeline',
+                   trace_memory: bool) -> Dict[str, Cost]:
+    """
+    Прогоняет выборку raw через этапы pipeline: затраты этапов по именам
+    и синков по именам из etl.load.load (без PostgreSQL).
+    """
+    import pandas as pd
+    from etl.load import load
+    from etl.metrics import MetricsRecorder
+
+    costs = {'extract': Cost(rows=len(raw))}
+    with _measure(costs['extract'], trace_memory):
+        if source['kind'] == 'CSV' and source['read_seconds'] is None:
+            values = {'extract': pd.read_csv(source['source'], nrows=len(raw))}
+        else:
+            values = {'extract': raw.copy()}
+        values['extract'].to_csv(io.StringIO(), index=False)
+
+    for name in pipeline.order:
+        stage = pipeline.stages[name]
+        if name in ('extract', 'load'):
+            continue
+        args = [values[dep] for dep in stage.inputs]
+        params = {key: SAMPLE_OVERRIDES.get(key, value) for key, value in stage.params.items()}
+        costs[name] = Cost(rows=len(args[0]) if args else 0)
+        with _quiet(), _measure(costs[name], trace_memory):
+            values[name] = stage.func(*args, **params)
+
+    if not trace_memory:
+        for name in CACHED_STAGES:
+            _cache_cost(costs[name], values[name])
+
+    df = values['transform']
+    params = {key: value for key, value in pipeline.stages['load'].params.items()
+              if key not in ('source', 'memory_limit', 'postgresql_table')}
+    costs['load'] = Cost(rows=len(df))
+    recorder = MetricsRecorder()
+    with tempfile.TemporaryDirectory(prefix='etl-plan-') as tmp_dir:
+        for sink, key in SINK_PATHS.items():
+            if params.get(key):
+                params[key] = str(Path(tmp_dir) / sink.lower() / Path(params[key]).name)
+        with _quiet(), _measure(costs['load'], trace_memory):
+            load(df, verbose=False, metrics=recorder, cubes=values.get('aggregate'),
+                 catalog={'column_stats': values.get('validate'), 'source_fingerprint': None},
+                 **params)
+
+        for step in recorder.steps:
+            cost = Cost(rows=len(df), seconds=step['wall_seconds'])
+            path = Path(tmp_dir) / step['name'].lower()
+            if step['name'] == 'KeyIndex':
+                cost.output_bytes = _tree_size(Path(tmp_dir), '*.idx.npy')
+            elif path.exists():
+                cost.output_bytes = _tree_size(path) - _tree_size(path, '*.idx.npy')
+            costs[f"sink:{step['name']}"] = cost
+    return costs
+
+
+def estimate_run(input_file: str = None, google_drive_id: str = None,
+                 sample_rows: int = PLAN_SAMPLE_ROWS, **pipeline_options) -> dict:
+    """
+    План запуска: оценки числа строк, времени, пиковой памяти этапов и
+    размера результатов синков для всего источника. pipeline_options —
+    аргументы build_pipeline (как у run_etl).
+    """
+    import pandas  # noqa: F401 — память библиотек входит в базовую
+    import pyarrow  # noqa: F401
+    from etl.load import load  # noqa: F401
+    from etl.main import build_pipeline
+    from etl.shards import shard_count
+
+    baseline = current_rss()
+    source = read_sample(input_file, google_drive_id, sample_rows)
+    sample = source['frame']
+    pipeline = build_pipeline(input_file=input_file, google_drive_id=google_drive_id,
+                              **pipeline_options)
+
+    halves = [sample.head(max(len(sample) // 2, 1)), sample]
+    timed = [measure_sample(part, source, pipeline, trace_memory=False) for part in halves]
+    traced = [measure_sample(part, source, pipeline, trace_memory=True) for part in halves]
+
+    small, large = timed
+    clean_ratio = large['validate'].rows / max(large['transform'].rows, 1)
+    rows = source['rows']
+    clean_rows = round(rows * clean_ratio)
+    max_rows = pipeline.stages['load'].params.get('max_rows')
+    workers = pipeline_options.get('workers') or 1
+
+    def stage_rows(name: str, total: float) -> float:
+        if name.startswith('sink:') and name[5:] in LIMITED_SINKS and max_rows is not None:
+            return min(total, max_rows)
+        return total
+
+    def estimate(name: str, field: str, costs: List[Dict[str, Cost]]) -> float:
+        total = rows if name in ('extract', 'transform') else clean_rows
+        first, second = costs[0][name], costs[1][name]
+        return project(getattr(first, field), getattr(second, field),
+                       stage_rows(name, first.rows), stage_rows(name, second.rows),
+                       stage_rows(name, total))
+
+    stages, retained = [], 0.0
+    for name in pipeline.order:
+        seconds = estimate(name, 'seconds', timed)
+        if name == 'extract' and source['read_seconds'] is not None:
+            seconds += source['read_seconds']
+        shards = shard_count(rows, workers) if name in ('transform', 'validate') else 1
+        peak = baseline + retained + estimate(name, 'peak_bytes', traced)
+        stages.append({
+            'name': name,
+            'rows': rows if name in ('extract', 'transform') else clean_rows,
+            'seconds': seconds / shards,
+            'cache_seconds': estimate(name, 'cache_seconds', timed) if name in CACHED_STAGES else 0.0,
+            'peak_bytes': peak,
+            'shards': shards,
+        })
+        retained += estimate(name, 'output_bytes', traced)
+
+    load_params = pipeline.stages['load'].params
+    sinks = []
+    for name in large:
+        if not name.startswith('sink:'):
+            continue
+        sink = name[5:]
+        sinks.append({
+            'name': sink,
+            'rows': None if sink == 'Cubes' else stage_rows(name, clean_rows),
+            'seconds': estimate(name, 'seconds', timed),
+            'bytes': estimate(name, 'output_bytes', timed),
+            'path': load_params.get(SINK_PATHS.get(sink, ''), '') or '',
+        })
+    if load_params.get('postgresql_table'):
+        sinks.append({'name': 'PostgreSQL', 'rows': min(clean_rows, max_rows) if max_rows else clean_rows,
+                      'seconds': None, 'bytes': None,
+                      'path': f"public.{load_params['postgresql_table']}"})
+    # Время LOAD — сумма синков, чтобы таблицы плана сходились
+    next(stage for stage in stages if stage['name'] == 'load')['seconds'] = sum(
+        sink['seconds'] for sink in sinks if sink['seconds'] is not None)
+    sinks.append({
+        'name': 'Кеш этапов',
+        'rows': None,
+        'seconds': sum(stage['cache_seconds'] for stage in stages),
+        'bytes': sum(estimate(name, 'cache_bytes', timed) for name in CACHED_STAGES),
+        'path': str(pipeline.cache.cache_dir),
+    })
+
+    return {
+        'source': source['source'],
+        'kind': source['kind'],
+        'source_bytes': source['source_bytes'],
+        'rows': rows,
+        'rows_exact': source['rows_exact'],
+        'clean_rows': clean_rows,
+        'sample_rows': len(sample),
+        'max_rows': max_rows,
+        'workers': workers,
+        'memory_limit': pipeline_options.get('memory_limit'),
+        'baseline_bytes': baseline,
+        'stages': stages,
+        'sinks': sinks,
+        'seconds': sum(stage['seconds'] + stage['cache_seconds'] for stage in stages),
+        'peak_bytes': max(stage['peak_bytes'] for stage in stages),
+    }
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '—'
+    if seconds < 60:
+        return f"{seconds:.1f} с"
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes // 60} ч {minutes % 60} мин" if minutes >= 60 else f"{minutes} мин {seconds} с"
+
+
+def _format_rows(rows: Optional[float]) -> str:
+    return '—' if rows is None else f"{round(rows):,}"
+
+
+def format_plan(plan: dict) -> str:
+    """Текст плана для вывода в консоль."""
+    size = f", {format_bytes(plan['source_bytes'])}" if plan['source_bytes'] else ''
+    rows = f"{plan['rows']:,}" if plan['rows_exact'] else f"~{plan['rows']:,} (оценка по размеру файла)"
+    lines = [
+        "ПЛАН ЗАПУСКА (результаты не записываются)",
+        "-" * 70,
+        f"Источник: {plan['source']} ({plan['kind']}{size})",
+        f"Строк: {rows}, выборка {plan['sample_rows']:,}",
+        f"После очистки: ~{plan['clean_rows']:,}",
+        "",
+        f"{'Этап':<12}{'Строк':>14}{'Время':>14}{'Пик памяти':>14}",
+    ]
+    for stage in plan['stages']:
+        shards = f"  ({stage['shards']} шардов)" if stage['shards'] > 1 else ''
+        lines.append(f"{stage['name']:<12}{_format_rows(stage['rows']):>14}"
+                     f"{_format_seconds(stage['seconds']):>14}"
+                     f"{format_bytes(stage['peak_bytes']):>14}{shards}")
+
+    lines += ["", f"{'Синк':<12}{'Строк':>14}{'Время':>14}{'Размер':>14}  Путь"]
+    for sink in plan['sinks']:
+        size = '—' if sink['bytes'] is None else format_bytes(sink['bytes'])
+        lines.append(f"{sink['name']:<12}{_format_rows(sink['rows']):>14}"
+                     f"{_format_seconds(sink['seconds']):>14}{size:>14}  {sink['path']}")
+
+    lines += [
+        "",
+        f"Итого: время ~{_format_seconds(plan['seconds'])}, пиковая память ~"
+        f"{format_bytes(plan['peak_bytes'])} (интерпретатор и библиотеки "
+        f"{format_bytes(plan['baseline_bytes'])})",
+    ]
+    lines.append("Оценка полного пересчета: этапы из кеша при запуске будут пропущены")
+    if plan['max_rows'] is not None:
+        lines.append(f"В SQLite и PostgreSQL пишется не больше {plan['max_rows']:,} строк (--max-rows)")
+    if any(sink['name'] == 'PostgreSQL' for sink in plan['sinks']):
+        lines.append("PostgreSQL не измеряется: план не пишет в БД")
+    if plan['workers'] > 1:
+        lines.append(f"--workers {plan['workers']}: время TRANSFORM и VALIDATE поделено на число "
+                     f"шардов, без учета запуска процессов и передачи данных")
+    if plan['memory_limit']:
+        verdict = 'укладывается в' if plan['peak_bytes'] <= plan['memory_limit'] else 'превышает'
+        lines.append(f"--memory-limit {format_bytes(plan['memory_limit'])}: оценка без чанков "
+                     f"{verdict} бюджет, с лимитом обработка идет чанками")
+    return "\n".join(lines)
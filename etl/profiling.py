@@ -0,0 +1,186 @@
+"""
+Профилирование этапов и синков ETL (--profile cpu|memory|both).
+
+Каждый шаг профилируется отдельно:
+  * cpu — cProfile (файл .pstats для snakeviz/pstats) и сэмплер стеков
+    (файл .collapsed в формате folded stacks для flamegraph.pl/speedscope);
+  * memory — tracemalloc: пик памяти шага и топ мест аллокаций
+    (файл .memory.txt и снимок .tracemalloc).
+Вложенные шаги (синки внутри LOAD) профилируются своими профайлерами,
+профайлер внешнего шага на это время приостанавливается.
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Union
+
+from etl.defaults import PROFILE_MODES
+
+
+class StackSampler:
+    """Периодически снимает стек потока и считает одинаковые стеки."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._running = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self._running.is_set():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._running.set()
+        self._thread.start()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path: Path) -> None:
+        """Формат 'frame1;frame2;frame3 count' — вход flamegraph.pl и speedscope."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class StageProfiler:
+    """
+    Профайлер шагов запуска.
+
+    Args:
+        mode: 'cpu', 'memory' или 'both'
+        out_dir: папка для .pstats/.collapsed/.memory.txt файлов
+        top_n: сколько горячих мест печатать для каждого шага
+    """
+
+    def __init__(self, mode: str, out_dir: Union[str, Path], top_n: int = 15):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+        self.cpu = mode in ('cpu', 'both')
+        self.memory = mode in ('memory', 'both')
+        self.out_dir = Path(out_dir)
+        self.top_n = top_n
+        self._stack: List[dict] = []
+
+    @contextmanager
+    def profile(self, name: str):
+        """Профилирует шаг name и печатает его горячие места."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        parent = self._stack[-1] if self._stack else None
+        if parent:
+            self._pause(parent)
+
+        state = {'name': name}
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            tracemalloc.reset_peak()
+            state['snapshot'] = tracemalloc.take_snapshot()
+        if self.cpu:
+            state['sampler'] = StackSampler(threading.get_ident())
+            state['sampler'].start()
+            state['profiler'] = cProfile.Profile()
+            state['profiler'].enable()
+
+        self._stack.append(state)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            if self.cpu:
+                state['profiler'].disable()
+                state['sampler'].stop()
+            self._report(state)
+            if parent:
+                self._resume(parent)
+            elif self.memory:
+                tracemalloc.stop()
+
+    def _pause(self, state: dict) -> None:
+        if self.cpu:
+            state['profiler'].disable()
+            state['sampler'].pause()
+        if self.memory:
+            state['peak'] = max(state.get('peak', 0), tracemalloc.get_traced_memory()[1])
+
+    def _resume(self, state: dict) -> None:
+        if self.memory:
+            tracemalloc.reset_peak()
+        if self.cpu:
+            state['sampler'].resume()
+            state['profiler'].enable()
+
+    def _report(self, state: dict) -> None:
+        name = state['name']
+        base = self.out_dir / name.replace('/', '_').replace(':', '-')
+        print(f"\n--- ПРОФИЛЬ: {name} ---")
+
+        if self.cpu:
+            stats = pstats.Stats(state['profiler'])
+            stats.dump_stats(f"{base}.pstats")
+            state['sampler'].write_collapsed(Path(f"{base}.collapsed"))
+
+            print(f"CPU, топ-{self.top_n} по собственному времени:")
+            print(f"  {'tottime':>9} {'cumtime':>9} {'вызовов':>9}  функция")
+            entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+            for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in entries[:self.top_n]:
+                location = f"{os.path.basename(filename)}:{lineno}" if lineno else filename
+                print(f"  {tottime:9.4f} {cumtime:9.4f} {ncalls:9d}  {func} ({location})")
+            print(f"  Файлы: {base}.pstats, {base}.collapsed")
+
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, cProfile.__file__),
+            ])
+            peak = max(state.get('peak', 0), tracemalloc.get_traced_memory()[1])
+            diff = snapshot.compare_to(state['snapshot'], 'lineno')
+            top = sorted(diff, key=lambda d: d.size_diff, reverse=True)[:self.top_n]
+
+            lines = [f"Пик памяти Python: {peak / 1024 / 1024:.2f} МБ",
+                     f"Топ-{self.top_n} мест по приросту памяти:"]
+            for item in top:
+                frame = item.traceback[0]
+                lines.append(
+                    f"  {item.size_diff / 1024 / 1024:+9.2f} МБ {item.count_diff:+9d} блоков  "
+                    f"{os.path.basename(frame.filename)}:{frame.lineno}"
+                )
+            report = "\n".join(lines)
+            Path(f"{base}.memory.txt").write_text(report + "\n", encoding='utf-8')
+            snapshot.dump(f"{base}.tracemalloc")
+
+            print(report)
+            print(f"  Файлы: {base}.memory.txt, {base}.tracemalloc")
+
+
+def default_profile_dir() -> Path:
+    """data/profiles/<время запуска>."""
+    return Path('data/profiles') / datetime.now().strftime('%Y%m%d_%H%M%S')
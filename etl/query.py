@@ -0,0 +1,531 @@
+"""
+Запросы к обработанным данным (SQLite и Parquet) с кешированием результатов.
+
+Поддерживает фильтры, группировку с агрегатами, сортировку и постраничный
+вывод. Строки читаются потоково (курсор SQLite / батчи сканера Arrow),
+готовые страницы кешируются в LRU кеше, который сбрасывается, когда
+у источника меняется отпечаток загрузки.
+
+Примеры:
+  python -m etl.query --where "Churn = Yes" --group-by Contract --agg count --agg avg:MonthlyCharges --order-by=-count
+  python -m etl.query --source parquet --where "tenure >= 60" --columns customerID,tenure --page 2
+  python -m etl.query --source snapshot --version 20261019 --group-by Contract --agg count
+  python -m etl.query --serve --port 8765
+  curl "http://127.0.0.1:8765/query?where=Churn%20%3D%20Yes&group_by=Contract&agg=count"
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from importlib.util import find_spec
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from etl.catalog import read_catalog
+from etl.sqlite_compact import DecodedColumns, read_layout
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# pyarrow импортируется только при запросе к Parquet
+PYARROW_AVAILABLE = find_spec('pyarrow') is not None
+
+DEFAULT_SQLITE_PATH = 'data/processed/data.db'
+DEFAULT_PARQUET_PATH = 'data/processed/data.parquet'
+DEFAULT_TABLE = 'processed_data'
+MAX_PAGE_SIZE = 10_000
+
+FILTER_RE = re.compile(r'^\s*(\w+)\s*(!=|>=|<=|=|>|<|\s+in\s+)\s*(.+?)\s*$', re.IGNORECASE)
+AGGREGATES = {'count', 'sum', 'avg', 'min', 'max'}
+ARROW_AGGREGATES = {'sum': 'sum', 'avg': 'mean', 'min': 'min', 'max': 'max'}
+SQL_OPERATORS = {'=': '=', '!=': '!=', '>': '>', '>=': '>=', '<': '<', '<=': '<='}
+
+
+def _parse_value(raw: str):
+    """'42' → 42, '1.5' → 1.5, остальное — строка."""
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """
+    Описание запроса.
+
+    filters: ('tenure', '>=', 60) или ('Contract', 'in', ('One year', 'Two year'))
+    aggregates: ('count', None), ('avg', 'MonthlyCharges'), ...
+    order_by: имя столбца или алиаса агрегата, '-' в начале — по убыванию
+    """
+    filters: Tuple[tuple, ...] = ()
+    columns: Tuple[str, ...] = ()
+    group_by: Tuple[str, ...] = ()
+    aggregates: Tuple[Tuple[str, Optional[str]], ...] = ()
+    order_by: Optional[str] = None
+    page: int = 1
+    page_size: int = 100
+
+    @classmethod
+    def parse(cls, where: List[str] = (), columns: str = '', group_by: str = '',
+              aggregates: List[str] = (), order_by: Optional[str] = None,
+              page: int = 1, page_size: int = 100) -> 'QuerySpec':
+        """Разбор текстовых параметров CLI/HTTP."""
+        filters = []
+        for expr in where or ():
+            match = FILTER_RE.match(expr)
+            if not match:
+                raise ValueError(f"Не удалось разобрать фильтр: {expr!r}")
+            column, op, raw = match.group(1), match.group(2).strip().lower(), match.group(3)
+            if op == 'in':
+                filters.append((column, 'in', tuple(_parse_value(v.strip()) for v in raw.split('|'))))
+            else:
+                filters.append((column, op, _parse_value(raw)))
+
+        parsed_aggregates = []
+        for agg in aggregates or ():
+            func, _, column = agg.partition(':')
+            func = func.strip().lower()
+            if func not in AGGREGATES or (func != 'count' and not column):
+                raise ValueError(f"Неподдерживаемый агрегат: {agg!r}")
+            parsed_aggregates.append((func, column.strip() or None))
+
+        if group_by and not parsed_aggregates:
+            parsed_aggregates.append(('count', None))
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size должен быть от 1 до {MAX_PAGE_SIZE}")
+        if page < 1:
+            raise ValueError("page должен быть >= 1")
+
+        split = lambda text: tuple(c.strip() for c in (text or '').split(',') if c.strip())
+        return cls(
+            filters=tuple(filters),
+            columns=split(columns),
+            group_by=split(group_by),
+            aggregates=tuple(parsed_aggregates),
+            order_by=order_by or None,
+            page=page,
+            page_size=page_size,
+        )
+
+    @property
+    def offset(self) -> int:
+        return (self.page - 1) * self.page_size
+
+    def referenced_columns(self) -> List[str]:
+        names = [f[0] for f in self.filters] + list(self.columns) + list(self.group_by)
+        names += [column for _, column in self.aggregates if column]
+        return list(dict.fromkeys(names))
+
+
+def aggregate_alias(func: str, column: Optional[str]) -> str:
+    return func if column is None else f"{func}_{column}"
+
+
+def _check_columns(spec: QuerySpec, available: List[str]) -> None:
+    """Имена столбцов подставляются в SQL, поэтому разрешены только существующие."""
+    unknown = [col for col in spec.referenced_columns() if col not in available]
+    if unknown:
+        raise ValueError(f"Неизвестные столбцы: {unknown}")
+
+    if spec.order_by:
+        allowed = set(available) | {aggregate_alias(f, c) for f, c in spec.aggregates}
+        if spec.order_by.lstrip('-') not in allowed:
+            raise ValueError(f"Нельзя сортировать по {spec.order_by!r}")
+
+
+class SQLiteSource:
+    """Источник: таблица SQLite выгрузки."""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path: str = DEFAULT_SQLITE_PATH, table_name: str = DEFAULT_TABLE):
+        self.db_path = db_path
+        self.table_name = table_name
+
+    def fingerprint(self) -> str:
+        """Отпечаток загрузки из каталога, иначе размер/mtime файлов БД."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            entry = read_catalog(conn, self.table_name)
+        finally:
+            conn.close()
+        if entry:
+            return f"{entry['data_fingerprint']}@{entry['loaded_at']}"
+
+        stats = [Path(p).stat() for p in (self.db_path, self.db_path + '-wal') if Path(p).exists()]
+        return ';'.join(f"{s.st_size}:{s.st_mtime_ns}" for s in stats)
+
+    def stream(self, spec: QuerySpec, batch_size: int = 1000) -> Tuple[List[str], Iterator[tuple]]:
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        cursor = conn.cursor()
+        cursor.execute(f'PRAGMA table_info("{self.table_name}")')
+        available = [col[1] for col in cursor.fetchall()]
+        if not available:
+            conn.close()
+            raise ValueError(f"Таблица не найдена: {self.table_name}")
+        try:
+            _check_columns(spec, available)
+        except ValueError:
+            conn.close()
+            raise
+
+        quote = lambda name: f'"{name}"'
+        value = key = quote
+        condition = lambda column, predicate, params: (f'{quote(column)} {predicate}', list(params))
+        layout = read_layout(conn, self.table_name)
+        if layout:
+            # Компактная выгрузка: запрос идет к кодам в обход представления
+            decoded = DecodedColumns(self.table_name, layout, conn)
+            value, key, condition = decoded.value, decoded.key, decoded.condition
+        output = lambda column: quote(column) if value is quote else f'{value(column)} AS {quote(column)}'
+
+        if spec.group_by or spec.aggregates:
+            select = [output(col) for col in spec.group_by]
+            for func, column in spec.aggregates:
+                expr = 'COUNT(*)' if column is None else f'{func.upper()}({value(column)})'
+                select.append(f'{expr} AS {quote(aggregate_alias(func, column))}')
+        else:
+            select = [output(col) for col in spec.columns or layout or available]
+
+        params = []
+        conditions = []
+        for column, op, operand in spec.filters:
+            if op == 'in':
+                sql, sql_params = condition(column, f'IN ({", ".join("?" * len(operand))})', operand)
+            else:
+                sql, sql_params = condition(column, f'{SQL_OPERATORS[op]} ?', [operand])
+            conditions.append(sql)
+            params.extend(sql_params)
+
+        order = None
+        if spec.order_by:
+            order_column = spec.order_by.lstrip('-')
+            order = key(order_column) if order_column in available else quote(order_column)
+
+        sql = f'SELECT {", ".join(select)} FROM {decoded.source() if layout else quote(self.table_name)}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if spec.group_by:
+            sql += ' GROUP BY ' + ', '.join(key(col) for col in spec.group_by)
+        if order:
+            direction = 'DESC' if spec.order_by.startswith('-') else 'ASC'
+            sql += f' ORDER BY {order} {direction}'
+        sql += ' LIMIT ? OFFSET ?'
+        params += [spec.page_size, spec.offset]
+
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+
+        def rows() -> Iterator[tuple]:
+            try:
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    yield from batch
+            finally:
+                conn.close()
+
+        return columns, rows()
+
+
+class ParquetSource:
+    """Источник: Parquet выгрузка, читается сканером pyarrow.dataset."""
+
+    name = 'parquet'
+
+    def __init__(self, path: str = DEFAULT_PARQUET_PATH):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow не установлен. Установите: pip install pyarrow")
+        self.path = path
+
+    def fingerprint(self) -> str:
+        stat = Path(self.path).stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _filter_expression(self, spec: QuerySpec, schema: 'pa.Schema'):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        expression = None
+        for column, op, value in spec.filters:
+            field_type = schema.field(column).type
+            if pa.types.is_dictionary(field_type):
+                field_type = field_type.value_type
+            cast = lambda v: pa.scalar(v).cast(field_type)
+            ref = pc.field(column)
+            if op == 'in':
+                condition = ref.isin(pa.array([cast(v).as_py() for v in value], type=field_type))
+            else:
+                value = cast(value)
+                condition = {
+                    '=': ref == value, '!=': ref != value,
+                    '>': ref > value, '>=': ref >= value,
+                    '<': ref < value, '<=': ref <= value,
+                }[op]
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def stream(self, spec: QuerySpec, batch_size: int = 64 * 1024) -> Tuple[List[str], Iterator[tuple]]:
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(self.path, format='parquet')
+        _check_columns(spec, dataset.schema.names)
+        expression = self._filter_expression(spec, dataset.schema)
+
+        if spec.group_by or spec.aggregates:
+            needed = spec.referenced_columns()
+            table = dataset.to_table(columns=needed, filter=expression)
+            arrow_aggs = [
+                ([], 'count_all') if column is None else (column, ARROW_AGGREGATES[func])
+                for func, column in spec.aggregates
+            ]
+            result = table.group_by(list(spec.group_by)).aggregate(arrow_aggs)
+            names = list(spec.group_by) + [aggregate_alias(f, c) for f, c in spec.aggregates]
+            arrow_names = [
+                'count_all' if column is None else f"{column}_{ARROW_AGGREGATES[func]}"
+                for func, column in spec.aggregates
+            ]
+            result = result.select(list(spec.group_by) + arrow_names).rename_columns(names)
+            if spec.order_by:
+                order = 'descending' if spec.order_by.startswith('-') else 'ascending'
+                result = result.sort_by([(spec.order_by.lstrip('-'), order)])
+            page = result.slice(spec.offset, spec.page_size)
+            return names, (tuple(row.values()) for row in page.to_pylist())
+
+        columns = list(spec.columns) or dataset.schema.names
+        if spec.order_by:
+            # Сортировка требует всех отфильтрованных строк
+            table = dataset.to_table(columns=columns, filter=expression)
+            order = 'descending' if spec.order_by.startswith('-') else 'ascending'
+            table = table.sort_by([(spec.order_by.lstrip('-'), order)])
+            page = table.slice(spec.offset, spec.page_size)
+            return columns, (tuple(row.values()) for row in page.to_pylist())
+
+        scanner = dataset.scanner(columns=columns, filter=expression, batch_size=batch_size)
+
+        def rows() -> Iterator[tuple]:
+            skip, remaining = spec.offset, spec.page_size
+            for batch in scanner.to_batches():
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                batch = batch.slice(skip, remaining)
+                skip = 0
+                for row in batch.to_pylist():
+                    yield tuple(row.values())
+                remaining -= batch.num_rows
+                if remaining <= 0:
+                    break
+
+        return columns, rows()
+
+
+class SnapshotSource(ParquetSource):
+    """Parquet чанки версии из хранилища снимков (etl.snapshots)."""
+
+    name = 'snapshot'
+
+    def __init__(self, version: str = 'latest', store_dir: str = 'data/snapshots'):
+        from etl.snapshots import SnapshotStore
+
+        store = SnapshotStore(store_dir)
+        self.version = store.resolve(version)
+        super().__init__(store.chunk_paths(self.version))
+
+    def fingerprint(self) -> str:
+        # Версия неизменяема
+        return self.version
+
+
+class QueryService:
+    """
+    Выполнение запросов с LRU кешем страниц результатов.
+
+    Ключ кеша включает отпечаток загрузки источника: после новой
+    загрузки старые записи этого источника удаляются.
+    """
+
+    def __init__(self, sources: dict, cache_size: int = 128):
+        self.sources = sources
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[tuple, Tuple[List[str], List[tuple]]]' = OrderedDict()
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh_fingerprint(self, source_name: str) -> str:
+        fingerprint = self.sources[source_name].fingerprint()
+        with self._lock:
+            if self._fingerprints.get(source_name) != fingerprint:
+                for key in [k for k in self._cache if k[0] == source_name]:
+                    del self._cache[key]
+                self._fingerprints[source_name] = fingerprint
+        return fingerprint
+
+    def stream(self, source_name: str, spec: QuerySpec) -> Tuple[List[str], Iterator[tuple], bool]:
+        """
+        Возвращает (столбцы, итератор строк, попадание в кеш).
+        Страница кладется в кеш, только если итератор прочитан полностью.
+        """
+        if source_name not in self.sources:
+            raise ValueError(f"Неизвестный источник: {source_name}")
+
+        key = (source_name, self._refresh_fingerprint(source_name), spec)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+        if cached is not None:
+            return cached[0], iter(cached[1]), True
+
+        self.misses += 1
+        columns, rows = self.sources[source_name].stream(spec)
+
+        def caching_rows() -> Iterator[tuple]:
+            collected = []
+            for row in rows:
+                collected.append(row)
+                yield row
+            with self._lock:
+                self._cache[key] = (columns, collected)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return columns, caching_rows(), False
+
+
+def make_handler(service: QueryService):
+    """HTTP обработчик: GET /query → NDJSON (первая строка — метаданные)."""
+    from http.server import BaseHTTPRequestHandler
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/health':
+                return self._send_json(200, {
+                    'status': 'ok', 'cache_hits': service.hits, 'cache_misses': service.misses
+                })
+            if url.path != '/query':
+                return self._send_json(404, {'error': 'not found'})
+
+            params = parse_qs(url.query)
+            first = lambda name, default=None: params.get(name, [default])[0]
+            try:
+                spec = QuerySpec.parse(
+                    where=params.get('where', []),
+                    columns=first('columns', ''),
+                    group_by=first('group_by', ''),
+                    aggregates=params.get('agg', []),
+                    order_by=first('order_by'),
+                    page=int(first('page', 1)),
+                    page_size=int(first('page_size', 100)),
+                )
+                columns, rows, cached = service.stream(first('source', 'sqlite'), spec)
+            except (ValueError, KeyError, FileNotFoundError, sqlite3.Error) as e:
+                return self._send_json(400, {'error': str(e)})
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+            self.end_headers()
+            meta = {'columns': columns, 'page': spec.page, 'page_size': spec.page_size, 'cached': cached}
+            self.wfile.write((json.dumps(meta, ensure_ascii=False) + '\n').encode('utf-8'))
+            for row in rows:
+                line = json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str)
+                self.wfile.write((line + '\n').encode('utf-8'))
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return QueryHandler
+
+
+def serve(service: QueryService, host: str = '127.0.0.1', port: int = 8765) -> None:
+    """Запускает локальный HTTP сервер запросов."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Сервер запросов: http://{host}:{port}/query (Ctrl+C для остановки)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    """CLI для запросов к обработанным данным."""
+    parser = argparse.ArgumentParser(
+        description="Запросы к обработанным данным (SQLite/Parquet)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Примеры:')[1]
+    )
+    parser.add_argument('--source', choices=['sqlite', 'parquet', 'snapshot'], default='sqlite')
+    parser.add_argument('--db', default=DEFAULT_SQLITE_PATH, help='Путь к SQLite БД')
+    parser.add_argument('--table', default=DEFAULT_TABLE, help='Таблица SQLite')
+    parser.add_argument('--parquet', default=DEFAULT_PARQUET_PATH, help='Путь к Parquet файлу')
+    parser.add_argument('--version', default='latest',
+                        help='Версия снимка для --source snapshot (ID или его начало)')
+    parser.add_argument('--where', action='append', default=[],
+                        help='Фильтр "столбец оп значение", оп: = != > >= < <= in (a|b)')
+    parser.add_argument('--columns', default='', help='Столбцы через запятую')
+    parser.add_argument('--group-by', default='', help='Столбцы группировки через запятую')
+    parser.add_argument('--agg', action='append', default=[],
+                        help='Агрегат: count, sum:col, avg:col, min:col, max:col')
+    parser.add_argument('--order-by', default=None, help='Столбец или агрегат, "-" — по убыванию (--order-by=-count)')
+    parser.add_argument('--page', type=int, default=1)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--serve', action='store_true', help='Запустить локальный HTTP сервер')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    sources = {'sqlite': SQLiteSource(args.db, args.table)}
+    if PYARROW_AVAILABLE:
+        sources['parquet'] = ParquetSource(args.parquet)
+        if args.source == 'snapshot':
+            try:
+                sources['snapshot'] = SnapshotSource(args.version)
+            except FileNotFoundError as e:
+                parser.exit(1, f"Ошибка запроса: {e}\n")
+    service = QueryService(sources)
+
+    if args.serve:
+        serve(service, args.host, args.port)
+        return
+
+    try:
+        spec = QuerySpec.parse(
+            where=args.where, columns=args.columns, group_by=args.group_by,
+            aggregates=args.agg, order_by=args.order_by,
+            page=args.page, page_size=args.page_size,
+        )
+        columns, rows, _ = service.stream(args.source, spec)
+        rows = list(rows)
+    except (ValueError, FileNotFoundError, sqlite3.Error) as e:
+        parser.exit(1, f"Ошибка запроса: {e}\n")
+
+    import pandas as pd
+    print(pd.DataFrame(rows, columns=columns).to_string(index=False))
+    print(f"\nСтраница {spec.page}, строк: {len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Шардированные TRANSFORM и VALIDATE на нескольких процессах (--workers).
+
+Строки делятся на N непрерывных шардов, каждый шард обрабатывает свой
+процесс. Данные передаются между процессами буферами Arrow IPC
+(send_bytes по pipe, чтение без копирования), а не pickle DataFrame;
+по pickle идут только небольшие сводки.
+
+TRANSFORM выполняется шагами, между которыми родитель объединяет
+результаты шардов, поэтому итог совпадает с etl.transform.transform:
+  1. шард удаляет пустые строки и считает хеши строк, родитель по ним
+     находит дубликаты между шардами (остается первое вхождение);
+  2. шард удаляет дубликаты, обрезает пробелы и строит сводку типов
+     (transform.type_profile), родитель принимает решения по объединенной
+     сводке — одинаковые для всех шардов;
+  3. шард приводит типы и возвращает результат.
+Производные столбцы (etl.derive) вычисляются после склейки.
+
+VALIDATE: шард считает объединяемую статистику столбцов
+(validate.partial_column_stats) и хеши строк для проверки дубликатов.
+"""
+
+import multiprocessing
+import os
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+    from multiprocessing.connection import Connection
+
+# Меньше строк на шард не окупает запуск процесса и передачу данных
+MIN_SHARD_ROWS = 50_000
+
+
+def default_workers() -> int:
+    """Число доступных процессу ядер."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def shard_count(rows: int, workers: int) -> int:
+    """Сколько шардов запускать: не больше workers и не меньше MIN_SHARD_ROWS строк на шард."""
+    return max(1, min(workers, rows // MIN_SHARD_ROWS))
+
+
+def _to_arrow(df: 'pd.DataFrame') -> 'pa.Table':
+    """
+    DataFrame → таблица Arrow для передачи шардам или None, если столбцы
+    не переводятся в Arrow (например, object со значениями разных типов).
+    """
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+
+
+def _send_table(conn: 'Connection', table: 'pa.Table') -> None:
+    """Отправляет таблицу одним буфером Arrow IPC."""
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    conn.send_bytes(sink.getvalue())
+
+
+def _recv_table(conn: 'Connection') -> 'pa.Table':
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(pa.py_buffer(conn.recv_bytes())).read_all()
+
+
+def _recv_frame(conn: 'Connection') -> 'pd.DataFrame':
+    """
+    Шард в виде DataFrame с типами исходного: Arrow восстанавливает тип
+    по данным шарда (object из bool и None в шарде без None станет bool).
+    """
+    dtypes = conn.recv()
+    df = _recv_table(conn).to_pandas()
+    changed = {col: dtype for col, dtype in dtypes.items() if df[col].dtype != dtype}
+    return df.astype(changed) if changed else df
+
+
+def _transform_worker(conn: 'Connection') -> None:
+    """Шаги TRANSFORM в процессе шарда (см. описание модуля)."""
+    import numpy as np
+    import pyarrow as pa
+    from etl.memory import hash_rows
+    from etl.transform import apply_types, type_profile
+
+    df = _recv_frame(conn)
+    present = df.notna().any(axis=1).to_numpy()
+    df = df[present]
+    conn.send((np.flatnonzero(present), hash_rows(df)))
+
+    df = df[conn.recv()].copy()
+    for col in df.select_dtypes(include='object').columns:
+        df[col] = df[col].str.strip()
+    conn.send(type_profile(df))
+
+    conversions, date_formats = conn.recv()
+    table = pa.Table.from_pandas(apply_types(df, conversions, date_formats), preserve_index=False)
+    conn.send(table.num_rows)
+    _send_table(conn, table)
+
+
+def _validate_worker(conn: 'Connection') -> None:
+    """Статистика столбцов и хеши строк шарда для VALIDATE."""
+    from etl.memory import hash_rows
+    from etl.validate import partial_column_stats
+
+    df = _recv_frame(conn)
+    conn.send((partial_column_stats(df), hash_rows(df)))
+
+
+def _run_worker(target: Callable, conn: 'Connection') -> None:
+    """Точка входа процесса шарда: ошибка передается родителю."""
+    try:
+        target(conn)
+    except BaseException as e:
+        conn.send(e)
+        raise
+    finally:
+        conn.close()
+
+
+class ShardPool:
+    """
+    Процессы шардов: по одному на шард, с pipe для обмена.
+
+    Процессы запускаются через forkserver (spawn, где его нет): после
+    fork родителя с потоками pyarrow дочерний процесс может зависнуть.
+    """
+
+    def __init__(self, target: Callable, shards: int):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        if 'forkserver' in methods:
+            context.set_forkserver_preload(['pandas', 'pyarrow', 'etl.shards'])
+
+        self.conns, self.processes = [], []
+        for _ in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_run_worker, args=(target, child), daemon=True)
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+
+    def send_frames(self, df: 'pd.DataFrame', table: 'pa.Table') -> List[int]:
+        """Делит table (строки df) на непрерывные шарды и рассылает их, возвращает начала шардов."""
+        import numpy as np
+
+        bounds = np.linspace(0, table.num_rows, len(self.conns) + 1).astype(int)
+        dtypes = df.dtypes.to_dict()
+        for conn, start, stop in zip(self.conns, bounds, bounds[1:]):
+            conn.send(dtypes)
+            _send_table(conn, table.slice(start, stop - start))
+        return list(bounds[:-1])
+
+    def send(self, messages: list) -> None:
+        """Отправляет каждому шарду его сообщение."""
+        for conn, message in zip(self.conns, messages):
+            conn.send(message)
+
+    def recv(self) -> list:
+        """Ответ каждого шарда (ошибка шарда выбрасывается в родителе)."""
+        results = []
+        for shard, conn in enumerate(self.conns):
+            result = conn.recv()
+            if isinstance(result, BaseException):
+                raise RuntimeError(f"Ошибка в шарде {shard}: {result!r}") from result
+            results.append(result)
+        return results
+
+    def recv_tables(self) -> List['pa.Table']:
+        """Таблицы Arrow от шардов: сначала число строк (или ошибка), затем буфер IPC."""
+        self.recv()
+        return [_recv_table(conn) for conn in self.conns]
+
+    def close(self) -> None:
+        for conn in self.conns:
+            conn.close()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self) -> 'ShardPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def transform_sharded(raw: 'pd.DataFrame', workers: int, derived: dict = None) -> 'pd.DataFrame':
+    """
+    etl.transform.transform на workers процессах. Результат (строки,
+    индекс, типы) совпадает с последовательной обработкой; дубликаты
+    ищутся по 64-битным хешам строк, как при --memory-limit.
+    """
+    import numpy as np
+    import pyarrow as pa
+    from etl.transform import (decide_types, describe_types, finish_transform,
+                               merge_type_profiles, transform)
+
+    shards = shard_count(len(raw), workers)
+    table = _to_arrow(raw) if shards > 1 else None
+    if table is None:
+        if shards > 1:
+            print("  Данные не переводятся в Arrow, трансформация в одном процессе")
+        return transform(raw, derived=derived)
+
+    print(f"  Шардов: {shards}")
+    with ShardPool(_transform_worker, shards) as pool:
+        starts = pool.send_frames(raw, table)
+        del table
+
+        cleaned = pool.recv()
+        positions = np.concatenate([start + present for start, (present, _) in zip(starts, cleaned)])
+        hashes = np.concatenate([shard_hashes for _, shard_hashes in cleaned])
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[np.unique(hashes, return_index=True)[1]] = True
+        sizes = np.cumsum([len(shard_hashes) for _, shard_hashes in cleaned])[:-1]
+        pool.send(np.split(keep, sizes))
+
+        print("\nПриведение типов данных:")
+        conversions, date_formats = decide_types(merge_type_profiles(pool.recv()))
+        describe_types(conversions, date_formats)
+        pool.send([(conversions, date_formats)] * shards)
+
+        df = pa.concat_tables(pool.recv_tables()).to_pandas()
+
+    df.index = raw.index[positions[keep]]
+    return finish_transform(df, derived)
+
+
+def validate_sharded(df: 'pd.DataFrame', workers: int) -> Tuple[Dict[str, dict], Dict[str, bool]]:
+    """
+    validate.validate_dataset на workers процессах.
+    """
+    import numpy as np
+    from etl.validate import merge_column_stats, validate_dataset, validate_stats
+
+    shards = shard_count(len(df), workers)
+    table = _to_arrow(df) if shards > 1 else None
+    if table is None:
+        return validate_dataset(df)
+
+    print(f"  Шардов: {shards}")
+    with ShardPool(_validate_worker, shards) as pool:
+        pool.send_frames(df, table)
+        del table
+        parts, hashes = zip(*pool.recv())
+
+    column_stats = merge_column_stats(list(parts))
+    duplicates = len(df) - len(np.unique(np.concatenate(hashes)))
+    return column_stats, validate_stats(column_stats, len(df), duplicates)
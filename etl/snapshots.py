@@ -0,0 +1,280 @@
+"""
+Версионированные снимки обработанных данных.
+
+Каждая загрузка сохраняет версию датасета в data/snapshots. Строки
+делятся на чанки по содержимому (граница — строка, хеш которой делится
+на target_rows), поэтому вставка или удаление строк меняет только
+соседние чанки, а остальные совпадают с прошлой версией. Чанк хранится
+один раз как Parquet файл objects/<sha[:2]>/<sha>.parquet, версия —
+JSON манифест versions/<id>.json со списком чанков. ID версии —
+<время>-<номер>-<отпечаток данных>: номер растет с каждой версией и
+упорядочивает версии, созданные в одну секунду. Ежедневная история
+стоит столько, сколько изменилось за день, а не полной копии.
+
+Примеры:
+  python -m etl.snapshots list
+  python -m etl.snapshots show latest
+  python -m etl.snapshots export 20261019-101500-000042 --out audit.parquet
+  python -m etl.snapshots prune --keep 90
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+from etl.checkpoint import atomic_path
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+DEFAULT_SNAPSHOT_DIR = 'data/snapshots'
+
+# Средний, минимальный и максимальный размер чанка в строках
+TARGET_CHUNK_ROWS = 8192
+MIN_CHUNK_ROWS = TARGET_CHUNK_ROWS // 4
+MAX_CHUNK_ROWS = TARGET_CHUNK_ROWS * 4
+
+
+def version_order(version: str) -> Tuple[int, str]:
+    """
+    Ключ сортировки версий: номер версии, затем время. У ID прежнего
+    вида <время>-<отпечаток> номера нет, они старше пронумерованных.
+    """
+    parts = version.split('-')
+    sequence = int(parts[2]) if len(parts) == 4 and parts[2].isdigit() else 0
+    return sequence, f"{parts[0]}-{parts[1]}" if len(parts) > 1 else version
+
+
+def chunk_boundaries(row_hashes: 'np.ndarray',
+                     target_rows: int = TARGET_CHUNK_ROWS,
+                     min_rows: int = MIN_CHUNK_ROWS,
+                     max_rows: int = MAX_CHUNK_ROWS) -> List[Tuple[int, int]]:
+    """
+    Границы чанков [start, end) по содержимому строк.
+
+    Чанк заканчивается на строке, хеш которой делится на target_rows
+    (если чанк уже не короче min_rows), и принудительно — на max_rows.
+    """
+    import numpy as np
+
+    total = len(row_hashes)
+    candidates = np.flatnonzero((row_hashes >> np.uint64(16)) % np.uint64(target_rows) == 0)
+
+    bounds, start = [], 0
+    for position in candidates:
+        end = int(position) + 1
+        while end - start > max_rows:
+            bounds.append((start, start + max_rows))
+            start += max_rows
+        if end - start >= min_rows:
+            bounds.append((start, end))
+            start = end
+    while total - start > max_rows:
+        bounds.append((start, start + max_rows))
+        start += max_rows
+    if start < total or not bounds:
+        bounds.append((start, total))
+    return bounds
+
+
+class SnapshotStore:
+    """Хранилище версий: objects/ (чанки по хешу) и versions/ (манифесты)."""
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_SNAPSHOT_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.versions_dir = self.root / 'versions'
+
+    def object_path(self, key: str) -> Path:
+        return self.objects_dir / key[:2] / f"{key}.parquet"
+
+    def versions(self) -> List[str]:
+        """ID версий от старых к новым (по номеру версии, см. version_order)."""
+        if not self.versions_dir.exists():
+            return []
+        return sorted((path.stem for path in self.versions_dir.glob('*.json')), key=version_order)
+
+    def resolve(self, version: str = 'latest') -> str:
+        versions = self.versions()
+        if not versions:
+            raise FileNotFoundError(f"Нет снимков в {self.root}")
+        if version == 'latest':
+            return versions[-1]
+        matches = [v for v in versions if v == version or v.startswith(version)]
+        if len(matches) != 1:
+            raise FileNotFoundError(
+                f"Версия {version} не найдена" if not matches
+                else f"Версия {version} неоднозначна: {', '.join(matches)}"
+            )
+        return matches[0]
+
+    def manifest(self, version: str = 'latest') -> dict:
+        version = self.resolve(version)
+        return json.loads((self.versions_dir / f"{version}.json").read_text(encoding='utf-8'))
+
+    def chunk_paths(self, version: str = 'latest') -> List[str]:
+        return [str(self.object_path(chunk['key'])) for chunk in self.manifest(version)['chunks']]
+
+    def create(self, df: 'pd.DataFrame',
+               source_fingerprint: Optional[str] = None,
+               target_rows: int = TARGET_CHUNK_ROWS,
+               compression: str = 'zstd') -> dict:
+        """
+        Сохраняет версию df. Записываются только чанки, которых еще нет в
+        хранилище. Если данные не изменились с последней версии, новая
+        версия не создается и возвращается манифест последней.
+        """
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not pa.Codec.is_available(compression):
+            compression = 'snappy'
+
+        dtypes = [(str(column), str(dtype)) for column, dtype in df.dtypes.items()]
+        schema_key = json.dumps(dtypes).encode('utf-8')
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+        chunks, written_bytes, new_chunks = [], 0, 0
+        for start, end in chunk_boundaries(row_hashes, target_rows,
+                                           max(target_rows // 4, 1), target_rows * 4):
+            key = hashlib.sha256(schema_key + row_hashes[start:end].tobytes()).hexdigest()
+            path = self.object_path(key)
+            if not path.exists():
+                table = pa.Table.from_pandas(df.iloc[start:end], preserve_index=False)
+                with atomic_path(path) as tmp_path:
+                    pq.write_table(table, tmp_path, compression=compression)
+                written_bytes += path.stat().st_size
+                new_chunks += 1
+            chunks.append({'key': key, 'rows': end - start})
+
+        data_fingerprint = hashlib.sha256(
+            schema_key + ''.join(chunk['key'] for chunk in chunks).encode('utf-8')
+        ).hexdigest()[:16]
+
+        versions = self.versions()
+        sequence = 1
+        if versions:
+            latest = self.manifest(versions[-1])
+            if latest['data_fingerprint'] == data_fingerprint:
+                return {**latest, 'unchanged': True}
+            sequence = version_order(versions[-1])[0] + 1
+
+        created_at = datetime.now()
+        while True:
+            version = f"{created_at.strftime('%Y%m%d-%H%M%S')}-{sequence:06d}-{data_fingerprint[:8]}"
+            # Номер мог занять параллельный запуск
+            if not list(self.versions_dir.glob(f"*-{sequence:06d}-*.json")):
+                break
+            sequence += 1
+        manifest = {
+            'version': version,
+            'sequence': sequence,
+            'parent': versions[-1] if versions else None,
+            'created_at': created_at.isoformat(timespec='microseconds'),
+            'rows': len(df),
+            'dtypes': dtypes,
+            'source_fingerprint': source_fingerprint,
+            'data_fingerprint': data_fingerprint,
+            'chunks': chunks,
+            'new_chunks': new_chunks,
+            'reused_chunks': len(chunks) - new_chunks,
+            'written_bytes': written_bytes,
+        }
+        # Манифест пишется последним: версия видна, только когда все чанки на диске
+        with atomic_path(self.versions_dir / f"{version}.json") as tmp_path:
+            tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+        return manifest
+
+    def read(self, version: str = 'latest', columns: Optional[Sequence[str]] = None) -> 'pd.DataFrame':
+        """Датасет версии version (ID, его начало или 'latest')."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tables = [pq.read_table(path, columns=columns) for path in self.chunk_paths(version)]
+        # Чанки прошлых версий могут иметь другую ширину индексов category
+        return pa.concat_tables(tables, promote_options='permissive').unify_dictionaries().to_pandas()
+
+    def prune(self, keep: int) -> Tuple[List[str], int]:
+        """
+        Оставляет keep последних версий и удаляет чанки, на которые не
+        ссылается ни одна оставшаяся версия. Возвращает (удаленные версии,
+        освобождено байт).
+        """
+        versions = self.versions()
+        removed = versions[:max(len(versions) - keep, 0)]
+        for version in removed:
+            (self.versions_dir / f"{version}.json").unlink()
+
+        referenced = {
+            chunk['key'] for version in self.versions() for chunk in self.manifest(version)['chunks']
+        }
+        freed = 0
+        if self.objects_dir.exists():
+            for path in self.objects_dir.glob('*/*.parquet'):
+                if path.stem not in referenced:
+                    freed += path.stat().st_size
+                    path.unlink()
+        return removed, freed
+
+
+def main():
+    """CLI для просмотра, чтения и очистки снимков."""
+    parser = argparse.ArgumentParser(
+        description="Версионированные снимки обработанных данных",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Примеры:')[1]
+    )
+    parser.add_argument('--store', default=DEFAULT_SNAPSHOT_DIR, help='Папка хранилища снимков')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='Список версий')
+    show = commands.add_parser('show', help='Манифест версии')
+    show.add_argument('version', nargs='?', default='latest')
+    export = commands.add_parser('export', help='Выгрузить версию в файл')
+    export.add_argument('version')
+    export.add_argument('--out', required=True, help='Файл .parquet, .csv или .feather')
+    prune = commands.add_parser('prune', help='Удалить старые версии и неиспользуемые чанки')
+    prune.add_argument('--keep', type=int, required=True, help='Сколько последних версий оставить')
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store)
+    try:
+        if args.command == 'list':
+            print(f"{'версия':28} {'создана':20} {'строк':>10} {'чанков':>7} {'новых':>6} {'записано, МБ':>13}")
+            print("-" * 90)
+            for version in store.versions():
+                m = store.manifest(version)
+                print(f"{version:28} {m['created_at']:20} {m['rows']:>10} {len(m['chunks']):>7} "
+                      f"{m['new_chunks']:>6} {m['written_bytes'] / 1024 / 1024:>13.2f}")
+
+        elif args.command == 'show':
+            manifest = store.manifest(args.version)
+            manifest['chunks'] = f"{len(manifest['chunks'])} чанков"
+            print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+        elif args.command == 'export':
+            df = store.read(args.version)
+            out = Path(args.out)
+            with atomic_path(out) as tmp_path:
+                if out.suffix == '.csv':
+                    df.to_csv(tmp_path, index=False)
+                elif out.suffix == '.feather':
+                    df.to_feather(tmp_path)
+                else:
+                    df.to_parquet(tmp_path, index=False)
+            print(f"✓ Версия {store.resolve(args.version)}: {len(df)} строк → {out}")
+
+        elif args.command == 'prune':
+            removed, freed = store.prune(args.keep)
+            print(f"Удалено версий: {len(removed)}, освобождено {freed / 1024 / 1024:.2f} МБ")
+
+    except FileNotFoundError as e:
+        parser.exit(1, f"Ошибка: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Компактное хранение выгрузки SQLite (--sqlite-compact).
+
+Столбцы category и текстовые столбцы с не более чем CATEGORY_LIMIT
+значениями хранятся целыми кодами (1 байт в записи SQLite вместо
+повторяющейся строки) со словарем в таблице <table>__dict_<столбец>
+(code, value), даты — целым числом секунд, миллисекунд или микросекунд
+от эпохи (самая крупная единица, в которой значения точны; даты с
+наносекундами хранятся как есть).
+Строки лежат в <table>__data, вид каждого столбца — в <table>__layout,
+а <table> — представление, которое декодирует коды и даты: etl.main,
+дашборды и внешние инструменты читают прежние значения.
+
+Условие по декодированному столбцу SQLite превращает в поиск кода
+в словаре и индекс по кодам (LEFT JOIN словаря сводится к JOIN, когда
+WHERE требует непустое значение). В агрегирующих запросах SQLite не
+убирает LEFT JOIN неиспользуемых словарей, поэтому etl.query строит
+запрос через DecodedColumns: фильтрует и группирует по кодам и
+декодирует только выводимые столбцы.
+
+Модуль не импортирует pandas на верхнем уровне: его используют
+etl.query и etl.check_database.
+"""
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATA_SUFFIX = '__data'
+DICT_INFIX = '__dict_'
+LAYOUT_SUFFIX = '__layout'
+
+# Служебные таблицы компактной выгрузки, в том числе промежуточные (__new) и старые (__old)
+STORAGE_TABLE = re.compile(r'__(data|dict_|layout)')
+
+def _epoch_decoder(scale: int) -> str:
+    """
+    SQL, выводящий эпоху в единицах 1/scale секунды так же, как
+    обычная выгрузка to_sql: 'YYYY-MM-DD HH:MM:SS' и шесть знаков
+    микросекунд, если они не нулевые. У strftime нет поля микросекунд:
+    секунды округляются вниз (для дат до 1970 года остаток от деления
+    отрицательный), дробная часть дописывается отдельно.
+    """
+    column = 'd."{column}"'
+    remainder = f"(({column} % {scale} + {scale}) % {scale})"
+    return (f"(datetime(({column} - {remainder}) / {scale}, 'unixepoch') || "
+            f"CASE {remainder} WHEN 0 THEN '' "
+            f"ELSE printf('.%06d', {remainder} * {1_000_000 // scale}) END)")
+
+
+# Вид столбца в <table>__layout: значение как есть, код словаря, эпоха
+# в секундах, миллисекундах или микросекундах
+DECODERS = {
+    'value': 'd."{column}"',
+    'code': 'c{n}.value',
+    's': "datetime(d.\"{column}\", 'unixepoch')",
+    'ms': _epoch_decoder(1_000),
+    'us': _epoch_decoder(1_000_000),
+}
+
+# Единицы эпохи от крупной к мелкой: (вид, наносекунд в единице)
+EPOCH_UNITS = (('s', 1_000_000_000), ('ms', 1_000_000), ('us', 1_000))
+
+
+def data_table(table_name: str) -> str:
+    return f"{table_name}{DATA_SUFFIX}"
+
+
+def dict_table(table_name: str, column: str) -> str:
+    return f"{table_name}{DICT_INFIX}{column}"
+
+
+def layout_table(table_name: str) -> str:
+    return f"{table_name}{LAYOUT_SUFFIX}"
+
+
+def is_storage_table(name: str) -> bool:
+    """Служебная таблица компактной выгрузки (коды, словарь или схема)."""
+    return STORAGE_TABLE.search(name) is not None
+
+
+def storage_tables(conn: sqlite3.Connection, table_name: str) -> List[str]:
+    """Служебные таблицы выгрузки table_name (без промежуточных __new и старых __old)."""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND (name IN (?, ?) OR name GLOB ?)",
+        (data_table(table_name), layout_table(table_name), f"{dict_table(table_name, '')}*")
+    ).fetchall()
+    return [name for (name,) in rows if not name.endswith(('__new', '__old'))]
+
+
+def drop_object(conn: sqlite3.Connection, name: str) -> None:
+    """Удаляет таблицу или представление name, если оно есть."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')",
+                       (name,)).fetchone()
+    if row:
+        conn.execute(f'DROP {row[0].upper()} "{name}"')
+
+
+def drop_storage_tables(conn: sqlite3.Connection, table_name: str,
+                        keep: Sequence[str] = ()) -> List[str]:
+    """
+    Удаляет служебные таблицы выгрузки table_name, кроме keep (словари
+    столбцов, которые больше не кодируются, или весь компактный вид при
+    возврате к обычной таблице). Изменения не фиксируются.
+    """
+    dropped = [name for name in storage_tables(conn, table_name) if name not in keep]
+    for name in dropped:
+        conn.execute(f'DROP TABLE "{name}"')
+    return dropped
+
+
+@dataclass
+class CompactFrame:
+    """
+    Данные для записи в компактном виде.
+
+    frame — столбцы с кодами и эпохами вместо значений, layout — вид
+    каждого столбца в исходном порядке (ключи DECODERS), dictionaries —
+    значения словарей по столбцам (код = позиция).
+    """
+    frame: 'pd.DataFrame'
+    layout: Dict[str, str]
+    dictionaries: Dict[str, list] = field(default_factory=dict)
+
+
+def encode_compact(df: 'pd.DataFrame', max_categories: Optional[int] = None) -> CompactFrame:
+    """
+    Кодирует столбцы category и текстовые столбцы с не более чем
+    max_categories значениями (по умолчанию etl.transform.CATEGORY_LIMIT),
+    даты переводит в эпоху в самой крупной единице из EPOCH_UNITS, в
+    которой все значения столбца точны. Даты с наносекундами не
+    кодируются: эпоха потеряла бы точность. NULL остается NULL.
+    """
+    import numpy as np
+    import pandas as pd
+    from etl.transform import CATEGORY_LIMIT
+
+    max_categories = CATEGORY_LIMIT if max_categories is None else max_categories
+    frame = df.copy(deep=False)
+    encoded = CompactFrame(frame=frame, layout={str(column): 'value' for column in df.columns})
+
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if getattr(series.dt, 'tz', None) is not None:
+                series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+            nanos = series.dt.as_unit('ns').to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            missing = series.isna().to_numpy()
+            exact = [(unit, scale) for unit, scale in EPOCH_UNITS
+                     if (nanos[~missing] % scale == 0).all()]
+            if not exact:
+                continue
+            unit, scale = exact[0]
+            frame[column] = pd.array(np.where(missing, 0, nanos // scale), dtype='Int64')
+            frame.loc[missing, column] = pd.NA
+            encoded.layout[str(column)] = unit
+
+        elif isinstance(series.dtype, pd.CategoricalDtype) or (
+                (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series))
+                and series.nunique() <= max_categories):
+            categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+            codes = categorical.cat.codes.to_numpy()
+            frame[column] = pd.array(np.where(codes < 0, 0, codes), dtype='Int16')
+            frame.loc[codes < 0, column] = pd.NA
+            encoded.layout[str(column)] = 'code'
+            encoded.dictionaries[str(column)] = list(categorical.cat.categories)
+
+    return encoded
+
+
+def write_storage(conn: sqlite3.Connection, table_name: str,
+                  encoded: CompactFrame, suffix: str = '') -> List[str]:
+    """
+    Пересоздает словари <table>__dict_<столбец><suffix> и схему
+    <table>__layout<suffix>, возвращает их имена.
+    """
+    names = []
+    for column, values in encoded.dictionaries.items():
+        name = f"{dict_table(table_name, column)}{suffix}"
+        value_type = 'TEXT' if all(isinstance(value, str) for value in values) else ''
+        conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+        conn.execute(
+            f'CREATE TABLE "{name}" (code INTEGER PRIMARY KEY, value {value_type} NOT NULL UNIQUE)'
+        )
+        conn.executemany(f'INSERT INTO "{name}" VALUES (?, ?)',
+                         [(code, value.item() if hasattr(value, 'item') else value)
+                          for code, value in enumerate(values)])
+        names.append(name)
+
+    name = f"{layout_table(table_name)}{suffix}"
+    conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+    conn.execute(
+        f'CREATE TABLE "{name}" (position INTEGER PRIMARY KEY, "column" TEXT NOT NULL, kind TEXT NOT NULL)'
+    )
+    conn.executemany(f'INSERT INTO "{name}" VALUES (?, ?, ?)',
+                     [(position, column, kind)
+                      for position, (column, kind) in enumerate(encoded.layout.items())])
+    names.append(name)
+
+    conn.commit()
+    return names
+
+
+def read_layout(conn: sqlite3.Connection, table_name: str) -> Optional[Dict[str, str]]:
+    """Вид столбцов компактной выгрузки table_name или None, если это обычная таблица."""
+    is_compact = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='view' AND name = ? "
+        "AND EXISTS (SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?)",
+        (table_name, layout_table(table_name))
+    ).fetchone()
+    if not is_compact:
+        return None
+    return dict(conn.execute(f'SELECT "column", kind FROM "{layout_table(table_name)}" ORDER BY position'))
+
+
+class DecodedColumns:
+    """
+    Выражения SQL над <table>__data AS d для запросов к компактной
+    выгрузке в обход представления: словари присоединяются только для
+    декодируемых столбцов, а условия и группировка по кодированным
+    столбцам выполняются по кодам (индексы по кодам, без поиска в словаре
+    на каждой строке). Если передан conn, коды для условий ищутся в
+    словаре заранее и подставляются в запрос константами.
+    """
+
+    def __init__(self, table_name: str, layout: Dict[str, str],
+                 conn: Optional[sqlite3.Connection] = None):
+        self.table_name = table_name
+        self.layout = layout
+        self.conn = conn
+        self._joins: Dict[str, str] = {}
+
+    def value(self, column: str) -> str:
+        """Декодированное значение столбца."""
+        kind = self.layout[column]
+        if kind == 'code' and column not in self._joins:
+            alias = f"c{len(self._joins)}"
+            self._joins[column] = (f'LEFT JOIN "{dict_table(self.table_name, column)}" AS {alias} '
+                                   f'ON {alias}.code = d."{column}"')
+        n = list(self._joins).index(column) if kind == 'code' else 0
+        return DECODERS[kind].format(column=column, n=n)
+
+    def key(self, column: str) -> str:
+        """
+        Выражение для группировки и сортировки: код взаимно однозначен
+        со значением, а порядок кодов — порядок отсортированного словаря.
+        """
+        kind = self.layout[column]
+        return f'd."{column}"' if kind in ('code', *dict(EPOCH_UNITS)) else self.value(column)
+
+    def condition(self, column: str, predicate: str, params: Sequence = ()) -> Tuple[str, list]:
+        """
+        Условие '<столбец> <predicate>' (например, "= ?" или "IN (?, ?)")
+        с параметрами params: (SQL, параметры).
+        """
+        if self.layout[column] != 'code':
+            return f'{self.value(column)} {predicate}', list(params)
+
+        lookup = f'SELECT code FROM "{dict_table(self.table_name, column)}" WHERE value {predicate}'
+        if self.conn is None:
+            return f'd."{column}" IN ({lookup})', list(params)
+        codes = [str(code) for (code,) in self.conn.execute(lookup, list(params))]
+        return f'd."{column}" IN ({", ".join(codes)})', []
+
+    def source(self) -> str:
+        """FROM: таблица кодов и словари столбцов, запрошенных через value."""
+        return f'"{data_table(self.table_name)}" AS d {" ".join(self._joins.values())}'.rstrip()
+
+
+def decode_select(table_name: str, layout: Dict[str, str],
+                  columns: Optional[Sequence[str]] = None) -> str:
+    """SELECT, декодирующий столбцы columns (по умолчанию все) выгрузки table_name."""
+    decoded = DecodedColumns(table_name, layout)
+    select = [f'{decoded.value(column)} AS "{column}"'
+              for column in (layout if columns is None else columns)]
+    return f'SELECT {", ".join(select)} FROM {decoded.source()}'
+
+
+def create_view(conn: sqlite3.Connection, table_name: str, layout: Dict[str, str]) -> None:
+    """
+    Создает представление table_name над <table>__data и словарями.
+    Изменения не фиксируются: вызывающий создает представление в своей
+    транзакции (например, вместе с подменой таблиц).
+    """
+    conn.execute(f'CREATE VIEW "{table_name}" AS {decode_select(table_name, layout)}')
@@ -1,5 +1,17 @@
 import pandas as pd
-from typing import Dict, List
+from pandas.tseries.api import guess_datetime_format
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from etl.memory import MemoryBudget
+
+# Текстовый столбец с не более чем CATEGORY_LIMIT значениями становится category
+CATEGORY_LIMIT = 20
+
+
+# Столбец с одним из этих слов в имени приводится к дате
+DATE_KEYWORDS = ['date', 'time', 'day', 'month', 'year', 'created', 'updated', 'timestamp']
+DATE_PATTERN = r'\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}'
 
 
 def detect_date_columns(df: pd.DataFrame) -> List[str]:
@@ -7,61 +19,162 @@ def detect_date_columns(df: pd.DataFrame) -> List[str]:
     Автоматическое обнаружение колонок с датами.
     """
     date_columns = []
-    date_keywords = ['date', 'time', 'day', 'month', 'year', 'created', 'updated', 'timestamp']
 
     for column in df.columns:
         col_lower = column.lower()
-        if any(keyword in col_lower for keyword in date_keywords):
+        if any(keyword in col_lower for keyword in DATE_KEYWORDS):
             date_columns.append(column)
         elif df[column].dtype == 'object':
             sample = df[column].dropna().head(5)
-            if not sample.empty and sample.astype(str).str.match(r'\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}').any():
+            if not sample.empty and sample.astype(str).str.match(DATE_PATTERN).any():
                 date_columns.append(column)
 
     return date_columns
 
 
-def infer_types(df: pd.DataFrame, type_hints: Dict[str, str] = None) -> pd.DataFrame:
+def type_profile(df: pd.DataFrame) -> Dict[str, dict]:
     """
-    Приведение типов данных с оптимизацией памяти.
+    Сводка столбцов, по которой infer_types выбирает типы.
+
+    Сводки частей датасета объединяются merge_type_profiles, и решения
+    по объединенной сводке совпадают с решениями по всему датасету:
+    так шарды (см. etl.shards) приводят типы одинаково.
     """
-    df_copy = df.copy()
+    profile = {}
+    for column in df.columns:
+        series = df[column]
+        entry = {'dtype': series.dtype, 'rows': len(series)}
 
-    print("\nПриведение типов данных:")
+        if series.dtype == 'object':
+            # Первые CATEGORY_LIMIT + 1 значений достаточно, чтобы решить, category ли это
+            entry['distinct'] = list(series.dropna().unique()[:CATEGORY_LIMIT + 1])
+            converted = pd.to_numeric(series, errors='coerce')
+            entry['numeric'] = converted.dtype
+            entry['any_numeric'] = not converted.isna().all()
+            entry['head'] = list(series.dropna().head(5))
+
+        elif pd.api.types.is_integer_dtype(series):
+            entry['downcast'] = pd.to_numeric(series, downcast='integer').dtype
+
+        elif pd.api.types.is_float_dtype(series):
+            entry['downcast'] = pd.to_numeric(series, downcast='float').dtype
+
+        if any(keyword in str(column).lower() for keyword in DATE_KEYWORDS):
+            first = series.dropna().head(1)
+            entry['first'] = first.iloc[0] if len(first) else None
+
+        profile[column] = entry
+    return profile
+
+
+def _common_dtype(dtypes: Iterable) -> object:
+    """Тип, к которому приводятся все dtypes (int8 и int16 → int16, int64 и float64 → float64)."""
+    import numpy as np
 
-    for column in df_copy.columns:
-        original_dtype = df_copy[column].dtype
-        unique_count = df_copy[column].nunique()
+    dtypes = list(dict.fromkeys(dtypes))
+    return dtypes[0] if len(dtypes) == 1 else np.result_type(*dtypes)
 
-        if unique_count <= 20 and df_copy[column].dtype == 'object':
-            df_copy[column] = df_copy[column].astype('category')
-            print(f"  {column}: object → category ({unique_count} уникальных)")
 
-        elif df_copy[column].dtype == 'object':
-            converted = pd.to_numeric(df_copy[column], errors='coerce')
-            if not converted.isna().all():
-                df_copy[column] = converted
-                print(f"  {column}: object → numeric")
-            else:
-                df_copy[column] = df_copy[column].astype('string')
-                print(f"  {column}: object → string")
+def merge_type_profiles(profiles: Sequence[Dict[str, dict]]) -> Dict[str, dict]:
+    """Объединяет сводки частей датасета (в порядке строк)."""
+    merged = {}
+    for column, first in profiles[0].items():
+        entries = [profile[column] for profile in profiles]
+        filled = [entry for entry in entries if entry['rows']] or entries[:1]
+        entry = {'dtype': first['dtype'], 'rows': sum(e['rows'] for e in entries)}
 
-        elif pd.api.types.is_integer_dtype(df_copy[column]):
-            df_copy[column] = pd.to_numeric(df_copy[column], downcast='integer')
-            print(f"  {column}: int → {df_copy[column].dtype}")
+        if 'distinct' in first:
+            entry['distinct'] = list(dict.fromkeys(v for e in entries for v in e['distinct']))
+            entry['distinct'] = entry['distinct'][:CATEGORY_LIMIT + 1]
+            entry['numeric'] = _common_dtype(e['numeric'] for e in filled)
+            entry['any_numeric'] = any(e['any_numeric'] for e in entries)
+            entry['head'] = [v for e in entries for v in e['head']][:5]
+        if 'downcast' in first:
+            entry['downcast'] = _common_dtype(e['downcast'] for e in filled)
+        if 'first' in first:
+            entry['first'] = next((e['first'] for e in entries if e['first'] is not None), None)
 
-        elif pd.api.types.is_float_dtype(df_copy[column]):
-            df_copy[column] = pd.to_numeric(df_copy[column], downcast='float')
-            print(f"  {column}: float → {df_copy[column].dtype}")
+        merged[column] = entry
+    return merged
 
-    date_columns = detect_date_columns(df_copy)
-    for col in date_columns:
-        df_copy[col] = pd.to_datetime(df_copy[col], errors='coerce')
-        print(f"  {col}: → datetime64")
+
+def decide_types(profile: Dict[str, dict]) -> Tuple[Dict[str, tuple], Dict[str, Optional[str]]]:
+    """
+    Решения infer_types по сводке: ({столбец: (вид, параметр)},
+    {столбец даты: формат строки или None}).
+    """
+    conversions, final_dtypes = {}, {}
+    for column, entry in profile.items():
+        dtype = entry['dtype']
+        if 'distinct' in entry and len(entry['distinct']) <= CATEGORY_LIMIT:
+            categories = pd.Series(entry['distinct'], dtype='object').astype('category').cat.categories
+            conversions[column] = ('category', categories)
+        elif 'distinct' in entry:
+            conversions[column] = ('numeric', entry['numeric']) if entry['any_numeric'] else ('string', None)
+        elif pd.api.types.is_integer_dtype(dtype):
+            conversions[column] = ('int', entry['downcast'])
+        elif pd.api.types.is_float_dtype(dtype):
+            conversions[column] = ('float', entry['downcast'])
+        final_dtypes[column] = dtype if column not in conversions else None
+
+    date_formats = {}
+    for column, entry in profile.items():
+        if 'first' in entry or (final_dtypes[column] == 'object' and entry.get('head') and
+                                pd.Series(entry['head']).astype(str).str.match(DATE_PATTERN).any()):
+            # Формат угадывается по первому значению всего датасета, а не шарда
+            first = entry.get('first')
+            keeps_text = conversions.get(column, ('text',))[0] in ('text', 'category', 'string')
+            date_formats[column] = guess_datetime_format(first) if keeps_text and isinstance(first, str) else None
+    return conversions, date_formats
+
+
+def apply_types(df: pd.DataFrame,
+                conversions: Dict[str, tuple],
+                date_formats: Dict[str, Optional[str]]) -> pd.DataFrame:
+    """Приводит типы по решениям decide_types (столбцы заменяются, данные не копируются)."""
+    df_copy = df.copy(deep=False)
+
+    for column, (kind, param) in conversions.items():
+        series = df_copy[column]
+        if kind == 'category':
+            df_copy[column] = series.astype(pd.CategoricalDtype(param))
+        elif kind == 'numeric':
+            df_copy[column] = pd.to_numeric(series, errors='coerce').astype(param)
+        elif kind == 'string':
+            df_copy[column] = series.astype('string')
+        else:
+            df_copy[column] = series.astype(param)
+
+    for column, date_format in date_formats.items():
+        df_copy[column] = pd.to_datetime(df_copy[column], errors='coerce', format=date_format)
 
     return df_copy
 
 
+def describe_types(conversions: Dict[str, tuple], date_formats: Dict[str, Optional[str]]) -> None:
+    """Печатает решения decide_types."""
+    for column, (kind, param) in conversions.items():
+        if kind == 'category':
+            print(f"  {column}: object → category ({len(param)} уникальных)")
+        elif kind in ('numeric', 'string'):
+            print(f"  {column}: object → {kind}")
+        else:
+            print(f"  {column}: {kind} → {param}")
+    for column in date_formats:
+        print(f"  {column}: → datetime64")
+
+
+def infer_types(df: pd.DataFrame, type_hints: Dict[str, str] = None) -> pd.DataFrame:
+    """
+    Приведение типов данных с оптимизацией памяти.
+    """
+    print("\nПриведение типов данных:")
+
+    conversions, date_formats = decide_types(type_profile(df))
+    describe_types(conversions, date_formats)
+    return apply_types(df, conversions, date_formats)
+
+
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """Очистка данных."""
     df_copy = df.copy()
@@ -75,12 +188,121 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     return df_copy
 
 
-def transform(df: pd.DataFrame, type_hints: Dict[str, str] = None) -> pd.DataFrame:
+def transform(df: pd.DataFrame, type_hints: Dict[str, str] = None,
+              derived: dict = None) -> pd.DataFrame:
     """
     Основная функция трансформации.
+
+    derived — конфигурация производных столбцов (см. etl.derive),
+    они вычисляются после приведения типов.
     """
     df = clean_data(df)
     df = infer_types(df, type_hints)
+    return finish_transform(df, derived)
+
+
+def finish_transform(df: pd.DataFrame, derived: dict = None) -> pd.DataFrame:
+    """Производные столбцы и итог трансформации (общий конец transform и etl.shards)."""
+    if derived:
+        from etl.derive import derive_columns
+        df = derive_columns(df, derived)
+
+    memory_usage = df.memory_usage(deep=True).sum() / 1024 / 1024
+    print(f"\n✓ Трансформация завершена")
+    print(f"  Размер: {df.shape[0]} строк × {df.shape[1]} столбцов")
+    print(f"  Память: {memory_usage:.2f} МБ")
+
+    return df
+
+
+def compact_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Текстовые столбцы с повторяющимися значениями → category (меньше памяти на строку)."""
+    for col in df.select_dtypes(include='object').columns:
+        if df[col].nunique() <= len(df) // 2:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def concat_chunks(parts: List[pd.DataFrame], dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Склеивает сжатые чанки. Категории объединяются (отсортированными,
+    как у astype('category')); столбцы, которые infer_types не сделал
+    бы category (больше CATEGORY_LIMIT значений или не object), возвращаются
+    к исходному типу, чтобы результат совпадал с обработкой без лимита.
+    """
+    from pandas.api.types import union_categoricals
+
+    columns = {}
+    for col in dtypes.index:
+        pieces = [part[col] for part in parts]
+        if all(isinstance(piece.dtype, pd.CategoricalDtype) for piece in pieces):
+            series = pd.Series(union_categoricals(pieces, sort_categories=True), name=col)
+            if len(series.cat.categories) > CATEGORY_LIMIT or dtypes[col] != 'object':
+                series = series.astype(dtypes[col])
+        else:
+            pieces = [
+                piece.astype(dtypes[col]) if isinstance(piece.dtype, pd.CategoricalDtype) else piece
+                for piece in pieces
+            ]
+            series = pd.concat(pieces, ignore_index=True)
+        columns[col] = series
+    return pd.DataFrame(columns)
+
+
+def transform_chunks(chunks: Iterable[pd.DataFrame],
+                     budget: 'MemoryBudget',
+                     type_hints: Dict[str, str] = None,
+                     dedup_share: float = 0.2,
+                     derived: dict = None) -> pd.DataFrame:
+    """
+    Трансформация чанками в пределах бюджета памяти (--memory-limit).
+
+    Очистка выполняется по чанкам в том же порядке, что в clean_data;
+    дубликаты ищутся между чанками по хешам строк, которые при
+    превышении dedup_share бюджета сбрасываются на диск. Чанки хранятся
+    сжатыми (category), типы приводятся один раз по всему результату.
+    Если результат не помещается в бюджет, выбрасывается
+    MemoryBudgetError до того, как процесс упрется в лимит. derived —
+    производные столбцы, как в transform.
+    """
+    from etl.memory import MemoryBudgetError, SpillingDeduplicator, format_bytes
+
+    parts, dtypes, rows_in = [], None, 0
+    with SpillingDeduplicator(int(budget.usable_bytes * dedup_share), budget.spill_dir) as dedup:
+        for chunk in chunks:
+            rows_in += len(chunk)
+            if dtypes is None:
+                dtypes = chunk.dtypes
+
+            chunk = chunk.dropna(how='all')
+            chunk = chunk[dedup.first_occurrences(chunk)].copy()
+            for col in chunk.select_dtypes(include='object').columns:
+                chunk[col] = chunk[col].str.strip()
+            parts.append(compact_chunk(chunk))
+
+            if budget.near_limit():
+                raise MemoryBudgetError(
+                    f"Результат трансформации после {rows_in:,} строк не помещается "
+                    f"в бюджет памяти ({budget.describe()})"
+                )
+
+        if dedup.spilled_runs:
+            print(f"  Хеши дубликатов сброшены на диск: {dedup.spilled_runs} файлов, "
+                  f"{format_bytes(dedup.spilled_bytes)}")
+
+    df = concat_chunks(parts, dtypes)
+    del parts
+    print(f"  Обработано {rows_in:,} строк чанками, осталось {len(df):,}")
+
+    # infer_types преобразует по одному столбцу: нужен запас на самый большой
+    if budget.near_limit(extra_bytes=2 * int(df.memory_usage(deep=True, index=False).max())):
+        raise MemoryBudgetError(
+            f"Приведение типов {len(df):,} строк не помещается в бюджет памяти ({budget.describe()})"
+        )
+    df = infer_types(df, type_hints)
+    if derived:
+        from etl.derive import derive_columns
+        df = derive_columns(df, derived)
 
     memory_usage = df.memory_usage(deep=True).sum() / 1024 / 1024
     print(f"\n✓ Трансформация завершена")
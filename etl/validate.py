@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from typing import List, Tuple, Dict
 
@@ -128,6 +129,141 @@ def check_shape(df: pd.DataFrame) -> Tuple[bool, str]:
     return True, "✓ " + msg
 
 
+def _to_json_value(value):
+    """numpy/pandas скаляр → значение, сериализуемое в JSON."""
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+QUANTILES = {'25%': 0.25, '50%': 0.5, '75%': 0.75}
+
+
+def partial_column_stats(df: pd.DataFrame) -> dict:
+    """
+    Объединяемая статистика части датасета (всего датасета или шарда):
+    счетчики значений, NULL, среднее и сумма квадратов отклонений
+    числовых столбцов, min/max дат. Объединяется точно (merge_column_stats).
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        part = {
+            'dtype': str(series.dtype),
+            'count': int(series.count()),
+            'nulls': int(series.isnull().sum()),
+            'counts': series.value_counts(sort=False),
+        }
+
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            values = series.dropna().to_numpy(dtype=np.float64)
+            part['mean'] = float(values.mean()) if len(values) else 0.0
+            part['m2'] = float(((values - part['mean']) ** 2).sum())
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            part['min'], part['max'] = series.min(), series.max()
+
+        columns[col] = part
+    return {'rows': len(df), 'columns': columns}
+
+
+def _quantiles_from_counts(counts: pd.Series) -> Dict[str, float]:
+    """Квартили с линейной интерполяцией (как Series.quantile) по счетчикам значений."""
+    counts = counts[counts > 0].sort_index()
+    values = counts.index.to_numpy(dtype=np.float64)
+    cumulative = np.cumsum(counts.to_numpy())
+    at = lambda position: values[np.searchsorted(cumulative, position, side='right')]
+
+    result = {}
+    for key, q in QUANTILES.items():
+        position = q * (cumulative[-1] - 1)
+        lo, hi = np.floor(position), np.ceil(position)
+        result[key] = float(at(lo) + (at(hi) - at(lo)) * (position - lo))
+    return result
+
+
+def merge_column_stats(parts: List[dict], top_n: int = 10) -> Dict[str, dict]:
+    """
+    Объединяет partial_column_stats частей (в порядке строк) в статистику
+    столбцов всего датасета: dtype, count, nulls, unique; для чисел —
+    mean, std, min, квартили, max; для дат — min и max; для остальных —
+    top_n частых значений. Счетчики складываются, среднее и std
+    объединяются по формуле Чана, квартили считаются по суммарным
+    счетчикам. Статистика сохраняется в каталог при загрузке, чтобы
+    инспекция БД не пересчитывала ее.
+    """
+    stats = {}
+    for col, first in parts[0]['columns'].items():
+        pieces = [part['columns'][col] for part in parts]
+        counts = pd.concat([piece['counts'] for piece in pieces])
+        counts = counts.groupby(level=0, sort=False, observed=False).sum()
+        observed = counts.index[counts.to_numpy() > 0]
+
+        col_stats = {
+            'dtype': first['dtype'],
+            'count': sum(piece['count'] for piece in pieces),
+            'nulls': sum(piece['nulls'] for piece in pieces),
+            'unique': len(observed),
+        }
+
+        if 'm2' in first:
+            n = col_stats['count']
+            filled = [piece for piece in pieces if piece['count']]
+            mean = sum(piece['mean'] * piece['count'] for piece in filled) / n if n else None
+            m2 = sum(piece['m2'] + piece['count'] * (piece['mean'] - mean) ** 2 for piece in filled)
+            col_stats['mean'] = mean
+            col_stats['std'] = float(np.sqrt(m2 / (n - 1))) if n > 1 else None
+            col_stats['min'] = float(observed.min()) if n else None
+            col_stats.update(_quantiles_from_counts(counts) if n else dict.fromkeys(QUANTILES))
+            col_stats['max'] = float(observed.max()) if n else None
+        elif 'min' in first:
+            lows = [piece['min'] for piece in pieces if not pd.isna(piece['min'])]
+            highs = [piece['max'] for piece in pieces if not pd.isna(piece['max'])]
+            col_stats['min'] = _to_json_value(min(lows)) if lows else None
+            col_stats['max'] = _to_json_value(max(highs)) if highs else None
+        else:
+            top = counts.sort_values(ascending=False, kind='stable').head(top_n)
+            col_stats['top'] = {str(k): int(v) for k, v in top.items()}
+
+        stats[col] = col_stats
+    return stats
+
+
+def validate_stats(column_stats: Dict[str, dict], rows: int, duplicates: int) -> Dict[str, bool]:
+    """
+    Результат validate_output по объединенной статистике шардов:
+    проверки NULL, качества и размера считаются по счетчикам,
+    дубликаты — по хешам строк (etl.memory.hash_rows).
+    """
+    null_cells = sum(col['nulls'] for col in column_stats.values())
+    total_cells = rows * len(column_stats)
+    results = {
+        'shape': rows > 0,
+        'nulls': not any(rows and col['nulls'] / rows > 0.5 for col in column_stats.values()),
+        'duplicates': duplicates == 0,
+        'types': True,
+        'quality': not (total_cells and null_cells / total_cells * 100 > 30),
+        'numeric': True,
+        'strings': True,
+    }
+    results['all_passed'] = all(results.values())
+    return results
+
+
+def validate_dataset(df: pd.DataFrame, top_n: int = 10) -> Tuple[Dict[str, dict], Dict[str, bool]]:
+    """
+    Статистика столбцов (merge_column_stats) и результаты проверок (как
+    validate_output) за один проход: проверки считаются по той же
+    статистике (validate_stats), что сохраняется в каталог.
+    """
+    column_stats = merge_column_stats([partial_column_stats(df)], top_n)
+    duplicates = int(df.duplicated().sum())
+    return column_stats, validate_stats(column_stats, len(df), duplicates)
+
+
 def validate_output(df: pd.DataFrame, verbose: bool = True) -> Dict[str, bool]:
     """
     Полная валидация выходных параметров.
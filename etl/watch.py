@@ -0,0 +1,240 @@
+"""
+Режим наблюдения за папкой (python -m etl.main --watch DIR).
+
+Процесс остается запущенным: модули этапов и pandas импортируются
+один раз, engine PostgreSQL переиспользуется между файлами. Новые и
+измененные файлы в папке ставятся в ограниченную очередь и
+обрабатываются по одному тем же графом этапов, что и `--file`, но без
+кеша этапов.
+
+Каждый файл — отдельная часть выгрузок (etl.load.load, partition):
+в SQLite и PostgreSQL его строки помечены столбцом source_file и при
+повторной обработке файла заменяются только они, Parquet, CSV, Feather
+пишутся в data.<файл>.<формат>, кубы и снимки — в подпапки <файл>.
+
+Статус каждого файла хранится в data/processed/.watch_state.json,
+поэтому после перезапуска уже обработанные файлы не загружаются повторно.
+"""
+
+import fnmatch
+import json
+import queue
+import signal
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from etl.checkpoint import atomic_path, source_fingerprint
+from etl.metrics import DEFAULT_METRICS_PATH, MetricsRecorder
+
+DEFAULT_WATCH_STATE_PATH = 'data/processed/.watch_state.json'
+DEFAULT_WATCH_PATTERNS = ('*.csv', '*.xlsx', '*.xls', '*.json')
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class FolderWatcher:
+    """
+    Наблюдатель за папкой с одним обработчиком в долгоживущем процессе.
+
+    Файл попадает в очередь, когда его размер и время изменения не
+    менялись между двумя проверками (файл дописан). Если очередь
+    заполнена, файл будет поставлен при следующей проверке. Файлы
+    обрабатываются последовательно: все они пишут в одни и те же БД.
+
+    Args:
+        directory: наблюдаемая папка
+        pipeline_options: аргументы build_pipeline (кроме input_file)
+        patterns: маски имен файлов
+        interval: период проверки папки, секунды
+        queue_size: максимальное количество файлов в очереди
+        state_path: JSON со статусами файлов
+        metrics_out: JSON с метриками последнего обработанного файла
+    """
+
+    def __init__(self,
+                 directory: Union[str, Path],
+                 pipeline_options: Optional[dict] = None,
+                 patterns: Sequence[str] = DEFAULT_WATCH_PATTERNS,
+                 interval: float = 2.0,
+                 queue_size: int = 100,
+                 state_path: Union[str, Path] = DEFAULT_WATCH_STATE_PATH,
+                 metrics_out: Optional[str] = DEFAULT_METRICS_PATH):
+        self.directory = Path(directory)
+        self.pipeline_options = pipeline_options or {}
+        self.patterns = tuple(patterns)
+        self.interval = interval
+        self.state_path = Path(state_path)
+        self.metrics_out = metrics_out
+
+        self.queue: 'queue.Queue[Tuple[Path, str]]' = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._queued: set = set()
+        self.files: Dict[str, dict] = self._read_state()
+
+    def _read_state(self) -> Dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+        files = json.loads(self.state_path.read_text(encoding='utf-8')).get('files', {})
+        for entry in files.values():
+            # Файлы, прерванные остановкой или упавшие, обрабатываются заново
+            if entry['status'] != 'done':
+                entry['status'] = 'retry'
+        return files
+
+    def _save_state(self) -> None:
+        with atomic_path(self.state_path) as tmp_path:
+            tmp_path.write_text(
+                json.dumps({'directory': str(self.directory), 'files': self.files},
+                           ensure_ascii=False, indent=2),
+                encoding='utf-8'
+            )
+
+    def _set_status(self, path: Path, **fields) -> None:
+        with self._lock:
+            entry = self.files.setdefault(str(path), {})
+            entry.update(fields)
+            self._save_state()
+
+    def warm_up(self) -> None:
+        """Загружает модули этапов до первого файла."""
+        import pandas  # noqa: F401
+        import etl.extract, etl.transform, etl.validate, etl.load  # noqa: F401,E401
+
+    def _candidates(self) -> list:
+        """(путь, (размер, mtime)) подходящих файлов, старые первыми."""
+        candidates = []
+        for path in self.directory.iterdir():
+            # Скрытые файлы — обычно временные файлы атомарной записи
+            if path.name.startswith('.') or not any(
+                    fnmatch.fnmatch(path.name, pattern) for pattern in self.patterns):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                candidates.append((path, (stat.st_size, stat.st_mtime_ns)))
+        return sorted(candidates, key=lambda item: item[1][1])
+
+    def scan(self) -> int:
+        """Одна проверка папки; возвращает количество поставленных в очередь файлов."""
+        queued = 0
+        for path, signature in self._candidates():
+            key = str(path)
+            if key in self._queued:
+                continue
+            if self._pending.get(key) != signature:
+                # Файл новый или еще дописывается — ждем следующей проверки
+                self._pending[key] = signature
+                continue
+
+            fingerprint = source_fingerprint(key)
+            entry = self.files.get(key)
+            if entry and entry.get('fingerprint') == fingerprint and entry['status'] in ('done', 'failed'):
+                continue
+
+            try:
+                self.queue.put_nowait((path, fingerprint))
+            except queue.Full:
+                break
+            self._queued.add(key)
+            self._pending.pop(key, None)
+            self._set_status(path, status='queued', fingerprint=fingerprint, queued_at=_now(),
+                             started_at=None, finished_at=None, error=None)
+            queued += 1
+        return queued
+
+    def process(self, path: Path, fingerprint: str) -> None:
+        """Прогоняет граф этапов для одного файла и записывает его статус."""
+        from etl.main import build_pipeline
+
+        print(f"\n▶ Обработка {path}\n")
+        self._set_status(path, status='processing', started_at=_now())
+        metrics = MetricsRecorder()
+        start = time.perf_counter()
+        try:
+            pipeline = build_pipeline(input_file=str(path), metrics=metrics,
+                                      reuse_connections=True, partition=path.name,
+                                      cache_stages=False, **self.pipeline_options)
+            values = pipeline.run()
+            sinks = values.get('load', {})
+            failed = [name for name, ok in sinks.items() if not ok]
+            self._set_status(
+                path,
+                status='failed' if failed else 'done',
+                finished_at=_now(),
+                seconds=round(time.perf_counter() - start, 3),
+                rows=len(values['transform']) if 'transform' in values else None,
+                sinks=sinks,
+                error=f"Не удалось загрузить: {', '.join(failed)}" if failed else None,
+            )
+        except Exception as e:
+            traceback.print_exc()
+            self._set_status(path, status='failed', finished_at=_now(),
+                             seconds=round(time.perf_counter() - start, 3), error=str(e))
+        finally:
+            with self._lock:
+                self._queued.discard(str(path))
+            if self.metrics_out and metrics.steps:
+                metrics.write(self.metrics_out)
+
+        entry = self.files[str(path)]
+        mark = '✓' if entry['status'] == 'done' else '❌'
+        print(f"{mark} {path.name}: {entry['status']}"
+              + (f" ({entry['error']})" if entry.get('error') else "") + "\n")
+
+    def _worker(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.process(*item)
+
+    def stop(self, *_) -> None:
+        """Первый сигнал — мягкая остановка, второй — немедленная."""
+        if self.stop_event.is_set():
+            raise KeyboardInterrupt
+        print("\nОстановка: текущий файл будет дообработан (повторный Ctrl+C — прервать)")
+        self.stop_event.set()
+
+    def run(self) -> None:
+        """Основной цикл до SIGINT/SIGTERM."""
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"Папка не найдена: {self.directory}")
+
+        self.warm_up()
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        worker = threading.Thread(target=self._worker, name='etl-watch-worker', daemon=True)
+        worker.start()
+        print(f"Наблюдение за {self.directory} ({', '.join(self.patterns)}), "
+              f"проверка каждые {self.interval:g} с. Ctrl+C для остановки\n")
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.scan()
+                except OSError as e:
+                    print(f"⚠ Ошибка проверки папки: {e}")
+                self.stop_event.wait(self.interval)
+        finally:
+            # Файлы, не взятые в обработку, остаются в статусе 'queued'
+            # и обрабатываются после перезапуска
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put(None)
+            worker.join()
+
+        done = sum(entry['status'] == 'done' for entry in self.files.values())
+        print(f"Наблюдение остановлено. Обработано файлов: {done}, статусы: {self.state_path}")
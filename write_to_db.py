@@ -1,6 +1,14 @@
+import argparse
+import io
 import sqlite3
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from sqlalchemy import create_engine
 
 
@@ -26,9 +34,11 @@ def load_credentials_from_sqlite(db_path="creds.db"):
     os.environ["DB_ROOT_BASE"] = "homeworks"
 
 
-def get_engine():
+def get_engine(pool_size=5):
     """
     Создает SQLAlchemy engine для подключения к PostgreSQL
+
+    pool_size — количество соединений в пуле (по одному на поток записи)
     """
     user = os.getenv("DB_USER")
     password = os.getenv("DB_PASSWORD")
@@ -40,50 +50,199 @@ def get_engine():
         raise Exception("Не все переменные среды заданы!")
 
     engine_url = f"postgresql+psycopg2://{user}:{password}@{url}:{port}/{dbname}"
-    engine = create_engine(engine_url)
+    engine = create_engine(engine_url, pool_size=pool_size, max_overflow=0)
     return engine
 
 
-def load_and_write_data(engine, table_name):
+def find_feather_file(filename="dataset_converted.feather"):
     """
-    Загружает данные из feather файла и записывает в PostgreSQL
+    Ищет feather файл рядом со скриптом, уровнем выше и в текущей папке
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
 
     possible_paths = [
-        os.path.join(script_dir, "dataset_converted.feather"),
-        os.path.join(script_dir, "..", "dataset_converted.feather"),
-        "dataset_converted.feather"
+        os.path.join(script_dir, filename),
+        os.path.join(script_dir, "..", filename),
+        filename
     ]
 
-    data_path = None
     for path in possible_paths:
         if os.path.exists(path):
-            data_path = path
+            return path
+
+    raise FileNotFoundError(f"Файл {filename} не найден!")
+
+
+def open_feather(path, columns=None):
+    """
+    Открывает Feather (Arrow IPC) файл через memory map
+
+    Данные не читаются целиком: батчи отображаются из файла по мере
+    обращения, а при заданных columns остальные столбцы не читаются
+    и не распаковываются.
+    """
+    source = pa.memory_map(path, 'r')
+    options = None
+    if columns:
+        schema = pa.ipc.open_file(source).schema
+        missing = [column for column in columns if column not in schema.names]
+        if missing:
+            raise ValueError(f"Нет столбцов в файле: {', '.join(missing)}")
+        options = pa.ipc.IpcReadOptions(
+            included_fields=[schema.get_field_index(column) for column in columns]
+        )
+    return pa.ipc.open_file(source, options=options)
+
+
+def iter_slices(reader, start=0, stop=None, slice_rows=50_000):
+    """
+    Отдает arrow.Table срезы строк [start, stop) размером до slice_rows
+
+    В памяти одновременно находится не больше одного батча файла.
+    """
+    position = 0
+    pending = []
+    pending_rows = 0
+
+    for i in range(reader.num_record_batches):
+        if stop is not None and position >= stop:
             break
+        batch = reader.get_batch(i)
+        batch_start, position = position, position + batch.num_rows
+        if position <= start:
+            continue
+
+        lo = max(start - batch_start, 0)
+        hi = batch.num_rows if stop is None else min(stop - batch_start, batch.num_rows)
+        batch = batch.slice(lo, hi - lo)
 
-    if not data_path:
-        raise FileNotFoundError("Файл dataset_converted.feather не найден!")
+        while batch.num_rows:
+            take = min(slice_rows - pending_rows, batch.num_rows)
+            pending.append(batch.slice(0, take))
+            pending_rows += take
+            batch = batch.slice(take)
+            if pending_rows == slice_rows:
+                yield pa.Table.from_batches(pending)
+                pending, pending_rows = [], 0
 
-    df = pd.read_feather(data_path)
-    df = df.head(100)
+    if pending:
+        yield pa.Table.from_batches(pending)
 
-    df.to_sql(
+
+def copy_slice(engine, table_name, table, schema="public"):
+    """
+    Записывает срез в существующую таблицу отдельной транзакцией
+
+    Для psycopg2 используется COPY ... FROM STDIN (CSV из Arrow),
+    для остальных драйверов — DataFrame.to_sql.
+    """
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        if hasattr(cursor, "copy_expert"):
+            buffer = io.BytesIO()
+            pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+            buffer.seek(0)
+            columns = ", ".join(f'"{name}"' for name in table.column_names)
+            cursor.copy_expert(
+                f'COPY "{schema}"."{table_name}" ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            conn.commit()
+            return
+    finally:
+        conn.close()
+
+    table.to_pandas().to_sql(
         name=table_name,
         con=engine,
-        schema="public",
+        schema=schema if engine.dialect.name == "postgresql" else None,
+        if_exists="append",
+        index=False
+    )
+
+
+def load_and_write_data(engine, table_name, path=None, start=0, rows=100,
+                        columns=None, workers=4, slice_rows=50_000):
+    """
+    Загружает данные из feather файла и записывает в PostgreSQL
+
+    Файл открывается через memory map, читаются только строки
+    [start, start + rows) (rows=None — до конца файла) и столбцы
+    columns. Срезы по slice_rows строк пишутся параллельно в workers
+    соединений; в памяти не больше 2 × workers срезов.
+    """
+    data_path = path or find_feather_file()
+    reader = open_feather(data_path, columns)
+    stop = None if rows is None else start + rows
+
+    # Таблица создается по схеме файла, строки дописываются срезами
+    reader.schema.empty_table().to_pandas().to_sql(
+        name=table_name,
+        con=engine,
+        schema="public" if engine.dialect.name == "postgresql" else None,
         if_exists="replace",
         index=False
     )
-    print(f"Данные успешно записаны в таблицу public.{table_name}")
+
+    written = 0
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def write(table):
+        nonlocal written
+        copy_slice(engine, table_name, table)
+        with lock:
+            written += table.num_rows
+            elapsed = time.perf_counter() - started
+            total = f"/{rows:,}" if rows is not None else ""
+            print(f"  Записано {written:,}{total} строк ({written / elapsed:,.0f} строк/с)")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for table in iter_slices(reader, start, stop, slice_rows):
+            if len(in_flight) >= 2 * workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            in_flight.add(executor.submit(write, table))
+        for future in in_flight:
+            future.result()
+
+    print(f"Данные успешно записаны в таблицу public.{table_name}: {written} строк "
+          f"за {time.perf_counter() - started:.2f} сек")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Запись Feather файла в PostgreSQL")
+    parser.add_argument("--file", type=str, default=None,
+                        help="Путь к feather файлу (по умолчанию: dataset_converted.feather)")
+    parser.add_argument("--table", type=str, default="Korotkov", help="Таблица в PostgreSQL")
+    parser.add_argument("--start", type=int, default=0, help="Первая строка среза")
+    parser.add_argument("--rows", type=int, default=100,
+                        help="Количество строк (по умолчанию: 100, 0 — до конца файла)")
+    parser.add_argument("--columns", type=str, default=None, help="Столбцы через запятую")
+    parser.add_argument("--workers", type=int, default=4, help="Параллельных соединений")
+    parser.add_argument("--slice-rows", type=int, default=50_000, help="Строк в одном срезе")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
     load_credentials_from_sqlite()
-    engine = get_engine()
-    table_name = "Korotkov"
-    load_and_write_data(engine, table_name)
+    engine = get_engine(pool_size=args.workers)
+    table_name = args.table
+    load_and_write_data(
+        engine,
+        table_name,
+        path=args.file,
+        start=args.start,
+        rows=args.rows or None,
+        columns=args.columns.split(",") if args.columns else None,
+        workers=args.workers,
+        slice_rows=args.slice_rows
+    )
 
-    df_check = pd.read_sql_table(table_name, con=engine, schema="public")
+    df_check = pd.read_sql_query(f'SELECT * FROM public."{table_name}" LIMIT 5', con=engine)
     print("Первые строки из таблицы:")
     print(df_check.head())